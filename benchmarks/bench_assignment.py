@@ -0,0 +1,113 @@
+# benchmarks/bench_assignment.py
+"""
+Association cost in SORTTracker as the scene grows: the old full-matrix
+Python greedy pass vs optimal assignment per (cls, approach) block.
+
+    python benchmarks/bench_assignment.py --sizes 10 100 300 1000
+"""
+import argparse
+import time
+import numpy as np
+from smart_signal.perception.tracker import SORTTracker
+from smart_signal.types import CLASS_CODES, DetectionBatch, approach_code
+from smart_signal.utils import assignment
+from smart_signal.utils.geometry import iou_matrix
+
+
+def scene(n, rng, frames=20, classes=4, approaches=("N", "E", "S", "W")):
+    """Boxes drifting on a 1920x1080 canvas with random drop-outs."""
+    pos = rng.uniform(0, [1890, 1050], (n, 2))
+    vel = rng.normal(0, 3, (n, 2))
+    cls = rng.integers(0, classes, n).astype(np.uint8)
+    appr = rng.integers(0, len(approaches), n)
+    out = []
+    for f in range(frames):
+        pos += vel
+        keep = rng.random(n) > 0.05
+        boxes = np.hstack([pos, pos + 30]).astype(np.float32)[keep]
+        batch = DetectionBatch.from_arrays(boxes, np.ones(len(boxes), np.float32), cls[keep], "N", f)
+        batch.approach_codes[:] = [1 + a for a in appr[keep]]
+        out.append(batch)
+    return out
+
+
+def greedy_full(tracks_boxes, same, boxes, thresh):
+    """Pre-vectorization association: full padded matrix, sorted Python triples."""
+    cost = 1.0 - iou_matrix(tracks_boxes, boxes)
+    cost[~same] = 1.0
+    flat = [(cost[i, j], i, j) for i in range(cost.shape[0]) for j in range(cost.shape[1])]
+    used_t, used_d, pairs = set(), set(), []
+    for c, i, j in sorted(flat):
+        if i in used_t or j in used_d or 1.0 - c < thresh:
+            continue
+        pairs.append((i, j))
+        used_t.add(i)
+        used_d.add(j)
+    return pairs
+
+
+def time_it(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 30, 100, 300, 1000])
+    ap.add_argument("--frames", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    solvers = ["numpy"] + (["scipy"] if assignment._scipy_lsa is not None else [])
+    print(f"{'objects':>7} {'greedy ms':>10} " + " ".join(f"{s + ' ms':>10}" for s in solvers)
+          + f" {'SORT upd ms':>12} {'ID sw greedy':>13} {'ID sw opt':>10}")
+    for n in args.sizes:
+        batches = scene(n, rng, args.frames)
+        tracker = SORTTracker()
+        t0 = time.perf_counter()
+        for f, b in enumerate(batches):
+            tracker.update(b, f)
+        upd_ms = (time.perf_counter() - t0) / len(batches) * 1000.0
+
+        # Association alone, on the tracker's final state vs the last frame
+        last = batches[-1]
+        t_boxes = tracker.bank.bboxes().astype(np.float32)
+        t_cls = np.array([CLASS_CODES[t.cls] for t in tracker._tracks])
+        t_appr = np.array([approach_code(t.approach_id) for t in tracker._tracks])
+        same = ((t_cls[:, None] == last.cls_codes[None, :]) &
+                (t_appr[:, None] == last.approach_codes[None, :]))
+        repeat = max(1, 2000 // max(n, 1))
+        row = [time_it(lambda: greedy_full(t_boxes, same, last.boxes, 0.3), max(1, repeat // 10))]
+        for s in solvers:
+            orig = assignment._scipy_lsa
+            if s == "numpy":
+                assignment._scipy_lsa = None
+            try:
+                row.append(time_it(lambda: tracker._associate(last), repeat))
+            finally:
+                assignment._scipy_lsa = orig
+
+        # Identity switches: greedy vs optimal on one frame of crowding
+        sw_greedy, sw_opt = id_switches(n, rng)
+        print(f"{n:7d} {row[0]:10.2f} " + " ".join(f"{x:10.2f}" for x in row[1:])
+              + f" {upd_ms:12.2f} {sw_greedy:13d} {sw_opt:10d}")
+
+
+def id_switches(n, rng):
+    """Matches assigned to the wrong object after a jittered frame."""
+    pos = rng.uniform(0, 600, (n, 2))
+    prev = np.hstack([pos, pos + 30]).astype(np.float32)
+    cur = prev + rng.normal(0, 6, prev.shape).astype(np.float32)
+    same = np.ones((n, n), dtype=bool)
+    greedy = greedy_full(prev, same, cur, 0.3)
+    ious = iou_matrix(prev, cur)
+    ok = ious >= 0.3
+    rows, cols = assignment.linear_assignment(np.where(ok, 1.0 - ious, 1e6))
+    optimal = [(r, c) for r, c in zip(rows, cols) if ok[r, c]]
+    return sum(i != j for i, j in greedy), sum(int(i) != int(j) for i, j in optimal)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_backends.py
+"""
+Compare YOLOv8 inference backends on a video: per-frame latency and
+agreement with the reference (first) backend.
+
+    python benchmarks/bench_backends.py --video videos/traffic.mp4 \
+        --backends ultralytics onnx onnx-int8 --frames 200
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from smart_signal.perception.detector import YOLODetector
+from smart_signal.utils.geometry import iou
+
+
+def read_frames(path, n):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < n:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def match(ref, cand, thresh=0.5):
+    """Greedy same-class matching; returns (matched, n_ref, n_cand)."""
+    used = set()
+    matched = 0
+    for rb, rc in zip(ref.boxes.tolist(), ref.cls_codes.tolist()):
+        best, best_j = thresh, None
+        for j, (cb, cc) in enumerate(zip(cand.boxes.tolist(), cand.cls_codes.tolist())):
+            if j in used or cc != rc:
+                continue
+            s = iou(rb, cb)
+            if s >= best:
+                best, best_j = s, j
+        if best_j is not None:
+            used.add(best_j)
+            matched += 1
+    return matched, len(ref), len(cand)
+
+
+def run(detector, frames, batch):
+    out, times = [], []
+    detector.detect_batch(frames[:batch], list(range(batch)), ["N"] * batch)  # warm-up
+    for i in range(0, len(frames), batch):
+        chunk = frames[i:i + batch]
+        t0 = time.perf_counter()
+        out.extend(detector.detect_batch(chunk, list(range(i, i + len(chunk))), ["N"] * len(chunk)))
+        times.append((time.perf_counter() - t0) / len(chunk))
+    return out, np.array(times) * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video", default="videos/traffic.mp4")
+    ap.add_argument("--model", default="yolov8n.pt")
+    ap.add_argument("--backends", nargs="+", default=["ultralytics", "onnx", "onnx-int8"])
+    ap.add_argument("--frames", type=int, default=200)
+    ap.add_argument("--batch", type=int, default=1, help="frames per predict call (e.g. 4 approaches)")
+    ap.add_argument("--conf", type=float, default=0.3)
+    args = ap.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, batch={args.batch}")
+    print(f"{'backend':<12} {'init s':>7} {'mean ms':>8} {'p95 ms':>7} {'fps':>6} "
+          f"{'dets':>6} {'recall':>7} {'prec':>6}")
+
+    reference = None
+    for name in args.backends:
+        t0 = time.perf_counter()
+        det = YOLODetector(args.model, conf_thresh=args.conf, backend=name)
+        init_s = time.perf_counter() - t0
+        batches, ms = run(det, frames, args.batch)
+        if reference is None:
+            reference = batches
+        m = np.array([match(r, c) for r, c in zip(reference, batches)]).sum(axis=0)
+        recall = m[0] / max(m[1], 1)
+        prec = m[0] / max(m[2], 1)
+        print(f"{name:<12} {init_s:7.2f} {ms.mean():8.1f} {np.percentile(ms, 95):7.1f} "
+              f"{1000.0 / ms.mean():6.1f} {m[2]:6d} {recall:7.3f} {prec:6.3f}")
+
+
+if __name__ == "__main__":
+    main()
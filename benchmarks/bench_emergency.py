@@ -0,0 +1,103 @@
+# benchmarks/bench_emergency.py
+"""
+Emergency event -> preempt action latency, measured from the broker publish
+call to `on_action`, with the control loop and optimizer competing for the
+CPU and unrelated traffic flooding the broker.
+
+    python benchmarks/bench_emergency.py --trials 500 --vehicles 1000
+"""
+import argparse
+import threading
+import time
+import numpy as np
+from smart_signal.control.emergency import PreemptionManager
+from smart_signal.control.optimizer import SignalOptimizer
+from smart_signal.runtime.bus import EventBus, LocalBroker
+from smart_signal.runtime.control_loop import ControlLoop, Snapshot
+from smart_signal.types import EmergencyEvent, LaneStat
+
+
+def busy(stop, fn):
+    while not stop.is_set():
+        fn()
+
+
+def flood(stop, broker, rate_hz):
+    period = 1.0 / rate_hz
+    payload = b'{"boxes": [[1, 2, 3, 4]], "frame": 0}'
+    while not stop.is_set():
+        broker.publish("perception/N/detections", payload)
+        time.sleep(period)
+
+
+def run(label, trials, vehicles, cpu=False, flood_hz=0):
+    bus = EventBus()
+    broker = LocalBroker(bus, {"emergency/#": EmergencyEvent.model_validate_json}).start()
+    bus.subscribe("perception/#", lambda topic, msg: None)
+    done = threading.Event()
+    stamp = [0.0]
+
+    def on_action(action):
+        stamp[0] = time.perf_counter()
+        done.set()
+
+    mgr = PreemptionManager(bus, eta_threshold_s=30.0, on_action=on_action)
+    # Far-away vehicles keep the heap populated without preempting
+    approaches = ["N", "E", "S", "W"]
+    for k in range(vehicles):
+        bus.publish("emergency/bg", EmergencyEvent(vehicle_id=f"bg{k}", vehicle_type="fire",
+                                                   approach_id=approaches[k % 4], eta_s=600.0 + k))
+
+    stop = threading.Event()
+    threads = []
+    control = None
+    if cpu:
+        opt = SignalOptimizer()
+        queues = np.random.default_rng(0).integers(0, 30, (300, 8))
+        stats = Snapshot()
+        stats.publish([LaneStat(approach_id="N", lane_id=f"N{i}", movement="through", queue_len=i,
+                                arrival_rate_vph=0.0, occupancy=0.0, spillback=False) for i in range(8)])
+        control = ControlLoop(opt, stats, interval_s=0.05, emergencies=mgr.active).start()
+        threads.append(threading.Thread(target=busy, args=(stop, lambda: opt.compute_splits_batch(queues))))
+    if flood_hz:
+        threads.append(threading.Thread(target=flood, args=(stop, broker, flood_hz)))
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    lat = []
+    for k in range(trials):
+        for siren in (True, False):  # preempt, then release
+            ev = EmergencyEvent(vehicle_id="amb", vehicle_type="ambulance",
+                                approach_id=approaches[k % 4], eta_s=10.0, siren_on=siren)
+            raw = ev.model_dump_json()
+            done.clear()
+            t0 = time.perf_counter()
+            broker.publish("emergency/ktm_demo_01", raw)
+            if not done.wait(1.0):
+                continue
+            lat.append(stamp[0] - t0)
+
+    stop.set()
+    if control is not None:
+        control.stop()
+    broker.stop()
+    mgr.close()
+    us = np.array(lat) * 1e6
+    print(f"{label:<22} {len(us):6d} {np.median(us):9.0f} {np.percentile(us, 99):9.0f} {us.max():9.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=500)
+    ap.add_argument("--vehicles", type=int, default=1000)
+    ap.add_argument("--flood-hz", type=float, default=2000)
+    args = ap.parse_args()
+    print(f"{'load':<22} {'actions':>6} {'p50 us':>9} {'p99 us':>9} {'max us':>9}")
+    run("idle", args.trials, args.vehicles)
+    run("control + optimizer", args.trials, args.vehicles, cpu=True)
+    run("+ broker flood", args.trials, args.vehicles, cpu=True, flood_hz=args.flood_hz)
+
+
+if __name__ == "__main__":
+    main()
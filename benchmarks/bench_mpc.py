@@ -0,0 +1,53 @@
+# benchmarks/bench_mpc.py
+"""
+MPC decision cost: snapshot/restore vs deepcopy of Vehicle objects, one rollout, and a full
+decision over the default candidates under the control budget.
+
+    python benchmarks/bench_mpc.py --vehicles 50 --horizon 60 --budget 1.0
+"""
+import argparse
+import copy
+import time
+from smart_signal.control.mpc import MPCController, rollout
+from smart_signal.simulation.sim_core import SimWorld
+from smart_signal.types import TimingPlan
+
+
+def time_it(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--vehicles", type=int, default=50)
+    ap.add_argument("--horizon", type=float, default=60.0)
+    ap.add_argument("--budget", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=None)
+    args = ap.parse_args()
+
+    world = SimWorld(headless=True, seed=0)
+    while len(world.fleet) < args.vehicles:
+        world.step(spawn_p=0.01)
+    state = world.snapshot()
+    print(f"vehicles: {len(world.fleet)}")
+    print(f"snapshot        {time_it(world.snapshot, 200):8.3f} ms")
+    print(f"restore         {time_it(lambda: world.restore(state), 200):8.3f} ms")
+    vehicles = world.vehicles
+    print(f"deepcopy        {time_it(lambda: copy.deepcopy(vehicles), 200):8.3f} ms")
+    print(f"rollout {args.horizon:.0f}s    {time_it(lambda: rollout(state, TimingPlan(0, 12, 12), args.horizon, 0.005, 0), 3):8.1f} ms")
+
+    ctl = MPCController(horizon_s=args.horizon, workers=args.workers, budget_s=args.budget)
+    ctl.warmup()
+    for _ in range(3):
+        plan = ctl.decide(state)
+        print(f"decide: {ctl.last_latency_s * 1000:7.1f} ms, {len(ctl.last_scores)}/{len(ctl.candidates)} "
+              f"candidates scored on {ctl.workers} workers -> {plan}")
+    ctl.close()
+    world.shutdown()
+
+
+if __name__ == "__main__":
+    main()
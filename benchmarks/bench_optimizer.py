@@ -0,0 +1,53 @@
+# benchmarks/bench_optimizer.py
+"""
+Corridor-scale split computation: one `compute_splits` call per
+intersection (LaneStat lists) vs a single batched array call.
+
+    python benchmarks/bench_optimizer.py --intersections 10 100 300 1000 --phases 8
+"""
+import argparse
+import time
+import numpy as np
+from smart_signal.control.optimizer import SignalOptimizer
+from smart_signal.types import LaneStat
+
+
+def time_it(fn, repeat):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def lane_stats(queues):
+    return [[LaneStat(approach_id="N", lane_id=f"P{p}", movement="through", queue_len=int(q),
+                      arrival_rate_vph=0.0, occupancy=0.0, spillback=False)
+             for p, q in enumerate(row)] for row in queues]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--intersections", type=int, nargs="+", default=[10, 100, 300, 1000])
+    ap.add_argument("--phases", type=int, default=8)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    opt = SignalOptimizer()
+    print(f"{'inters':>6} {'loop ms':>10} {'max-p ms':>10} {'webster ms':>11} {'speedup':>8}")
+    for n in args.intersections:
+        queues = rng.integers(0, 30, (n, args.phases))
+        flows = rng.uniform(0, 400, (n, args.phases))
+        mask = rng.random((n, args.phases)) > 0.2
+        min_g = rng.uniform(5, 10, n)
+        max_g = rng.uniform(40, 70, n)
+        stats = lane_stats(queues)
+        repeat = max(3, 20000 // n)
+        loop = time_it(lambda: [opt.compute_splits(s) for s in stats], max(1, repeat // 100))
+        mp = time_it(lambda: opt.compute_splits_batch(queues, min_g, max_g, mask=mask), repeat)
+        wb = time_it(lambda: opt.webster_splits_batch(flows, 4.0, min_g, max_g, mask=mask), repeat)
+        print(f"{n:6d} {loop:10.3f} {mp:10.3f} {wb:11.3f} {loop / mp:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
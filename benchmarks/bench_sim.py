@@ -0,0 +1,95 @@
+# benchmarks/bench_sim.py
+"""
+SimWorld step cost as the fleet grows: the old per-Vehicle loop (leader
+scan over every earlier vehicle, conflict-box scan per vehicle) vs the
+array-backed step.
+
+    python benchmarks/bench_sim.py --sizes 100 1000 10000
+"""
+import argparse
+import time
+import numpy as np
+import pygame
+from smart_signal.simulation.sim_core import DIRECTIONS, SimWorld, VehicleArrays
+
+
+def fleet(world, n, rng):
+    """n cars spread along both lanes of every approach, all on the map."""
+    rows = []
+    for k in range(n):
+        app = DIRECTIONS[k % 4]
+        lane = int(rng.integers(0, 2))
+        lx, ly = world.lanes[app][lane]
+        along = float(rng.uniform(-100, 900))
+        x, y = (lx, along) if app in ("N", "S") else (along, ly)
+        rows.append((x, y, 2.0, app, app, lane, "car", (0, 220, 0)))
+    return VehicleArrays.from_rows(rows)
+
+
+def legacy_step(world, vs):
+    """Pre-vectorization _move_with_gaps over Vehicle objects."""
+    headway = 28
+    groups = {"N": [], "S": [], "E": [], "W": []}
+    for v in vs:
+        groups[v.approach_id].append(v)
+    keys = {"N": lambda v: v.y, "S": lambda v: -v.y, "E": lambda v: -v.x, "W": lambda v: v.x}
+    opposite = {"N": "S", "S": "N", "E": "W", "W": "E"}
+
+    def occupied(app):
+        return any(u.approach_id == opposite[app] and
+                   pygame.Rect(u.x, u.y, u.w, u.h).colliderect(world.conflict_box) for u in vs)
+
+    for app, group in groups.items():
+        group.sort(key=keys[app])
+        for i, v in enumerate(group):
+            leader = None
+            for u in group[:i]:
+                if abs((u.x - v.x) if app in ("N", "S") else (u.y - v.y)) < 12:
+                    leader = u
+                    break
+            red = world.lights[app] == "RED" and v._near_stop_line()
+            close = False
+            if leader is not None:
+                if app == "N":
+                    close = (v.y + v.h) > (leader.y - headway)
+                elif app == "S":
+                    close = v.y < (leader.y + leader.h + headway)
+                elif app == "E":
+                    close = v.x < (leader.x + leader.w + headway)
+                else:
+                    close = (v.x + v.w) > (leader.x - headway)
+            if not red and not close and not occupied(app):
+                v.move_step()
+
+
+def time_it(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    ap.add_argument("--legacy-max", type=int, default=1000, help="skip the old loop above this size")
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'vehicles':>8} {'legacy ms':>10} {'array ms':>10}")
+    for n in args.sizes:
+        world = SimWorld(headless=True, seed=0)
+        world.fleet = fleet(world, n, rng)
+        state = world.snapshot()
+        legacy = float("nan")
+        if n <= args.legacy_max:
+            vs = world.vehicles
+            legacy = time_it(lambda: legacy_step(world, vs), max(1, 200 // n))
+        world.restore(state)
+        array = time_it(lambda: world.step(spawns=False), 50)
+        print(f"{n:8d} {legacy:10.2f} {array:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
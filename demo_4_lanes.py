@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import threading
@@ -65,6 +66,7 @@ class TrafficUI(ctk.CTk):
         self.video_path = video_path
         self.fid = 0
         self._last_imgtk = None
+        self._rgb = None  # reused RGB conversion buffer
 
     # -------------------------------
     # Controls
@@ -84,12 +86,14 @@ class TrafficUI(ctk.CTk):
     # -------------------------------
     def loop(self):
         cap = cv2.VideoCapture(self.video_path)
+        frame = None
         while self.running and cap.isOpened():
-            ret, frame = cap.read()
+            # Decode into the previous frame's buffer instead of a new array
+            ret, frame = cap.read(image=frame) if frame is not None else cap.read()
             if not ret:
                 break
 
-            detections = self.detector.infer(frame, self.fid, "Main")
+            detections = self.detector.detect(frame, self.fid, "Main")
             tracks = self.tracker.update(detections, self.fid)
             count = len(tracks)
 
@@ -105,8 +109,10 @@ class TrafficUI(ctk.CTk):
                         (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
             # Show in UI
-            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(img_rgb)
+            if self._rgb is None or self._rgb.shape != frame.shape:
+                self._rgb = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            pil_img = Image.fromarray(self._rgb)
             imgtk = ImageTk.PhotoImage(image=pil_img)
             self.video_label.configure(image=imgtk)
             self.video_label.image = imgtk
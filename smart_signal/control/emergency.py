@@ -0,0 +1,183 @@
+# smart_signal/control/emergency.py
+"""
+Emergency-vehicle preemption. Events arrive on the event bus (e.g. bridged
+from the `priority.topics.subscribe` broker topic) and go into an ETA-ordered
+heap. When the nearest vehicle comes within `eta_threshold_s`, a
+`ControllerAction(action="preempt")` is issued straight from the delivering
+thread, without waiting for a perception frame or control tick.
+"""
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from smart_signal.types import ControllerAction, EmergencyEvent
+from smart_signal.control.phases import PhasePlan
+from smart_signal.runtime.bus import EventBus
+from smart_signal.runtime.control_loop import Snapshot
+
+
+class EtaQueue:
+    """
+    Active emergency vehicles ordered by absolute arrival time. Updates for a
+    known vehicle replace its entry (stale heap entries are skipped lazily);
+    vehicles are dropped once `grace_s` past their ETA or when the siren is off.
+    """
+
+    def __init__(self, grace_s: float = 10.0):
+        self.grace_s = grace_s
+        self._heap: List[Tuple[float, int, str]] = []
+        self._latest: Dict[str, Tuple[float, int, EmergencyEvent]] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def push(self, event: EmergencyEvent, now: float):
+        if not event.siren_on:
+            self._latest.pop(event.vehicle_id, None)
+            return
+        entry = (now + event.eta_s, next(self._seq), event)
+        self._latest[event.vehicle_id] = entry
+        heapq.heappush(self._heap, (entry[0], entry[1], event.vehicle_id))
+
+    def _prune(self, now: float):
+        heap = self._heap
+        while heap:
+            arrive, seq, vid = heap[0]
+            cur = self._latest.get(vid)
+            if cur is not None and cur[1] == seq:
+                if arrive + self.grace_s >= now:
+                    return
+                del self._latest[vid]
+            heapq.heappop(heap)
+
+    def peek(self, now: float) -> Optional[Tuple[float, EmergencyEvent]]:
+        """(absolute arrival time, event) of the nearest vehicle."""
+        self._prune(now)
+        if not self._heap:
+            return None
+        vid = self._heap[0][2]
+        arrive, _, event = self._latest[vid]
+        return arrive, event
+
+    def active(self, now: float) -> List[EmergencyEvent]:
+        """Events nearest-first with `eta_s` counted down to `now`."""
+        self._prune(now)
+        return [ev.model_copy(update={"eta_s": max(arrive - now, 0.0)})
+                for arrive, _, ev in sorted(self._latest.values(), key=lambda e: e[:2])]
+
+
+class PreemptionManager:
+    """
+    Subscribes to emergency events on `bus` and keeps the current preemption:
+
+    - nearest vehicle within `eta_threshold_s`: publish a `preempt` action for
+      the phase serving its approach, held until `clearance_s` after arrival
+    - nearest vehicle changes: re-issue for the new one
+    - no vehicle left: publish `next` to release the preemption
+
+    Actions go to `actions` (latest-value Snapshot), to `actions_topic` on the
+    bus and to `on_action`, all on the thread that delivered the event (so
+    `on_action` must be quick). A timer re-checks when the nearest vehicle
+    crosses the threshold or expires.
+    """
+
+    def __init__(self, bus: EventBus, topic: str = "emergency/#", eta_threshold_s: float = 30.0,
+                 clearance_s: float = 5.0, plan: Optional[PhasePlan] = None,
+                 on_action: Optional[Callable[[ControllerAction], None]] = None,
+                 actions_topic: str = "control/actions", clock: Callable[[], float] = time.monotonic):
+        self.bus = bus
+        self.eta_threshold_s = eta_threshold_s
+        self.clearance_s = clearance_s
+        self.plan = plan
+        self.on_action = on_action
+        self.actions_topic = actions_topic
+        self.clock = clock
+        self.queue = EtaQueue()
+        self.actions = Snapshot()
+        self.issued = 0
+        self._lock = threading.RLock()
+        self._current: Optional[Tuple[str, str]] = None  # (vehicle_id, phase_id) being served
+        self._timer: Optional[threading.Timer] = None
+        self._timer_due = 0.0
+        self._unsubscribe = bus.subscribe(topic, self._on_event)
+
+    def close(self):
+        self._unsubscribe()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _phase_for(self, approach_id: str) -> str:
+        if self.plan is not None:
+            serves = self.plan.approach_phases(approach_id)
+            if serves.any():
+                return self.plan.phase_ids[int(serves.argmax())]
+        return approach_id
+
+    def _on_event(self, topic: str, event):
+        if isinstance(event, dict):
+            event = EmergencyEvent(**event)
+        with self._lock:
+            self.queue.push(event, self.clock())
+            self._reconcile()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._reconcile()
+
+    def _reconcile(self):
+        """Compare the nearest vehicle with the current preemption (lock held)."""
+        now = self.clock()
+        head = self.queue.peek(now)
+        self._schedule(head, now)
+        if head is None or head[0] - now > self.eta_threshold_s:
+            if self._current is not None:
+                _, phase_id = self._current
+                self._current = None
+                self._emit(ControllerAction(phase_id=phase_id, action="next", duration_s=0.0))
+            return
+
+        arrive, event = head
+        phase_id = self._phase_for(event.approach_id)
+        if self._current != (event.vehicle_id, phase_id):
+            self._current = (event.vehicle_id, phase_id)
+            self._emit(ControllerAction(phase_id=phase_id, action="preempt",
+                                        duration_s=max(arrive - now, 0.0) + self.clearance_s))
+
+    def _schedule(self, head, now: float):
+        """Keep one timer for when the nearest vehicle crosses the threshold or expires."""
+        due = None
+        if head is not None:
+            due = head[0] - self.eta_threshold_s
+            if due <= now:
+                due = head[0] + self.queue.grace_s
+        if self._timer is not None:
+            if due is not None and abs(due - self._timer_due) < 1e-3:
+                return
+            self._timer.cancel()
+            self._timer = None
+        if due is not None:
+            self._timer_due = due
+            self._timer = threading.Timer(max(due - now, 0.0) + 1e-3, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _emit(self, action: ControllerAction):
+        self.issued += 1
+        self.actions.publish(action)
+        self.bus.publish(self.actions_topic, action)
+        if self.on_action is not None:
+            self.on_action(action)
+
+    def active(self) -> List[EmergencyEvent]:
+        """
+        Nearest-first events within `eta_threshold_s` for
+        `ControlLoop(emergencies=...)`, so splits follow the same threshold
+        as the preempt actions.
+        """
+        with self._lock:
+            return [ev for ev in self.queue.active(self.clock()) if ev.eta_s <= self.eta_threshold_s]
@@ -0,0 +1,184 @@
+# smart_signal/control/mpc.py
+"""
+Model-predictive signal timing: fork the current SimWorld state into
+worker processes, fast-forward K candidate timing plans over a horizon and
+keep the plan with the lowest predicted vehicle delay.
+"""
+import itertools
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+from smart_signal.types import TimingPlan
+
+_world = None  # per-worker SimWorld, reused across rollouts
+
+
+def _init_worker():
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    global _world
+    from smart_signal.simulation.sim_core import SimWorld
+    _world = SimWorld(headless=True)
+
+
+def _ping(_) -> int:
+    return os.getpid()
+
+
+def rollout(state, plan: TimingPlan, horizon_s: float, spawn_p: float, seed: int) -> float:
+    """Total vehicle delay (vehicle-seconds stopped) of `plan` from `state`."""
+    if _world is None:
+        _init_worker()
+    world = _world
+    world.restore(state)
+    world.apply_plan(plan)
+    world.rng.seed(seed)  # same arrivals for every candidate
+    dt = 1.0 / world.fps
+    delay = 0.0
+    for _ in range(int(horizon_s * world.fps)):
+        world.step(spawns=spawn_p > 0, spawn_p=spawn_p)
+        delay += world.stopped * dt
+    return delay
+
+
+def _timed_rollout(*args) -> Tuple[float, float]:
+    t0 = time.perf_counter()
+    return rollout(*args), time.perf_counter() - t0
+
+
+def _calibrate(horizon_s: float, spawn_p: float) -> float:
+    """Wall time of one rollout from a world with 30 s of traffic in it."""
+    if _world is None:
+        _init_worker()
+    _world.rng.seed(0)
+    _world.run(30, spawn_p=0.02)
+    return _timed_rollout(_world.snapshot(), TimingPlan(0, 12, 12), horizon_s, spawn_p, 0)[1]
+
+
+def default_candidates(holds: Sequence[float] = (0, 5, 10, 20),
+                       greens: Sequence[Tuple[float, float]] = ((12, 12), (20, 10), (10, 20), (30, 15), (15, 30))
+                       ) -> List[TimingPlan]:
+    return [TimingPlan(h, ns, ew) for h, (ns, ew) in itertools.product(holds, greens)]
+
+
+class MPCController:
+    """
+    `decide(state)` scores every candidate plan with `seeds` rollouts each on a
+    process pool and returns the best one. Rollouts that would not finish
+    within `budget_s` are not started, and rollouts still running at the
+    deadline are abandoned (their workers count as busy until they finish).
+    The best fully scored candidate wins, and if none was scored it returns
+    None (keep the current timing).
+    """
+
+    def __init__(self, candidates: Optional[List[TimingPlan]] = None, horizon_s: float = 60.0,
+                 spawn_p: float = 0.005, seeds: int = 1, workers: Optional[int] = None,
+                 budget_s: float = 1.0):
+        """
+        :param spawn_p: Per-step arrival probability used in rollouts
+        :param budget_s: Wall-clock limit per decision (normally control_interval_s)
+        """
+        if not 60.0 <= horizon_s <= 120.0:
+            raise ValueError("horizon_s should be 60-120 s")
+        self.candidates = candidates or default_candidates()
+        self.horizon_s = horizon_s
+        self.spawn_p = spawn_p
+        self.seeds = seeds
+        self.budget_s = budget_s
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._decisions = 0
+        self.last_scores: Dict[TimingPlan, float] = {}
+        self.last_latency_s = 0.0
+        self.timeouts = 0       # decisions that ran out of budget before scoring every candidate
+        self._rollout_s = 0.0   # running estimate of one rollout's wall time (seeded by warmup)
+        self._stale = set()     # rollouts abandoned at a deadline, still occupying a worker
+        self._best: Optional[TimingPlan] = None
+        self._cursor = 0        # where the next decision starts in the candidate list
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=mp.get_context("spawn"),
+                                             initializer=_init_worker)
+        return self._pool
+
+    def warmup(self):
+        """
+        Start the workers (pygame import, SimWorld) before the first deadline
+        and time a real rollout, so the first decision already knows how many
+        rollouts fit in the budget.
+        """
+        pool = self._executor()
+        list(pool.map(_ping, range(self.workers)))
+        self._rollout_s = pool.submit(_calibrate, self.horizon_s, self.spawn_p).result()
+
+    def decide(self, state) -> Optional[TimingPlan]:
+        t0 = time.perf_counter()
+        deadline = t0 + self.budget_s
+        base_seed = self._decisions * 1000
+        self._decisions += 1
+        pool = self._executor()
+        # Previous best first, then the others from where the last decision
+        # stopped, so a budget that fits only some candidates still covers
+        # all of them over successive decisions
+        n = len(self.candidates)
+        k = self._cursor % n
+        rotated = self.candidates[k:] + self.candidates[:k]
+        order = ([self._best] if self._best in rotated else []) + [p for p in rotated if p != self._best]
+        jobs = [(plan, base_seed + s) for plan in order for s in range(self.seeds)]
+        # At most one rollout per worker in flight, and none started that would
+        # overrun the deadline, so no work spills into the next interval
+        totals: Dict[TimingPlan, List[float]] = {}
+        running = {}
+        started: Dict[object, float] = {}
+        self._stale = {f for f in self._stale if not f.done()}
+        next_job = 0
+        while next_job < len(jobs) or running:
+            left = deadline - time.perf_counter()
+            while (next_job < len(jobs) and len(running) + len(self._stale) < self.workers
+                   and left > self._rollout_s):
+                plan, seed = jobs[next_job]
+                f = pool.submit(_timed_rollout, state, plan, self.horizon_s, self.spawn_p, seed)
+                running[f], started[f] = plan, time.perf_counter()
+                next_job += 1
+            if not running:
+                break
+            done, _ = wait(running, timeout=max(left, 0.0), return_when=FIRST_COMPLETED)
+            if not done:
+                # Deadline: abandon what is still running and learn that it was slow
+                now = time.perf_counter()
+                for f in running:
+                    if not f.cancel():
+                        self._stale.add(f)
+                    self._rollout_s = max(self._rollout_s, now - started[f])
+                running = {}
+                break
+            for f in done:
+                delay, elapsed = f.result()
+                totals.setdefault(running.pop(f), []).append(delay)
+                self._rollout_s += 0.3 * (elapsed - self._rollout_s)
+        if next_job < len(jobs):
+            self.timeouts += 1
+        started = {plan for plan, _ in jobs[:next_job]}
+        self._cursor = (k + next((i for i, p in enumerate(rotated) if p not in started), n)) % n
+
+        # Only fully scored candidates are comparable (same arrival seeds)
+        self.last_scores = {p: sum(v) / len(v) for p, v in totals.items() if len(v) == self.seeds}
+        self.last_latency_s = time.perf_counter() - t0
+        if not self.last_scores:
+            return None
+        self._best = min(self.last_scores, key=self.last_scores.get)
+        return self._best
+
+    def step(self, world) -> Optional[TimingPlan]:
+        """Decide from a live SimWorld and apply the chosen plan to it."""
+        plan = self.decide(world.snapshot())
+        if plan is not None:
+            world.apply_plan(plan)
+        return plan
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,29 +1,112 @@
-from typing import List
-from smart_signal.types import LaneStat, Splits, EmergencyEvent
+from typing import List, Optional, Union
+import numpy as np
+from smart_signal.types import LaneStat, Splits, SplitsBatch, EmergencyEvent
+from smart_signal.control.phases import PhasePlan
+
+ArrayLike = Union[float, np.ndarray]
+
+# ---------- Batched kernels: (intersections x phases) arrays ----------
+def _per_row(value: ArrayLike, n: int) -> np.ndarray:
+    """Scalar or (I,) parameter as an (I, 1) column for broadcasting."""
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).reshape(n, 1)
+
+def max_pressure_splits_batch(queues: np.ndarray, min_green_s: ArrayLike = 7,
+                              max_green_s: ArrayLike = 60, cycle_s: ArrayLike = 60,
+                              mask: Optional[np.ndarray] = None) -> SplitsBatch:
+    """
+    Green proportional to each phase's share of the queue, clipped to
+    [min_green_s, max_green_s]. Rows with no queue get an equal split.
+
+    :param queues: (I, P) queued vehicles per phase
+    :param mask: (I, P) bool, phases that exist at each intersection
+    """
+    q = np.asarray(queues, dtype=np.float64)
+    n = q.shape[0]
+    if mask is not None:
+        q = np.where(mask, q, 0.0)
+    lo, hi, cycle = _per_row(min_green_s, n), _per_row(max_green_s, n), _per_row(cycle_s, n)
+    total = q.sum(axis=1, keepdims=True)
+    share = q / np.where(total > 0, total, 1.0)
+    greens = np.clip(share * cycle, lo, hi)
+    # No traffic: equal split
+    greens = np.where(total > 0, greens, np.maximum(lo, (hi + lo) / 2))
+    if mask is not None:
+        greens = np.where(mask, greens, 0.0)
+    return SplitsBatch(cycle_s=cycle[:, 0].copy(), greens_s=greens)
+
+def webster_splits_batch(flows_vph: np.ndarray, lost_time_s: ArrayLike = 4,
+                         min_green_s: ArrayLike = 7, max_green_s: ArrayLike = 60,
+                         saturation_vph: ArrayLike = 1800, min_cycle_s: float = 30,
+                         max_cycle_s: float = 150, mask: Optional[np.ndarray] = None) -> SplitsBatch:
+    """
+    Webster's optimal cycle C0 = (1.5 L + 5) / (1 - Y) per intersection, with
+    effective green shared in proportion to the critical flow ratios y_p.
+
+    :param flows_vph: (I, P) critical lane flow per phase
+    :param saturation_vph: scalar, (I,) or (I, P) saturation flow
+    """
+    f = np.asarray(flows_vph, dtype=np.float64)
+    n = f.shape[0]
+    if mask is not None:
+        f = np.where(mask, f, 0.0)
+    lost = _per_row(lost_time_s, n)
+    lo, hi = _per_row(min_green_s, n), _per_row(max_green_s, n)
+    y = f / np.asarray(saturation_vph, dtype=np.float64)
+    Y = np.clip(y.sum(axis=1, keepdims=True), 0.05, 0.95)
+    cycle = np.clip((1.5 * lost + 5.0) / (1.0 - Y), min_cycle_s, max_cycle_s)
+    ysum = y.sum(axis=1, keepdims=True)
+    n_phases = (mask.sum(axis=1, keepdims=True) if mask is not None
+                else np.full((n, 1), f.shape[1]))
+    # With no demand fall back to equal shares
+    share = np.where(ysum > 0, y / np.where(ysum > 0, ysum, 1.0), 1.0 / np.maximum(n_phases, 1))
+    greens = np.clip(share * (cycle - lost), lo, hi)
+    if mask is not None:
+        greens = np.where(mask, greens, 0.0)
+    return SplitsBatch(cycle_s=cycle[:, 0].copy(), greens_s=greens)
+
 
 class SignalOptimizer:
-    def __init__(self, min_green_s=7, max_green_s=60, lost_time_s=4):
+    def __init__(self, min_green_s=7, max_green_s=60, lost_time_s=4, plan: Optional[PhasePlan] = None):
+        """
+        :param plan: Compiled phases; splits are then keyed by phase id,
+            otherwise by lane id
+        """
         self.min_green_s = min_green_s
         self.max_green_s = max_green_s
         self.lost_time_s = lost_time_s
+        self.plan = plan
 
     def compute_splits(self, lane_stats: List[LaneStat]) -> Splits:
         """
         Simple max-pressure: allocate green time proportional to queue length.
         """
-        total_queue = sum(ls.queue_len for ls in lane_stats)
-        if total_queue == 0:
-            # No traffic — equal split
-            equal_time = max(self.min_green_s, (self.max_green_s + self.min_green_s) / 2)
-            return Splits(cycle_s=60, greens_s={ls.lane_id: equal_time for ls in lane_stats})
+        if self.plan is not None:
+            batch = self.compute_splits_batch(self.plan.phase_queues(lane_stats)[None, :])
+            return batch.splits(0, self.plan.phase_ids)
+        queues = np.array([[ls.queue_len for ls in lane_stats]], dtype=np.float64).reshape(1, -1)
+        batch = self.compute_splits_batch(queues)
+        return batch.splits(0, [ls.lane_id for ls in lane_stats])
 
-        greens = {}
-        for ls in lane_stats:
-            share = ls.queue_len / total_queue
-            green_time = max(self.min_green_s, min(self.max_green_s, share * 60))
-            greens[ls.lane_id] = green_time
+    def compute_splits_batch(self, queues: np.ndarray, min_green_s: Optional[ArrayLike] = None,
+                             max_green_s: Optional[ArrayLike] = None,
+                             mask: Optional[np.ndarray] = None) -> SplitsBatch:
+        """Max-pressure splits for (intersections x phases) queues in one call."""
+        return max_pressure_splits_batch(
+            queues,
+            self.min_green_s if min_green_s is None else min_green_s,
+            self.max_green_s if max_green_s is None else max_green_s,
+            cycle_s=60, mask=mask)
 
-        return Splits(cycle_s=60, greens_s=greens)
+    def webster_splits_batch(self, flows_vph: np.ndarray, lost_time_s: Optional[ArrayLike] = None,
+                             min_green_s: Optional[ArrayLike] = None,
+                             max_green_s: Optional[ArrayLike] = None,
+                             mask: Optional[np.ndarray] = None) -> SplitsBatch:
+        return webster_splits_batch(
+            flows_vph,
+            self.lost_time_s if lost_time_s is None else lost_time_s,
+            self.min_green_s if min_green_s is None else min_green_s,
+            self.max_green_s if max_green_s is None else max_green_s,
+            mask=mask)
 
     def apply_emergency_priority(self, splits: Splits, emergencies: List[EmergencyEvent]) -> Splits:
         """
@@ -32,11 +115,18 @@ class SignalOptimizer:
         if not emergencies:
             return splits
 
-        # For now, prioritise the first emergency event
-        emg_lane = emergencies[0].approach_id  # could map to lane_id if needed
+        # Prioritise the vehicle arriving first
+        first = min(emergencies, key=lambda e: e.eta_s)
+        if self.plan is not None:
+            serves = self.plan.approach_phases(first.approach_id).tolist()
+            for pid, on in zip(self.plan.phase_ids, serves):
+                if pid in splits.greens_s:
+                    splits.greens_s[pid] = self.max_green_s if on else self.min_green_s
+            return splits
+        emg_lane = first.approach_id  # could map to lane_id if needed
         for lane_id in splits.greens_s.keys():
             if lane_id.startswith(emg_lane):
                 splits.greens_s[lane_id] = self.max_green_s
             else:
                 splits.greens_s[lane_id] = self.min_green_s
-        return splits
\ No newline at end of file
+        return splits
@@ -0,0 +1,186 @@
+# smart_signal/control/phases.py
+"""
+Signal phases compiled once into arrays. A phase serves a set of movements,
+each movement being an (approach_id, movement) pair. `PhasePlan` holds the
+phase x movement incidence matrix and movement/phase conflict tables so that
+per-tick work over lane stats is a handful of array operations.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from smart_signal.types import LaneStat, Phase
+
+Movement = Tuple[str, str]  # (approach_id, movement)
+
+APPROACHES: Tuple[str, ...] = ("N", "E", "S", "W")
+MOVEMENTS: Tuple[str, ...] = ("through", "left", "right")
+
+# Leg reached by each turn, as a number of quarter turns clockwise from the entry leg
+_TURN_OFFSET = {"through": 2, "left": 1, "right": 3}
+
+
+def _exit_leg(approach: str, movement: str) -> str:
+    """Vehicles entering from `approach` (e.g. N, heading south) leave on this leg."""
+    return APPROACHES[(APPROACHES.index(approach) + _TURN_OFFSET[movement]) % 4]
+
+
+def conflict_table(movements: Sequence[Movement], driving_side: str = "right") -> np.ndarray:
+    """
+    (M, M) bool: movements whose paths cross or merge into the same exit.
+
+    Each leg has an inbound and an outbound carriageway placed around a circle
+    (which side comes first depends on `driving_side`); a movement is the chord
+    from its inbound point to its exit's outbound point. Two chords conflict if
+    their endpoints interleave or they share an exit. Movements from the same
+    approach never conflict.
+    """
+    if driving_side not in ("right", "left"):
+        raise ValueError(f"driving_side must be 'right' or 'left', got {driving_side!r}")
+    eps = 0.25 if driving_side == "right" else -0.25
+    entry = np.array([APPROACHES.index(a) - eps for a, _ in movements])
+    exit_ = np.array([APPROACHES.index(_exit_leg(a, m)) + eps for a, m in movements])
+    entry, exit_ = entry % 4, exit_ % 4
+
+    # c lies on the clockwise arc from a to b
+    def on_arc(a, b, c):
+        return (c - a) % 4 < (b - a) % 4
+
+    a, b = entry[:, None], exit_[:, None]
+    c, d = entry[None, :], exit_[None, :]
+    crossing = on_arc(a, b, c) != on_arc(a, b, d)
+    merging = exit_[:, None] == exit_[None, :]
+    same_entry = entry[:, None] == entry[None, :]
+    return (crossing | merging) & ~same_entry
+
+
+class PhasePlan:
+    """
+    Compiled phase definitions for one intersection.
+
+    - movements: the movements any phase serves, column order of the tables
+    - incidence: (P, M) float, 1 where phase p serves movement m
+    - conflicts: (M, M) bool movement conflicts
+    - phase_conflicts: (P, P) bool, phases that may not run together
+      (movements of a permissive phase that conflict with each other are allowed
+      inside that phase, but still count against other phases)
+    """
+
+    def __init__(self, phases: Sequence[Phase], driving_side: str = "right"):
+        if not phases:
+            raise ValueError("at least one phase is required")
+        self.phases = list(phases)
+        self.phase_ids = [p.id for p in self.phases]
+        if len(set(self.phase_ids)) != len(self.phase_ids):
+            raise ValueError("phase ids must be unique")
+        self.driving_side = driving_side
+
+        movements: List[Movement] = []
+        for p in self.phases:
+            for a, m in p.movements:
+                if a not in APPROACHES or m not in MOVEMENTS:
+                    raise ValueError(f"phase {p.id}: unknown movement ({a!r}, {m!r})")
+                if (a, m) not in movements:
+                    movements.append((a, m))
+        self.movements = movements
+        self.movement_index: Dict[Movement, int] = {mv: i for i, mv in enumerate(movements)}
+
+        P, M = len(self.phases), len(movements)
+        self.incidence = np.zeros((P, M))
+        for i, p in enumerate(self.phases):
+            self.incidence[i, [self.movement_index[(a, m)] for a, m in p.movements]] = 1.0
+        self.serves = self.incidence > 0
+
+        self.conflicts = conflict_table(movements, driving_side)
+        for i, p in enumerate(self.phases):
+            inner = self.conflicts[np.ix_(self.serves[i], self.serves[i])]
+            if p.protected and inner.any():
+                raise ValueError(f"protected phase {p.id} contains conflicting movements")
+        hits = self.serves.astype(np.int64) @ self.conflicts.astype(np.int64) @ self.serves.T.astype(np.int64)
+        self.phase_conflicts = hits > 0
+        np.fill_diagonal(self.phase_conflicts, False)
+        self.compatible = ~self.phase_conflicts
+
+        # Phases serving any movement of each approach (emergency preemption)
+        self._approach_phases = {
+            a: np.array([any(ma == a for ma, _ in p.movements) for p in self.phases])
+            for a in APPROACHES
+        }
+
+    @classmethod
+    def from_config(cls, phases: Iterable[dict], driving_side: str = "right") -> "PhasePlan":
+        """From config.yaml `control.phases` entries: {id, movements: [[approach, movement]], protected}."""
+        return cls([Phase(id=p["id"], movements=[tuple(m) for m in p["movements"]],
+                          protected=p.get("protected", True)) for p in phases], driving_side)
+
+    def __len__(self) -> int:
+        return len(self.phases)
+
+    # ---------- Lane stats -> movement vectors ----------
+    def movement_of(self, approach_id: str, movement: str) -> int:
+        """Column of a movement, -1 if no phase serves it."""
+        return self.movement_index.get((approach_id, movement), -1)
+
+    def lane_movements(self, lane_approaches: Sequence[str], lane_movements: Sequence[str]) -> np.ndarray:
+        """Movement column per lane (-1 for unserved lanes); compile once per lane layout."""
+        return np.array([self.movement_of(a, m) for a, m in zip(lane_approaches, lane_movements)],
+                        dtype=np.int64)
+
+    def movement_totals(self, values, lane_movement: np.ndarray) -> np.ndarray:
+        """Sum per-lane values into (M,) movement totals (or (I, M) for (I, L) input)."""
+        values = np.asarray(values, dtype=np.float64)
+        keep = lane_movement >= 0
+        out = np.zeros(values.shape[:-1] + (len(self.movements),))
+        np.add.at(out, (..., lane_movement[keep]), values[..., keep])
+        return out
+
+    def movement_max(self, values, lane_movement: np.ndarray) -> np.ndarray:
+        """Largest per-lane value per movement, i.e. the critical lane."""
+        values = np.asarray(values, dtype=np.float64)
+        keep = lane_movement >= 0
+        out = np.zeros(values.shape[:-1] + (len(self.movements),))
+        np.maximum.at(out, (..., lane_movement[keep]), values[..., keep])
+        return out
+
+    def _stat_columns(self, lane_stats: Sequence[LaneStat]) -> np.ndarray:
+        return np.array([self.movement_of(ls.approach_id, ls.movement) for ls in lane_stats],
+                        dtype=np.int64)
+
+    # ---------- Phase quantities ----------
+    def pressures(self, upstream_queues, downstream_queues=None) -> np.ndarray:
+        """
+        Max-pressure weight per phase: incidence @ (upstream - downstream)
+        movement queues. Works on (M,) or batched (I, M) inputs.
+        """
+        q = np.asarray(upstream_queues, dtype=np.float64)
+        if downstream_queues is not None:
+            q = q - np.asarray(downstream_queues, dtype=np.float64)
+        return q @ self.incidence.T
+
+    def critical_ratios(self, flow_ratios) -> np.ndarray:
+        """Webster y per phase: the largest movement flow ratio the phase serves."""
+        y = np.asarray(flow_ratios, dtype=np.float64)
+        return np.where(self.serves, y[..., None, :], 0.0).max(axis=-1)
+
+    def phase_queues(self, lane_stats: Sequence[LaneStat]) -> np.ndarray:
+        """(P,) queued vehicles served by each phase."""
+        cols = self._stat_columns(lane_stats)
+        return self.pressures(self.movement_totals([ls.queue_len for ls in lane_stats], cols))
+
+    def phase_flow_ratios(self, lane_stats: Sequence[LaneStat], saturation_vph: float = 1800.0) -> np.ndarray:
+        """(P,) critical flow ratio per phase from per-lane arrival rates."""
+        cols = self._stat_columns(lane_stats)
+        y = self.movement_max([ls.arrival_rate_vph / saturation_vph for ls in lane_stats], cols)
+        return self.critical_ratios(y)
+
+    def select_max_pressure(self, upstream_queues, downstream_queues=None) -> int:
+        return int(np.argmax(self.pressures(upstream_queues, downstream_queues)))
+
+    def approach_phases(self, approach_id: str) -> np.ndarray:
+        """(P,) bool, phases that give green to `approach_id`."""
+        return self._approach_phases.get(approach_id, np.zeros(len(self.phases), dtype=bool))
+
+    def phase_for(self, approach_id: str, movement: str) -> Optional[str]:
+        """First phase serving a movement (overlays, lane-level display)."""
+        col = self.movement_of(approach_id, movement)
+        if col < 0:
+            return None
+        return self.phase_ids[int(np.argmax(self.serves[:, col]))]
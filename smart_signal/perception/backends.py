@@ -0,0 +1,226 @@
+# smart_signal/perception/backends.py
+"""
+CPU inference backends for YOLOv8 behind one `predict(frames, conf)` call.
+
+Each backend returns, per frame, NumPy arrays (xyxy (N,4), conf (N,), cls (N,))
+in original frame pixel coordinates and COCO class ids.
+"""
+import os
+from typing import List, Optional, Sequence, Tuple
+import cv2
+import numpy as np
+
+Raw = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+# ---------- Pre/post-processing (pure NumPy) ----------
+def letterbox(img: np.ndarray, shape: Tuple[int, int] = (640, 640), color: int = 114,
+              out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """
+    Resize keeping aspect ratio and pad to `shape` (h, w).
+    Returns (image, scale, (pad_x, pad_y)); pass `out` to reuse a buffer.
+    """
+    h, w = img.shape[:2]
+    th, tw = shape
+    scale = min(th / h, tw / w)
+    nw, nh = int(round(w * scale)), int(round(h * scale))
+    px, py = (tw - nw) // 2, (th - nh) // 2
+    if out is None or out.shape[:2] != (th, tw):
+        out = np.empty((th, tw, 3), dtype=np.uint8)
+    out.fill(color)
+    dst = out[py:py + nh, px:px + nw]
+    if (nh, nw) == (h, w):
+        dst[...] = img
+    else:
+        cv2.resize(img, (nw, nh), dst=dst, interpolation=cv2.INTER_LINEAR)
+    return out, scale, (px, py)
+
+
+def rect_shape(frame_shape, size: int = 640, stride: int = 32) -> Tuple[int, int]:
+    """Smallest stride-aligned (h, w) holding the frame scaled to `size` on its long side."""
+    h, w = frame_shape[:2]
+    scale = min(size / h, size / w)
+    nh, nw = int(round(h * scale)), int(round(w * scale))
+    return -(-nh // stride) * stride, -(-nw // stride) * stride
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thresh: float = 0.7,
+        classes: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Greedy non-maximum suppression; each step suppresses against all
+    remaining boxes at once. Class-aware when `classes` is given.
+    """
+    if not len(boxes):
+        return np.empty(0, dtype=np.int64)
+    if classes is not None:
+        # Shift each class into its own coordinate range so classes never overlap
+        boxes = boxes + (classes.astype(boxes.dtype) * (boxes.max() + 1.0))[:, None]
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou <= iou_thresh]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_yolov8(pred: np.ndarray, conf: float, iou_thresh: float, scale: float,
+                  pad: Tuple[int, int], frame_shape, max_det: int = 300) -> Raw:
+    """
+    Decode one raw YOLOv8 head output (4 + num_classes, anchors) into
+    frame-space boxes.
+    """
+    pred = pred.T  # (anchors, 4 + nc)
+    cls_scores = pred[:, 4:]
+    cls_ids = cls_scores.argmax(axis=1)
+    scores = cls_scores[np.arange(len(cls_ids)), cls_ids]
+    m = scores > conf
+    pred, scores, cls_ids = pred[m], scores[m], cls_ids[m]
+
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    keep = nms(boxes, scores, iou_thresh, cls_ids)[:max_det]
+    boxes, scores, cls_ids = boxes[keep], scores[keep], cls_ids[keep]
+
+    # Undo letterbox
+    boxes -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=boxes.dtype)
+    boxes /= scale
+    fh, fw = frame_shape[:2]
+    np.clip(boxes[:, 0::2], 0, fw, out=boxes[:, 0::2])
+    np.clip(boxes[:, 1::2], 0, fh, out=boxes[:, 1::2])
+    return boxes.astype(np.float32), scores.astype(np.float32), cls_ids.astype(np.int64)
+
+
+# ---------- Backends ----------
+class UltralyticsBackend:
+    """PyTorch runtime via ultralytics (imported lazily; heavy)."""
+
+    def __init__(self, model_path: str = "yolov8n.pt", **_):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+
+    def predict(self, frames: Sequence[np.ndarray], conf: float) -> List[Raw]:
+        results = self.model.predict(list(frames), conf=conf, verbose=False)
+        return [
+            (r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy(),
+             r.boxes.cls.cpu().numpy().astype(np.int64))
+            for r in results
+        ]
+
+
+class OnnxBackend:
+    """
+    ONNX Runtime session with NumPy letterbox/NMS. `providers` selects the
+    execution provider, e.g. ["OpenVINOExecutionProvider"] on Intel boxes.
+    """
+
+    def __init__(self, model_path: str, input_size: int = 640, iou_thresh: float = 0.7,
+                 providers: Optional[Sequence[str]] = None, threads: Optional[int] = None, **_):
+        import onnxruntime as ort
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        available = ort.get_available_providers()
+        providers = [p for p in (providers or ["CPUExecutionProvider"]) if p in available]
+        self.session = ort.InferenceSession(model_path, sess_options=opts,
+                                            providers=providers or ["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_size = input_size
+        self.iou_thresh = iou_thresh
+        # Models exported with a fixed batch dimension run frame by frame;
+        # dynamic spatial dims allow minimal (rectangular) letterboxing
+        self.dynamic_batch = not isinstance(inp.shape[0], int)
+        self.dynamic_hw = not isinstance(inp.shape[2], int)
+        self._canvas = None
+        self._blob_buf = None   # reused (N, 3, H, W) input tensor
+
+    def _input_shape(self, frames) -> Tuple[int, int]:
+        if not self.dynamic_hw:
+            return self.input_size, self.input_size
+        shapes = {rect_shape(f.shape, self.input_size) for f in frames}
+        return shapes.pop() if len(shapes) == 1 else (self.input_size, self.input_size)
+
+    def _blob(self, frames):
+        n = len(frames)
+        th, tw = self._input_shape(frames)
+        if self._blob_buf is None or self._blob_buf.shape != (n, 3, th, tw):
+            self._blob_buf = np.empty((n, 3, th, tw), dtype=np.float32)
+        blob = self._blob_buf
+        metas = []
+        for i, f in enumerate(frames):
+            img, scale, pad = letterbox(f, (th, tw), out=self._canvas)
+            self._canvas = img
+            # BGR HWC uint8 -> RGB CHW float in [0, 1]
+            np.multiply(img[..., ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=blob[i])
+            metas.append((scale, pad, f.shape))
+        return blob, metas
+
+    def predict(self, frames: Sequence[np.ndarray], conf: float) -> List[Raw]:
+        if not self.dynamic_batch and len(frames) > 1:
+            return [r for f in frames for r in self.predict([f], conf)]
+        blob, metas = self._blob(frames)
+        pred = self.session.run(None, {self.input_name: blob})[0]
+        return [
+            decode_yolov8(p, conf, self.iou_thresh, scale, pad, shape)
+            for p, (scale, pad, shape) in zip(pred, metas)
+        ]
+
+
+# ---------- Model export / quantization ----------
+def export_onnx(pt_path: str, imgsz: int = 640, dynamic: bool = True) -> str:
+    """Export a YOLOv8 .pt once; later calls reuse the .onnx next to it."""
+    onnx_path = os.path.splitext(pt_path)[0] + ".onnx"
+    if os.path.exists(onnx_path):
+        return onnx_path
+    from ultralytics import YOLO
+    return YOLO(pt_path).export(format="onnx", imgsz=imgsz, dynamic=dynamic, simplify=True)
+
+
+def quantize_int8(onnx_path: str) -> str:
+    """
+    Dynamic INT8 weight quantization (no calibration set needed).
+    Cached as <name>.int8.onnx.
+    """
+    out_path = os.path.splitext(onnx_path)[0] + ".int8.onnx"
+    if os.path.exists(out_path):
+        return out_path
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    quantize_dynamic(onnx_path, out_path, weight_type=QuantType.QUInt8)
+    return out_path
+
+
+def resolve_onnx_model(model_path: str, int8: bool = False, imgsz: int = 640) -> str:
+    if not model_path.endswith(".onnx"):
+        model_path = export_onnx(model_path, imgsz=imgsz)
+    if int8 and not model_path.endswith(".int8.onnx"):
+        model_path = quantize_int8(model_path)
+    return model_path
+
+
+BACKENDS = {
+    "yolov8": "ultralytics",
+    "yolov8-onnx": "onnx",
+    "yolov8-onnx-int8": "onnx-int8",
+}
+
+
+def make_backend(kind: str = "ultralytics", model_path: str = "yolov8n.pt", **kwargs):
+    """
+    :param kind: "ultralytics", "onnx" or "onnx-int8"
+    """
+    if kind == "ultralytics":
+        return UltralyticsBackend(model_path, **kwargs)
+    if kind in ("onnx", "onnx-int8"):
+        path = resolve_onnx_model(model_path, int8=(kind == "onnx-int8"),
+                                  imgsz=kwargs.get("input_size", 640))
+        return OnnxBackend(path, **kwargs)
+    raise ValueError(f"Unknown inference backend: {kind}")
@@ -1,24 +1,102 @@
 import cv2
-from typing import Generator, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Generator, List, NamedTuple, Optional, Tuple
+import threading
 import time
+import numpy as np
+
+
+class Frame(NamedTuple):
+    """
+    One captured frame. Unpacks as (frame_id, ts, frame) like before.
+    """
+    frame_id: int
+    ts: float           # capture timestamp (time.time())
+    frame: np.ndarray
+
+    @property
+    def age(self) -> float:
+        """Seconds since capture."""
+        return time.time() - self.ts
+
+
+def pacer(fps: Optional[float]) -> Generator[None, None, None]:
+    """
+    Deadline-based throttle: each next() sleeps only for what is left of the
+    frame period, and resyncs instead of bursting after falling behind.
+    """
+    period = 1.0 / fps if fps else 0.0
+    deadline = time.monotonic()
+    yield
+    while True:
+        if period:
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -period:
+                deadline = time.monotonic()
+        yield
+
+
+def is_live_source(source) -> bool:
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return True
+    return isinstance(source, str) and source.split("://", 1)[0].lower() in ("rtsp", "rtmp", "http", "https", "udp", "tcp")
+
 
 class CameraStream:
     """
     Handles video capture from file or RTSP/USB camera.
     Yields frames with timestamps and frame IDs.
+
+    In threaded mode a background thread decodes into a bounded ring buffer,
+    so decode overlaps with inference and consumers always get the freshest frame.
     """
 
-    def __init__(self, source: str, fps: Optional[int] = None, warmup_time: float = 1.0):
+    def __init__(self, source: str, fps: Optional[int] = None, warmup_time: float = 1.0,
+                 threaded: bool = True, buffer_size: int = 2, policy: Optional[str] = None,
+                 reuse_buffers: bool = False, resize_to: Optional[Tuple[int, int]] = None):
         """
         :param source: Path to video file or RTSP/USB camera index (e.g., 0, 1)
         :param fps: Target FPS (None = use source FPS)
         :param warmup_time: Seconds to wait before starting capture
+        :param threaded: Decode on a background thread
+        :param buffer_size: Ring buffer capacity (threaded mode)
+        :param policy: "drop_oldest" (live feeds) or "block" (files); None = pick by source
+        :param reuse_buffers: Decode into a fixed pool of preallocated arrays. A yielded
+            frame is only valid until the next one is requested; copy it to keep it.
+        :param resize_to: (width, height) to downscale to right after decode
         """
         self.source = source
         self.fps = fps
         self.cap = None
         self.frame_id = 0
         self.warmup_time = warmup_time
+        self.threaded = threaded
+        self.buffer_size = max(1, buffer_size)
+        self.policy = policy or ("drop_oldest" if is_live_source(source) else "block")
+        if self.policy not in ("drop_oldest", "block"):
+            raise ValueError(f"Unknown buffer policy: {self.policy}")
+
+        self.dropped = 0
+        self.last_frame_age = 0.0
+        self._buf = deque()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._eof = False
+        self._thread = None
+
+        self.reuse_buffers = reuse_buffers
+        self.resize_to = tuple(resize_to) if resize_to else None
+        # Threaded: buffer_size queued + 1 held by the consumer + 1 being decoded
+        self._pool_size = self.buffer_size + 2 if threaded else 2
+        self._free = deque()
+        self._allocated = 0
+        self._ring: List[Optional[np.ndarray]] = [None] * self._pool_size
+        self._ring_idx = 0
+        self._raw = None  # full-size decode target when resizing
 
     def open(self):
         self.cap = cv2.VideoCapture(self.source)
@@ -27,27 +105,313 @@ class CameraStream:
         if self.fps is None:
             self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 15
         time.sleep(self.warmup_time)
+        if self.threaded:
+            # Fresh stop event per reader: a reader still blocked in read()
+            # after release() must not be revived by a later open()
+            self._stop = threading.Event()
+            self._eof = False
+            self._thread = threading.Thread(target=self._reader, args=(self.cap, self._stop),
+                                            name=f"camera:{self.source}", daemon=True)
+            self._thread.start()
+
+    def _read(self, out: Optional[np.ndarray] = None, cap=None) -> Optional[Frame]:
+        """Decode the next frame, into `out` when given (no allocation)."""
+        cap = self.cap if cap is None else cap
+        if self.resize_to is None:
+            ret, frame = cap.read(image=out) if out is not None else cap.read()
+        else:
+            ret, raw = cap.read(image=self._raw) if self._raw is not None else cap.read()
+            if ret:
+                self._raw = raw if self.reuse_buffers else None
+                if out is not None:
+                    frame = cv2.resize(raw, self.resize_to, dst=out, interpolation=cv2.INTER_AREA)
+                else:
+                    frame = cv2.resize(raw, self.resize_to, interpolation=cv2.INTER_AREA)
+        if not ret:
+            return None
+        self.frame_id += 1
+        return Frame(self.frame_id, time.time(), frame)
+
+    def _read_ring(self) -> Optional[Frame]:
+        """Consumer-driven decode cycling through a fixed ring of buffers."""
+        if not self.reuse_buffers:
+            return self._read()
+        f = self._read(self._ring[self._ring_idx])
+        if f is not None:
+            self._ring[self._ring_idx] = f.frame
+            self._ring_idx = (self._ring_idx + 1) % self._pool_size
+        return f
 
-    def frames(self) -> Generator[tuple, None, None]:
+    def _take_buffer(self) -> Tuple[bool, Optional[np.ndarray]]:
         """
-        Generator yielding (frame_id, timestamp, frame_bgr)
+        (ok, buffer) for the reader thread; buffer None = allocate a new one.
+        Call with self._cond held.
         """
+        if not self.reuse_buffers:
+            return True, None
+        if self._free:
+            return True, self._free.popleft()
+        if self._allocated < self._pool_size:
+            self._allocated += 1
+            return True, None
+        if self.policy == "drop_oldest" and self._buf:
+            self.dropped += 1
+            return True, self._buf.popleft().frame
+        return False, None
+
+    def read(self, out: Optional[np.ndarray] = None) -> Optional[Frame]:
+        """Decode one frame synchronously (into `out` when given); None at end of stream."""
+        if self.threaded:
+            raise RuntimeError("read() needs an unthreaded stream (threaded=False)")
         if self.cap is None:
             self.open()
+        return self._read(out)
 
-        while True:
-            ret, frame = self.cap.read()
-            if not ret:
-                break
-            ts = time.time()
-            self.frame_id += 1
-            yield self.frame_id, ts, frame
+    def _reader(self, cap, stop: threading.Event):
+        """
+        Owns `cap` and releases it on exit, so release() never closes the
+        capture under a read() that is still blocked (e.g. a stalled RTSP feed).
+        """
+        pace = pacer(self.fps)
+        next(pace)
+        try:
+            while not stop.is_set():
+                with self._cond:
+                    ok, out = self._take_buffer()
+                    while not ok and not stop.is_set():
+                        self._cond.wait(0.1)
+                        ok, out = self._take_buffer()
+                if not ok:
+                    return
+                f = self._read(out, cap)
+                with self._cond:
+                    if stop.is_set():
+                        return
+                    if f is None:
+                        self._eof = True
+                        self._cond.notify_all()
+                        return
+                    if self.policy == "block":
+                        while len(self._buf) >= self.buffer_size and not stop.is_set():
+                            self._cond.wait(0.1)
+                    elif len(self._buf) >= self.buffer_size:
+                        self._buf.popleft()
+                        self.dropped += 1
+                    self._buf.append(f)
+                    self._cond.notify_all()
+                next(pace)
+        finally:
+            cap.release()
+
+    def frames(self) -> Generator[Frame, None, None]:
+        """
+        Generator yielding Frame(frame_id, timestamp, frame_bgr)
+        """
+        if self.cap is None:
+            self.open()
 
-            # Optional: throttle to target FPS
-            if self.fps:
-                time.sleep(1.0 / self.fps)
+        if not self.threaded:
+            pace = pacer(self.fps)
+            next(pace)
+            while self.cap is not None:
+                f = self._read_ring()
+                if f is None:
+                    break
+                self.last_frame_age = f.age
+                yield f
+                next(pace)
+            return
+
+        held = None
+        while True:
+            with self._cond:
+                if held is not None and self.reuse_buffers:
+                    self._free.append(held)  # consumer is done with the previous frame
+                    held = None
+                while not self._buf and not self._eof and not self._stop.is_set():
+                    self._cond.wait(0.1)
+                if not self._buf:
+                    break
+                f = self._buf.popleft()
+                self._cond.notify_all()
+            held = f.frame
+            self.last_frame_age = f.age
+            yield f
 
     def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        reader, self._thread = self._thread, None
+        if reader is not None and reader is not threading.current_thread():
+            reader.join(timeout=1.0)
+        self._buf.clear()
+        self._free.clear()
+        self._allocated = 0
+        self._ring = [None] * self._pool_size
+        self._raw = None
         if self.cap:
-            self.cap.release()
-            self.cap = None
\ No newline at end of file
+            # A threaded stream's capture is released by its reader, which may
+            # still be blocked in read() past the join timeout
+            if reader is None:
+                self.cap.release()
+            self.cap = None
+
+
+class FrameSet(NamedTuple):
+    """Time-aligned frames of all approaches for one tick."""
+    tick: int
+    ts: float                   # reference capture time
+    frames: Dict[str, Frame]    # approach_id -> Frame
+    missing: Tuple[str, ...]    # approaches without a frame within tolerance
+
+    @property
+    def skew(self) -> float:
+        ts = [f.ts for f in self.frames.values()]
+        return max(ts) - min(ts) if ts else 0.0
+
+
+class CameraGroup:
+    """
+    Opens one stream per approach in parallel and yields time-aligned
+    FrameSets, so the detector and controller see one coherent snapshot
+    of the intersection per tick.
+    """
+
+    def __init__(self, sources: Dict[str, str], fps: Optional[int] = None,
+                 skew_tolerance: float = 0.05, on_missing: str = "stale",
+                 timeout_s: float = 0.5, history: int = 4):
+        """
+        :param sources: approach_id -> video path / RTSP url / device index
+        :param fps: Target FPS per stream (None = source FPS)
+        :param skew_tolerance: Max capture-time difference (s) to the reference frame
+        :param on_missing: "stale" (reuse last frame), "partial" (omit) or "drop" (skip the set)
+        :param timeout_s: How long to wait for a slow stream before emitting without it
+        :param history: Recent frames kept per stream for alignment
+        """
+        if on_missing not in ("stale", "partial", "drop"):
+            raise ValueError(f"Unknown missing-frame policy: {on_missing}")
+        self.sources = dict(sources)
+        self.approach_ids = list(self.sources)
+        self.skew_tolerance = skew_tolerance
+        self.on_missing = on_missing
+        self.timeout_s = timeout_s
+        self.streams = {
+            a: CameraStream(src, fps=fps, warmup_time=0.0, threaded=False)
+            for a, src in self.sources.items()
+        }
+        self.dropped_sets = 0
+
+        self._hist = {a: deque(maxlen=history) for a in self.approach_ids}
+        self._last = {a: None for a in self.approach_ids}   # last emitted Frame
+        self._ended = {a: False for a in self.approach_ids}
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, cfg: dict, **kwargs) -> "CameraGroup":
+        """Build from the full config.yaml dict (intersection.approaches[].camera_url)."""
+        inter = cfg["intersection"]
+        sources = {a["id"]: a["camera_url"] for a in inter["approaches"]}
+        return cls(sources, fps=inter.get("fps"), **kwargs)
+
+    def open(self):
+        # Open all streams concurrently; a slow RTSP handshake doesn't delay the others
+        with ThreadPoolExecutor(max_workers=len(self.streams)) as pool:
+            list(pool.map(lambda s: s.open(), self.streams.values()))
+        self._stop.clear()
+        for a in self.approach_ids:
+            t = threading.Thread(target=self._worker, args=(a,), name=f"camera-group:{a}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _worker(self, approach_id: str):
+        try:
+            for f in self.streams[approach_id].frames():
+                if self._stop.is_set():
+                    break
+                with self._cond:
+                    self._hist[approach_id].append(f)
+                    self._cond.notify_all()
+        finally:
+            # Release on the decoding thread; cap.release() must not race cap.read()
+            self.streams[approach_id].release()
+            with self._cond:
+                self._ended[approach_id] = True
+                self._cond.notify_all()
+
+    def _fresh(self, approach_id: str) -> List[Frame]:
+        last = self._last[approach_id]
+        return [f for f in self._hist[approach_id] if last is None or f.frame_id > last.frame_id]
+
+    def _wait_ready(self) -> Optional[List[str]]:
+        """Wait until every live stream has a fresh frame, or the timeout expires."""
+        deadline = None
+        while not self._stop.is_set():
+            ready = [a for a in self.approach_ids if self._fresh(a)]
+            if ready and all(a in ready or self._ended[a] for a in self.approach_ids):
+                return ready
+            if not ready and all(self._ended.values()):
+                return None
+            if ready:
+                deadline = deadline or time.monotonic() + self.timeout_s
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return ready
+                self._cond.wait(remaining)
+            else:
+                self._cond.wait(0.1)
+        return None
+
+    def _align(self, tick: int, ready: List[str]) -> Optional[FrameSet]:
+        # Reference = newest frame of the slowest stream
+        t_ref = min(self._hist[a][-1].ts for a in ready)
+        frames: Dict[str, Frame] = {}
+        missing = []
+        for a in self.approach_ids:
+            fresh = self._fresh(a)
+            best = min(fresh, key=lambda f: abs(f.ts - t_ref)) if fresh else None
+            if best is not None and abs(best.ts - t_ref) <= self.skew_tolerance:
+                frames[a] = best
+                self._last[a] = best
+            else:
+                if fresh:
+                    self._last[a] = fresh[-1]  # consume out-of-tolerance frames
+                missing.append(a)
+        if missing:
+            if self.on_missing == "drop":
+                self.dropped_sets += 1
+                return None
+            if self.on_missing == "stale":
+                for a in missing:
+                    if self._last[a] is not None:
+                        frames[a] = self._last[a]
+        return FrameSet(tick, t_ref, frames, tuple(missing))
+
+    def framesets(self) -> Generator[FrameSet, None, None]:
+        if not self._workers:
+            self.open()
+        tick = 0
+        while True:
+            with self._cond:
+                ready = self._wait_ready()
+                if ready is None:
+                    break
+                fset = self._align(tick + 1, ready)
+            if fset is None or not fset.frames:
+                continue
+            tick += 1
+            yield fset
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for t in self._workers:
+            if t is not threading.current_thread():
+                t.join(timeout=1.0)
+        if not self._workers:
+            for s in self.streams.values():
+                s.release()
+        self._workers = []
@@ -1,7 +1,7 @@
-import random
-from typing import List
-from smart_signal.types import Detection
-from ultralytics import YOLO
+from typing import List, Sequence
+import numpy as np
+from smart_signal.types import Detection, DetectionBatch, CLASS_CODES
+from smart_signal.perception.backends import BACKENDS, make_backend
 
 class StubDetector:
     """
@@ -11,36 +11,34 @@ class StubDetector:
     def __init__(self, classes=None, conf_thresh=0.3):
         self.classes = classes or ["car", "bus", "truck", "motorcycle"]
         self.conf_thresh = conf_thresh
+        self._class_codes = np.array([CLASS_CODES[c] for c in self.classes], dtype=np.uint8)
+        self._rng = np.random.default_rng()
 
     def infer(self, frame, frame_id: int, approach_id: str) -> List[Detection]:
+        return self.detect(frame, frame_id, approach_id).to_detections()
+
+    def detect(self, frame, frame_id: int, approach_id: str) -> DetectionBatch:
         h, w, _ = frame.shape
-        detections = []
-        num_vehicles = random.randint(0, 5)
-        for _ in range(num_vehicles):
-            x1 = random.randint(0, w // 2)
-            y1 = random.randint(0, h // 2)
-            x2 = x1 + random.randint(30, 100)
-            y2 = y1 + random.randint(30, 100)
-            cls = random.choice(self.classes)
-            score = round(random.uniform(self.conf_thresh, 1.0), 2)
-            detections.append(
-                Detection(
-                    bbox=(x1, y1, x2, y2),
-                    score=score,
-                    cls=cls,
-                    frame_id=frame_id,
-                    approach_id=approach_id
-                )
-            )
-        return detections
+        rng = self._rng
+        n = int(rng.integers(0, 6))
+        x1 = rng.integers(0, w // 2 + 1, n)
+        y1 = rng.integers(0, h // 2 + 1, n)
+        x2 = x1 + rng.integers(30, 101, n)
+        y2 = y1 + rng.integers(30, 101, n)
+        codes = self._class_codes[rng.integers(0, len(self.classes), n)]
+        scores = np.round(rng.uniform(self.conf_thresh, 1.0, n), 2)
+        return DetectionBatch.from_arrays(
+            np.stack([x1, y1, x2, y2], axis=1), scores, codes, approach_id, frame_id
+        )
 
 
 class YOLODetector:
     """
     Real YOLOv8 detector for actual vehicle detection.
+    `backend` is "ultralytics" (PyTorch), "onnx" or "onnx-int8" (ONNX Runtime).
     """
-    def __init__(self, model_path="yolov8n.pt", conf_thresh=0.3):
-        self.model = YOLO(model_path)
+    def __init__(self, model_path="yolov8n.pt", conf_thresh=0.3, backend="ultralytics", **backend_kwargs):
+        self.backend = make_backend(backend, model_path, **backend_kwargs)
         self.conf_thresh = conf_thresh
         self.class_map = {
             0: "person",
@@ -51,30 +49,61 @@ class YOLODetector:
             7: "truck"
         }
 
+        # Vectorized YOLO class id -> our class code (-1 = class we ignore)
+        self._lut = np.full(max(self.class_map) + 1, -1, dtype=np.int64)
+        for cls_id, name in self.class_map.items():
+            self._lut[cls_id] = CLASS_CODES["pedestrian" if name == "person" else name]
+
     def infer(self, frame, frame_id: int, approach_id: str) -> List[Detection]:
-        results = self.model.predict(frame, conf=self.conf_thresh, verbose=False)
-        detections = []
-        for r in results:
-            for box in r.boxes:
-                cls_id = int(box.cls)
-                if cls_id not in self.class_map:
-                    continue
+        return self.detect(frame, frame_id, approach_id).to_detections()
+
+    def detect(self, frame, frame_id: int, approach_id: str) -> DetectionBatch:
+        return self.detect_batch([frame], [frame_id], [approach_id])[0]
+
+    def infer_batch(self, frames: Sequence, frame_ids: Sequence[int],
+                    approach_ids: Sequence[str]) -> List[List[Detection]]:
+        return [b.to_detections() for b in self.detect_batch(frames, frame_ids, approach_ids)]
 
-                # Map YOLO label to our allowed types
-                label = self.class_map[cls_id]
-                if label == "person":
-                    label = "pedestrian"
+    def detect_batch(self, frames: Sequence, frame_ids: Sequence[int],
+                     approach_ids: Sequence[str]) -> List[DetectionBatch]:
+        """
+        Run all approach frames of one tick through a single predict call.
+        Returns one batch per input frame, in input order.
+        """
+        if not len(frames):
+            return []
+        results = self.backend.predict(frames, self.conf_thresh)
+        return [
+            self._to_batch(*r, fid, aid)
+            for r, fid, aid in zip(results, frame_ids, approach_ids)
+        ]
 
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                score = float(box.conf)
+    def _to_batch(self, xyxy, conf, cls_ids, frame_id: int, approach_id: str) -> DetectionBatch:
+        codes = np.full(cls_ids.shape, -1, dtype=np.int64)
+        known = (cls_ids >= 0) & (cls_ids < len(self._lut))
+        codes[known] = self._lut[cls_ids[known]]
+        keep = codes >= 0
+        return DetectionBatch.from_arrays(
+            xyxy[keep],
+            conf[keep],
+            codes[keep],
+            approach_id,
+            frame_id
+        )
 
-                detections.append(
-                    Detection(
-                        bbox=(x1, y1, x2, y2),
-                        score=score,
-                        cls=label,
-                        frame_id=frame_id,
-                        approach_id=approach_id
-                    )
-                )
-        return detections
\ No newline at end of file
+
+def build_detector(cfg: dict):
+    """
+    Build a detector from the `perception.detector` section of config.yaml.
+    `name` is "stub", "yolov8", "yolov8-onnx" or "yolov8-onnx-int8".
+    """
+    name = cfg.get("name", "stub")
+    conf_thresh = cfg.get("conf_thresh", 0.3)
+    if name == "stub":
+        classes = [c for c in cfg.get("classes", []) if c in CLASS_CODES] or None
+        return StubDetector(classes=classes, conf_thresh=conf_thresh)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown detector: {name}")
+    kwargs = {k: cfg[k] for k in ("input_size", "iou_thresh", "providers", "threads") if k in cfg}
+    return YOLODetector(model_path=cfg.get("model_path", "yolov8n.pt"), conf_thresh=conf_thresh,
+                        backend=BACKENDS[name], **kwargs)
@@ -1,9 +1,42 @@
 # smart_signal/perception/lane_mapper.py
 
-from typing import List, Dict, Tuple
-from smart_signal.control.config import LANE_ROIS
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple, Union
+import shapely
+from shapely import STRtree
+from shapely.geometry import LineString, Polygon, box, shape
+from smart_signal.control.config import LANE_ROIS, LaneROI
+from smart_signal.types import DetectionBatch, LaneStat, Track, approach_code
+from smart_signal.utils.geometry import box_centroids
+from smart_signal.utils.spatial import RectGrid
 import numpy as np
 
+def load_lane_features(geojson_path: str) -> List[Tuple[Dict, Polygon]]:
+    """Read (properties, polygon) pairs for every lane feature in a GeoJSON file."""
+    with open(geojson_path) as f:
+        fc = json.load(f)
+    return [
+        (feat.get("properties", {}), shape(feat["geometry"]))
+        for feat in fc.get("features", [])
+        if feat.get("properties", {}).get("type", "lane") == "lane"
+    ]
+
+def load_stoplines(geojson_path: str) -> Dict[str, LineString]:
+    """lane_id -> stop line for features with properties.type == "stopline"."""
+    with open(geojson_path) as f:
+        fc = json.load(f)
+    return {
+        feat["properties"]["lane_id"]: shape(feat["geometry"])
+        for feat in fc.get("features", [])
+        if feat.get("properties", {}).get("type") == "stopline"
+    }
+
+def roi_polygons(rois: List[LaneROI] = LANE_ROIS) -> Dict[str, Polygon]:
+    return {roi.name: box(roi.x1, roi.y1, roi.x2, roi.y2) for roi in rois}
+
 def bbox_centroid(bbox: Tuple[float, float, float, float]) -> Tuple[int, int]:
     x1, y1, x2, y2 = bbox
     cx = int((x1 + x2) / 2)
@@ -13,13 +46,287 @@ def bbox_centroid(bbox: Tuple[float, float, float, float]) -> Tuple[int, int]:
 def point_in_rect(px: int, py: int, x1: int, y1: int, x2: int, y2: int) -> bool:
     return (x1 <= px <= x2) and (y1 <= py <= y2)
 
-def count_by_lane(tracks: List) -> Dict[str, int]:
-    # tracks: objects with .bbox and .track_id
+def count_by_lane(tracks: Union[List, DetectionBatch]) -> Dict[str, int]:
+    # tracks: objects with .bbox and .track_id, or a DetectionBatch
+    if isinstance(tracks, DetectionBatch):
+        boxes = tracks.boxes
+    else:
+        boxes = [tr.bbox for tr in tracks]
+    # int() truncation as in bbox_centroid
+    return _count_centroids_by_lane(np.trunc(box_centroids(boxes)))
+
+@lru_cache(maxsize=8)
+def _roi_grid(rects: Tuple[Tuple[float, float, float, float], ...]) -> RectGrid:
+    return RectGrid.auto(rects)
+
+def _count_centroids_by_lane(c: np.ndarray) -> Dict[str, int]:
     counts = {roi.approach: 0 for roi in LANE_ROIS}
-    for tr in tracks:
-        cx, cy = bbox_centroid(tr.bbox)
-        for roi in LANE_ROIS:
-            if point_in_rect(cx, cy, roi.x1, roi.y1, roi.x2, roi.y2):
-                counts[roi.approach] += 1
-                break
-    return counts
\ No newline at end of file
+    if not len(c) or not LANE_ROIS:
+        return counts
+    grid = _roi_grid(tuple((r.x1, r.y1, r.x2, r.y2) for r in LANE_ROIS))
+    pi, ri = grid.query(c)  # only ROIs sharing a grid cell are tested
+    # First matching ROI wins, as in the per-track loop
+    first = np.full(len(c), len(LANE_ROIS), dtype=np.int64)
+    np.minimum.at(first, pi, ri)
+    first = first[first < len(LANE_ROIS)]
+    for roi_idx, n in enumerate(np.bincount(first, minlength=len(LANE_ROIS)).tolist()):
+        counts[LANE_ROIS[roi_idx].approach] += n
+    return counts
+
+
+# ---------- Label rasters ----------
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "smart_signal")
+
+def rasterize_polygons(polygons: List[Polygon], shape) -> np.ndarray:
+    """
+    Label image for a frame of `shape`: 0 outside every polygon, i + 1 inside
+    polygons[i]. The first polygon wins where they overlap.
+    """
+    h, w = shape[:2]
+    dtype = np.uint8 if len(polygons) < 255 else np.uint16
+    labels = np.zeros((h, w), dtype=dtype)
+    for idx in range(len(polygons) - 1, -1, -1):
+        # Pixel (x, y) is in a lane when its centre (x + .5, y + .5) is,
+        # tested only inside the polygon's bounding box
+        minx, miny, maxx, maxy = polygons[idx].bounds
+        x0, y0 = max(int(np.floor(minx)), 0), max(int(np.floor(miny)), 0)
+        x1, y1 = min(int(np.ceil(maxx)), w), min(int(np.ceil(maxy)), h)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        xs, ys = np.meshgrid(np.arange(x0, x1) + 0.5, np.arange(y0, y1) + 0.5)
+        inside = shapely.intersects_xy(polygons[idx], xs, ys)
+        labels[y0:y1, x0:x1][inside] = idx + 1
+    return labels
+
+def cached_label_image(polygons: List[Polygon], shape, source_key: str,
+                       cache_dir: Optional[str] = None) -> np.ndarray:
+    """
+    `rasterize_polygons` with an on-disk cache keyed by `source_key` (e.g. a
+    hash of the GeoJSON) and the resolution, so restarts skip rasterizing.
+    """
+    h, w = shape[:2]
+    if cache_dir is None:
+        return rasterize_polygons(polygons, shape)
+    path = os.path.join(cache_dir, f"labels-{source_key}-{w}x{h}.npy")
+    if os.path.exists(path):
+        try:
+            labels = np.load(path)
+            if labels.shape == (h, w):
+                return labels
+        except (OSError, ValueError):
+            pass  # unreadable cache entry: rebuild below
+    labels = rasterize_polygons(polygons, shape)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, labels)
+    os.replace(tmp, path)
+    return labels
+
+def roi_label_image(shape, rois: List[LaneROI] = LANE_ROIS,
+                    cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> np.ndarray:
+    """Label image of the rectangular LANE_ROIS (i + 1 = rois[i])."""
+    key = hashlib.sha1(repr([(r.name, r.x1, r.y1, r.x2, r.y2) for r in rois]).encode()).hexdigest()[:16]
+    return cached_label_image(list(roi_polygons(rois).values()), shape, f"roi-{key}", cache_dir)
+
+
+# ---------- LaneMapper (GeoJSON lanes) ----------
+class LaneMapper:
+    """
+    Lane polygons from a GeoJSON FeatureCollection (properties: approach_id,
+    lane_id, movement). Points are mapped to lanes with one STRtree query over
+    prepared polygons per call. After `use_raster(frame_shape)` lookups and
+    occupancy use a precomputed lane label image instead.
+    """
+
+    def __init__(self, geojson_path: str, spillback_occupancy: float = 0.85,
+                 cache_dir: Optional[str] = None):
+        """
+        :param geojson_path: Lane polygons in frame pixel coordinates
+        :param spillback_occupancy: Occupancy above which a lane reports spillback
+        :param cache_dir: Where label rasters are cached (default: ~/.cache/smart_signal)
+        """
+        features = load_lane_features(geojson_path)
+        if not features:
+            raise ValueError(f"No lane features in {geojson_path}")
+        self.lane_ids: List[str] = [props["lane_id"] for props, _ in features]
+        self.lane_approaches: List[str] = [props.get("approach_id", "unknown") for props, _ in features]
+        self.lane_movements: List[str] = [props.get("movement", "through") for props, _ in features]
+        self.lane_polygons: Dict[str, Polygon] = {lid: poly for lid, (_, poly) in zip(self.lane_ids, features)}
+        self.stoplines: Dict[str, LineString] = load_stoplines(geojson_path)
+        self.spillback_occupancy = spillback_occupancy
+
+        self._geoms = np.array([poly for _, poly in features], dtype=object)
+        shapely.prepare(self._geoms)
+        self._tree = STRtree(self._geoms)
+        self._areas = shapely.area(self._geoms)
+        self._lane_approach_codes = np.array([approach_code(a) for a in self.lane_approaches],
+                                             dtype=np.uint16)
+
+        with open(geojson_path, "rb") as f:
+            self._source_key = hashlib.sha1(f.read()).hexdigest()[:16]
+        self.cache_dir = cache_dir if cache_dir is not None else DEFAULT_CACHE_DIR
+        self._labels: Dict[Tuple[int, int], np.ndarray] = {}
+        self._lane_pixels: Dict[Tuple[int, int], np.ndarray] = {}
+        # Per lane: (x0, y0, its pixel mask over its bounding box, scratch of that size)
+        self._lane_crops: Dict[Tuple[int, int], List[Tuple[int, int, np.ndarray, np.ndarray]]] = {}
+        self.frame_shape: Optional[Tuple[int, int]] = None
+
+    # ---------- Label raster ----------
+    def label_image(self, shape) -> np.ndarray:
+        """(H, W) lane labels for this resolution: 0 = no lane, i + 1 = lane_ids[i]."""
+        key = (int(shape[0]), int(shape[1]))
+        labels = self._labels.get(key)
+        if labels is None:
+            labels = self._labels[key] = cached_label_image(
+                list(self._geoms), key, self._source_key, self.cache_dir)
+            self._lane_pixels[key] = np.bincount(labels.ravel(), minlength=len(self.lane_ids) + 1)
+            self._lane_crops[key] = [self._lane_crop(labels, i + 1) for i in range(len(self.lane_ids))]
+        return labels
+
+    @staticmethod
+    def _lane_crop(labels: np.ndarray, label: int) -> Tuple[int, int, np.ndarray, np.ndarray]:
+        ys, xs = np.nonzero(labels == label)
+        if not len(ys):
+            return 0, 0, np.zeros((0, 0), dtype=bool), np.zeros((0, 0), dtype=bool)
+        y0, x0 = int(ys.min()), int(xs.min())
+        mask = labels[y0:ys.max() + 1, x0:xs.max() + 1] == label
+        return x0, y0, mask, np.empty_like(mask)
+
+    def use_raster(self, shape):
+        """Map points and measure occupancy on the label image of this frame shape."""
+        self.frame_shape = (int(shape[0]), int(shape[1]))
+        self.label_image(self.frame_shape)
+
+    def _raster_lanes(self, pts: np.ndarray) -> np.ndarray:
+        labels = self.label_image(self.frame_shape)
+        h, w = labels.shape
+        xi = np.floor(pts[:, 0]).astype(np.int64)
+        yi = np.floor(pts[:, 1]).astype(np.int64)
+        inb = (xi >= 0) & (xi < w) & (yi >= 0) & (yi < h)
+        lanes = np.full(len(pts), -1, dtype=np.int64)
+        lanes[inb] = labels[yi[inb], xi[inb]].astype(np.int64) - 1
+        return lanes
+
+    def lanes_for_points(self, points, approach_codes=None) -> np.ndarray:
+        """
+        Lane index per (x, y) point, -1 outside every lane (edges count as
+        inside; the first lane in file order wins on overlap). With
+        `approach_codes`, points only match lanes of their own approach
+        (code 0, "unknown", matches any).
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.frame_shape is not None and len(pts):
+            lanes = self._raster_lanes(pts)
+            if approach_codes is None:
+                return lanes
+            # The raster keeps one lane per pixel; re-query only the points
+            # whose pixel belongs to another approach's lane
+            codes = np.asarray(approach_codes)
+            hit = lanes >= 0
+            bad = hit & (codes != 0) & (self._lane_approach_codes[np.where(hit, lanes, 0)] != codes)
+            if bad.any():
+                lanes[bad] = self._tree_lanes(pts[bad], codes[bad])
+            return lanes
+        return self._tree_lanes(pts, approach_codes)
+
+    def _tree_lanes(self, pts: np.ndarray, approach_codes=None) -> np.ndarray:
+        lanes = np.full(len(pts), -1, dtype=np.int64)
+        if not len(pts):
+            return lanes
+        pi, li = self._tree.query(shapely.points(pts), predicate="intersects")
+        if approach_codes is not None:
+            codes = np.asarray(approach_codes)[pi]
+            ok = (codes == 0) | (codes == self._lane_approach_codes[li])
+            pi, li = pi[ok], li[ok]
+        lanes[:] = len(self.lane_ids)
+        np.minimum.at(lanes, pi, li)
+        lanes[lanes == len(self.lane_ids)] = -1
+        return lanes
+
+    def get_approach_for_point(self, x: float, y: float) -> str:
+        lane = self.lanes_for_points([(x, y)])[0]
+        return self.lane_approaches[lane] if lane >= 0 else "unknown"
+
+    def approach_codes_for_points(self, points) -> np.ndarray:
+        """Interned approach code per point (0 = "unknown")."""
+        lanes = self.lanes_for_points(points)
+        codes = np.zeros(len(lanes), dtype=np.uint16)
+        inside = lanes >= 0
+        codes[inside] = self._lane_approach_codes[lanes[inside]]
+        return codes
+
+    def assign_tracks(self, tracks: List[Track]) -> Dict[str, List[Track]]:
+        """lane_id -> tracks whose centroid lies in that lane (every lane present)."""
+        assignments: Dict[str, List[Track]] = {lid: [] for lid in self.lane_ids}
+        if not tracks:
+            return assignments
+        centroids = box_centroids([t.bbox for t in tracks])
+        codes = np.array([approach_code(t.approach_id) for t in tracks], dtype=np.uint16)
+        for tr, lane in zip(tracks, self.lanes_for_points(centroids, codes).tolist()):
+            if lane >= 0:
+                assignments[self.lane_ids[lane]].append(tr)
+        return assignments
+
+    def compute_lane_stats(self, lane_assignments: Dict[str, List[Track]]) -> List[LaneStat]:
+        """
+        Snapshot per lane: queue_len is the number of tracks in the lane,
+        occupancy the share of lane pixels covered by boxes (raster mode) or
+        the clipped box area over lane area. Arrival rate needs history; see
+        LaneStatsEngine for rolling statistics.
+        """
+        occupancy = self.occupancy(lane_assignments)
+        stats = []
+        for idx, lid in enumerate(self.lane_ids):
+            tracks = lane_assignments.get(lid, [])
+            stats.append(LaneStat(
+                approach_id=self.lane_approaches[idx],
+                lane_id=lid,
+                movement=self.lane_movements[idx],
+                queue_len=len(tracks),
+                arrival_rate_vph=0.0,
+                occupancy=float(occupancy[idx]),
+                spillback=bool(occupancy[idx] >= self.spillback_occupancy),
+            ))
+        return stats
+
+    def occupancy(self, lane_assignments: Dict[str, List[Track]]) -> np.ndarray:
+        """
+        Instantaneous occupancy per lane (lane_ids order): share of lane pixels
+        under track boxes in raster mode, else clipped box area over lane area.
+        """
+        if self.frame_shape is not None:
+            return self._covered_pixels(lane_assignments)
+        occ = np.zeros(len(self.lane_ids))
+        for idx, lid in enumerate(self.lane_ids):
+            tracks = lane_assignments.get(lid, [])
+            if tracks:
+                boxes = np.array([t.bbox for t in tracks], dtype=np.float64)
+                covered = float(np.sum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])))
+                occ[idx] = min(1.0, covered / max(self._areas[idx], 1e-6))
+        return occ
+
+    def _covered_pixels(self, lane_assignments: Dict[str, List[Track]]) -> np.ndarray:
+        """
+        Per lane, the fraction of its pixels under the union of its own
+        tracks' boxes, drawn into a scratch mask the size of the lane's
+        bounding box (overlapping queued vehicles count once).
+        """
+        self.label_image(self.frame_shape)
+        key = self.frame_shape
+        occ = np.zeros(len(self.lane_ids))
+        for idx, (x0, y0, mask, scratch) in enumerate(self._lane_crops[key]):
+            tracks = lane_assignments.get(self.lane_ids[idx])
+            if not tracks or not mask.size:
+                continue
+            h, w = mask.shape
+            scratch.fill(False)
+            for t in tracks:
+                # Pixel rows/cols [floor(y1), ceil(y2)) x [floor(x1), ceil(x2))
+                x1, y1, x2, y2 = t.bbox
+                cx1, cx2 = min(max(int(np.floor(x1)) - x0, 0), w), min(max(int(np.ceil(x2)) - x0, 0), w)
+                cy1, cy2 = min(max(int(np.floor(y1)) - y0, 0), h), min(max(int(np.ceil(y2)) - y0, 0), h)
+                scratch[cy1:cy2, cx1:cx2] = True
+            np.logical_and(scratch, mask, out=scratch)
+            occ[idx] = np.count_nonzero(scratch)
+        return occ / np.maximum(self._lane_pixels[key][1:], 1)
@@ -0,0 +1,209 @@
+# smart_signal/perception/lane_stats.py
+"""
+Rolling per-lane statistics (queue length, arrival rate, occupancy,
+spillback) updated incrementally from each frame's lane assignments.
+"""
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+from smart_signal.types import LaneStat, Track
+from smart_signal.perception.lane_mapper import LaneMapper
+
+
+class RollingWindow:
+    """
+    Per-lane sums over a sliding time window kept in fixed-width bins of a
+    ring buffer; adding and reading are O(lanes), independent of history.
+    """
+
+    def __init__(self, n_lanes: int, window_s: float = 60.0, bin_s: float = 1.0):
+        self.bin_s = bin_s
+        self.n_bins = max(1, int(math.ceil(window_s / bin_s)))
+        self.window_s = self.n_bins * bin_s
+        self.bins = np.zeros((n_lanes, self.n_bins))
+        self.total = np.zeros(n_lanes)
+        self._bin: Optional[int] = None
+        self._t0: Optional[float] = None
+
+    def advance(self, t: float):
+        b = int(t // self.bin_s)
+        if self._bin is None:
+            self._bin, self._t0 = b, t
+            return
+        steps = b - self._bin
+        if steps <= 0:
+            return
+        # Expire the bins the window slid over (at most one full turn)
+        for k in range(1, min(steps, self.n_bins) + 1):
+            idx = (self._bin + k) % self.n_bins
+            self.total -= self.bins[:, idx]
+            self.bins[:, idx] = 0.0
+        self._bin = b
+
+    def add(self, values: np.ndarray, t: float):
+        self.advance(t)
+        self.bins[:, self._bin % self.n_bins] += values
+        self.total += values
+
+    def span(self, t: float) -> float:
+        """Seconds of data the window currently covers."""
+        if self._t0 is None:
+            return 0.0
+        return min(self.window_s, max(t - self._t0, 0.0))
+
+
+@dataclass
+class LaneStatsState:
+    """
+    Array copy of a LaneStatsEngine's current totals; cheap enough to publish
+    every frame and turned into LaneStats only when a decision needs them.
+    """
+    queue: np.ndarray
+    arrivals: np.ndarray
+    arrival_span_s: float
+    occupancy: np.ndarray
+    occupancy_span_s: float
+
+
+class _TrackState:
+    __slots__ = ("x", "y", "t", "speed", "n")
+
+    def __init__(self, x: float, y: float, t: float):
+        self.x, self.y, self.t = x, y, t
+        self.speed = 0.0   # EMA of centroid speed, px/s
+        self.n = 1
+
+
+class LaneStatsEngine:
+    """
+    Feed `update(lane_assignments, now_s)` once per frame; `snapshot()`
+    returns current LaneStat objects at any time, `state()` the raw arrays
+    for `stats_from_state()` later.
+
+    - arrival_rate_vph: vehicles counted per hour over the window. A vehicle
+      is counted once (Track.is_counted) when its centroid crosses the lane's
+      stop line, or on entering the lane if the GeoJSON has no stop line.
+    - queue_len: tracks in the lane whose smoothed speed is below
+      `stationary_px_s`.
+    - occupancy: time-weighted over the window.
+    - spillback: time-weighted occupancy >= `spillback_occupancy`.
+    """
+
+    def __init__(self, lane_mapper: LaneMapper, window_s: float = 60.0, bin_s: float = 1.0,
+                 stationary_px_s: float = 8.0, speed_alpha: float = 0.3,
+                 spillback_occupancy: float = 0.85, stale_s: float = 5.0):
+        self.mapper = lane_mapper
+        self.lane_ids = list(lane_mapper.lane_ids)
+        self._lane_idx = {lid: i for i, lid in enumerate(self.lane_ids)}
+        n = len(self.lane_ids)
+        self.arrivals = RollingWindow(n, window_s, bin_s)
+        self.occupancy = RollingWindow(n, window_s, bin_s)
+        self.stationary_px_s = stationary_px_s
+        self.speed_alpha = speed_alpha
+        self.spillback_occupancy = spillback_occupancy
+        self.stale_s = stale_s
+
+        # Stop line per lane as (p0, direction, length^2) for a side test
+        self._stoplines: Dict[int, tuple] = {}
+        for lid, line in lane_mapper.stoplines.items():
+            if lid in self._lane_idx:
+                (x0, y0), (x1, y1) = line.coords[0], line.coords[-1]
+                d = (x1 - x0, y1 - y0)
+                self._stoplines[self._lane_idx[lid]] = ((x0, y0), d, d[0] ** 2 + d[1] ** 2)
+
+        self._tracks: Dict[int, _TrackState] = {}
+        self._queue = np.zeros(n, dtype=np.int64)
+        self._now: Optional[float] = None
+        self._next_prune = 0.0
+
+    def _crossed(self, lane: int, st: _TrackState, x: float, y: float) -> bool:
+        (x0, y0), (dx, dy), len2 = self._stoplines[lane]
+        side_prev = dx * (st.y - y0) - dy * (st.x - x0)
+        side_now = dx * (y - y0) - dy * (x - x0)
+        if side_prev == 0 or (side_prev > 0) == (side_now > 0):
+            return False
+        # Crossing point must fall within the stop line segment
+        f = side_prev / (side_prev - side_now)
+        cx, cy = st.x + f * (x - st.x), st.y + f * (y - st.y)
+        u = ((cx - x0) * dx + (cy - y0) * dy) / max(len2, 1e-9)
+        return 0.0 <= u <= 1.0
+
+    def update(self, lane_assignments: Dict[str, List[Track]], now_s: float):
+        dt = 0.0 if self._now is None else max(now_s - self._now, 0.0)
+        self._now = now_s
+        n = len(self.lane_ids)
+        arrivals = np.zeros(n)
+        queue = np.zeros(n, dtype=np.int64)
+
+        for lid, tracks in lane_assignments.items():
+            lane = self._lane_idx.get(lid)
+            if lane is None:
+                continue
+            has_stopline = lane in self._stoplines
+            for tr in tracks:
+                x1, y1, x2, y2 = tr.bbox
+                x, y = (x1 + x2) / 2.0, (y1 + y2) / 2.0
+                st = self._tracks.get(tr.track_id)
+                if st is None:
+                    st = self._tracks[tr.track_id] = _TrackState(x, y, now_s)
+                    crossed = not has_stopline
+                else:
+                    step = now_s - st.t
+                    if step > 0:
+                        v = math.hypot(x - st.x, y - st.y) / step
+                        st.speed = v if st.n == 1 else st.speed + self.speed_alpha * (v - st.speed)
+                        st.n += 1
+                    crossed = not has_stopline or self._crossed(lane, st, x, y)
+                    st.x, st.y, st.t = x, y, now_s
+                if crossed and not tr.is_counted:
+                    tr.is_counted = True
+                    arrivals[lane] += 1
+                if st.n > 1 and st.speed < self.stationary_px_s:
+                    queue[lane] += 1
+
+        self._queue = queue
+        self.arrivals.add(arrivals, now_s)
+        self.occupancy.add(self.mapper.occupancy(lane_assignments) * dt, now_s)
+
+        # Forget tracks that left; amortized over stale_s
+        if now_s >= self._next_prune:
+            cutoff = now_s - self.stale_s
+            self._tracks = {k: v for k, v in self._tracks.items() if v.t >= cutoff}
+            self._next_prune = now_s + self.stale_s
+
+    def state(self, now_s: Optional[float] = None) -> LaneStatsState:
+        now = self._now if now_s is None else now_s
+        if now is None:
+            now = 0.0
+        self.arrivals.advance(now)
+        self.occupancy.advance(now)
+        return LaneStatsState(
+            queue=self._queue.copy(),
+            arrivals=self.arrivals.total.copy(),
+            arrival_span_s=self.arrivals.span(now),
+            occupancy=self.occupancy.total.copy(),
+            occupancy_span_s=self.occupancy.span(now),
+        )
+
+    def stats_from_state(self, state: LaneStatsState) -> List[LaneStat]:
+        n = len(self.lane_ids)
+        span = state.arrival_span_s
+        rate = state.arrivals * (3600.0 / span) if span > 0 else np.zeros(n)
+        occ_span = state.occupancy_span_s
+        occ = np.clip(state.occupancy / occ_span, 0.0, 1.0) if occ_span > 0 else np.zeros(n)
+        return [
+            LaneStat(
+                approach_id=self.mapper.lane_approaches[i],
+                lane_id=lid,
+                movement=self.mapper.lane_movements[i],
+                queue_len=int(state.queue[i]),
+                arrival_rate_vph=float(rate[i]),
+                occupancy=float(occ[i]),
+                spillback=bool(occ[i] >= self.spillback_occupancy),
+            )
+            for i, lid in enumerate(self.lane_ids)
+        ]
+
+    def snapshot(self, now_s: Optional[float] = None) -> List[LaneStat]:
+        return self.stats_from_state(self.state(now_s))
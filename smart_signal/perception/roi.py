@@ -0,0 +1,159 @@
+# smart_signal/perception/roi.py
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+from shapely.geometry import Polygon
+from smart_signal.types import Detection, DetectionBatch
+from smart_signal.control.config import LANE_ROIS
+from smart_signal.perception.lane_mapper import LaneMapper, rasterize_polygons, roi_label_image, roi_polygons
+
+
+class ROIGate:
+    """
+    Pre-detection stage: crops frames to the union bounding box of the lane
+    polygons and skips inference when nothing moves inside them.
+    """
+
+    def __init__(self, polygons: Iterable[Polygon], pad: int = 16, mask_outside: bool = False,
+                 motion_thresh: int = 25, min_motion_frac: float = 0.002,
+                 downscale: int = 4, max_skip: int = 30,
+                 labeler: Optional[Callable[[Tuple[int, int]], np.ndarray]] = None):
+        """
+        :param polygons: Lane polygons in frame pixel coordinates
+        :param pad: Pixels added around the union bounding box
+        :param mask_outside: Also black out pixels outside the polygons
+        :param motion_thresh: Grey-level difference counted as motion
+        :param min_motion_frac: Fraction of lane pixels that must move to run inference
+        :param downscale: Factor applied before frame differencing
+        :param max_skip: Force a detector run after this many gated frames so
+            stationary (queued) vehicles are re-detected
+        :param labeler: (H, W) -> cached lane label image of the polygons
+            (e.g. LaneMapper.label_image); rasterized here when omitted
+        """
+        self.polygons: List[Polygon] = list(polygons)
+        if not self.polygons:
+            raise ValueError("ROIGate needs at least one lane polygon")
+        self.pad = pad
+        self.mask_outside = mask_outside
+        self.motion_thresh = motion_thresh
+        self.min_motion_frac = min_motion_frac
+        self.downscale = max(1, int(downscale))
+        self.max_skip = max_skip
+        self.labeler = labeler
+
+        self._shape = None
+        self._crop = (0, 0, 0, 0)
+        self._mask = None          # full-res lane mask inside the crop
+        self._motion_mask = None   # downscaled lane mask
+        self._prev = None
+        self._skipped = 0
+        self.frames_seen = 0
+        self.frames_gated = 0
+
+    @classmethod
+    def from_lane_mapper(cls, mapper: LaneMapper, **kwargs) -> "ROIGate":
+        """Gate on the mapper's lanes, reusing its cached label raster."""
+        return cls(mapper.lane_polygons.values(), labeler=mapper.label_image, **kwargs)
+
+    @classmethod
+    def from_geojson(cls, geojson_path: str, **kwargs) -> "ROIGate":
+        return cls.from_lane_mapper(LaneMapper(geojson_path), **kwargs)
+
+    @classmethod
+    def from_lane_rois(cls, rois=None, **kwargs) -> "ROIGate":
+        rois = rois if rois is not None else LANE_ROIS
+        return cls(roi_polygons(rois).values(), labeler=lambda shape: roi_label_image(shape, rois), **kwargs)
+
+    def _build(self, shape):
+        h, w = shape[:2]
+        minx = min(p.bounds[0] for p in self.polygons)
+        miny = min(p.bounds[1] for p in self.polygons)
+        maxx = max(p.bounds[2] for p in self.polygons)
+        maxy = max(p.bounds[3] for p in self.polygons)
+        x1 = int(max(0, np.floor(minx) - self.pad))
+        y1 = int(max(0, np.floor(miny) - self.pad))
+        x2 = int(min(w, np.ceil(maxx) + self.pad))
+        y2 = int(min(h, np.ceil(maxy) + self.pad))
+        if x2 <= x1 or y2 <= y1:
+            raise ValueError(f"Lane polygons lie outside the {w}x{h} frame")
+        self._crop = (x1, y1, x2, y2)
+
+        # Same pixel-centre rule as the lane label raster
+        labels = self.labeler((h, w)) if self.labeler is not None else rasterize_polygons(self.polygons, shape)
+        labels = labels[y1:y2, x1:x2]
+        mask = np.where(labels > 0, 255, 0).astype(np.uint8)
+        self._mask = mask
+        ds = self.downscale
+        self._motion_mask = cv2.resize(mask, ((x2 - x1) // ds or 1, (y2 - y1) // ds or 1),
+                                       interpolation=cv2.INTER_NEAREST) > 0
+        self._shape = shape
+        self._prev = None
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        return self._crop[0], self._crop[1]
+
+    def _has_motion(self, crop) -> bool:
+        small = cv2.resize(crop, self._motion_mask.shape[::-1], interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        prev, self._prev = self._prev, gray
+        if prev is None:
+            return True
+        moving = cv2.absdiff(gray, prev) > self.motion_thresh
+        n_lane = int(self._motion_mask.sum()) or 1
+        return int(np.count_nonzero(moving & self._motion_mask)) >= self.min_motion_frac * n_lane
+
+    def prepare(self, frame) -> Optional[np.ndarray]:
+        """
+        Returns the lane crop to run inference on, or None when the lanes are
+        static and inference can be skipped. Add `offset` to boxes found in the crop.
+        """
+        if frame.shape != self._shape:
+            self._build(frame.shape)
+        self.frames_seen += 1
+        x1, y1, x2, y2 = self._crop
+        crop = frame[y1:y2, x1:x2]
+
+        if not self._has_motion(crop) and self._skipped < self.max_skip:
+            self._skipped += 1
+            self.frames_gated += 1
+            return None
+        self._skipped = 0
+
+        if self.mask_outside:
+            crop = cv2.bitwise_and(crop, crop, mask=self._mask)
+        return crop
+
+
+class GatedDetector:
+    """
+    Wraps any detector with an ROIGate. `detect` returns None for a gated
+    frame: the detector did not run, so the tracker should coast that
+    approach (SORTTracker `observed=`) rather than see an empty frame.
+    Pass a dict of gates to keep separate motion state per approach camera.
+    """
+
+    def __init__(self, detector, gate: Union[ROIGate, Dict[str, ROIGate]]):
+        self.detector = detector
+        self.gate = gate
+
+    def _gate_for(self, approach_id: str) -> Optional[ROIGate]:
+        if isinstance(self.gate, dict):
+            return self.gate.get(approach_id)
+        return self.gate
+
+    def infer(self, frame, frame_id: int, approach_id: str) -> List[Detection]:
+        batch = self.detect(frame, frame_id, approach_id)
+        return [] if batch is None else batch.to_detections()
+
+    def detect(self, frame, frame_id: int, approach_id: str) -> Optional[DetectionBatch]:
+        gate = self._gate_for(approach_id)
+        if gate is None:
+            return self.detector.detect(frame, frame_id, approach_id)
+        crop = gate.prepare(frame)
+        if crop is None:
+            return None
+        batch = self.detector.detect(crop, frame_id, approach_id)
+        ox, oy = gate.offset
+        batch.boxes += np.array([ox, oy, ox, oy], dtype=np.float32)
+        return batch
@@ -0,0 +1,63 @@
+# smart_signal/perception/scheduler.py
+from typing import Dict, Iterable, NamedTuple
+
+
+class MotionStat(NamedTuple):
+    n_tracks: int = 0
+    speed: float = 0.0   # mean track speed, px/frame
+    sigma: float = 0.0   # max Kalman position std-dev, px
+
+
+def merge_motion(stats: Iterable[tuple]) -> MotionStat:
+    """Combine per-approach stats for a camera that covers several approaches."""
+    n, speed_sum, sigma = 0, 0.0, 0.0
+    for k, v, s in stats:
+        n += k
+        speed_sum += v * k
+        sigma = max(sigma, s)
+    return MotionStat(n, speed_sum / n if n else 0.0, sigma)
+
+
+class DetectionScheduler:
+    """
+    Decides per approach whether the detector runs on a frame or the tracker
+    coasts on Kalman prediction. The detection interval shrinks from
+    `max_interval` (empty approach) to 1 (busy, fast or uncertain approach).
+    """
+
+    def __init__(self, max_interval: int = 8, busy_tracks: int = 8,
+                 speed_ref: float = 6.0, sigma_ref: float = 8.0):
+        """
+        :param max_interval: Frames between detector runs on a quiet approach
+        :param busy_tracks: Track count at which we detect every frame
+        :param speed_ref: Mean speed (px/frame) at which we detect every frame
+        :param sigma_ref: Position uncertainty (px) at which we detect every frame
+        """
+        self.max_interval = max(1, int(max_interval))
+        self.busy_tracks = busy_tracks
+        self.speed_ref = speed_ref
+        self.sigma_ref = sigma_ref
+        self._last_run: Dict[str, int] = {}
+
+    def interval_for(self, stat: MotionStat) -> int:
+        load = max(stat.n_tracks / self.busy_tracks,
+                   stat.speed / self.speed_ref,
+                   stat.sigma / self.sigma_ref)
+        load = min(max(load, 0.0), 1.0)
+        return max(1, round(self.max_interval - load * (self.max_interval - 1)))
+
+    def should_detect(self, approach_id: str, frame_id: int, stat: MotionStat) -> bool:
+        """
+        Re-evaluated every frame, so growing uncertainty while coasting pulls
+        the next detector run forward.
+        """
+        last = self._last_run.get(approach_id)
+        if last is None:
+            return True
+        return frame_id - last >= self.interval_for(stat)
+
+    def mark_run(self, approach_id: str, frame_id: int):
+        self._last_run[approach_id] = frame_id
+
+    def reset(self):
+        self._last_run.clear()
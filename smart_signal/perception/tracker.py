@@ -1,50 +1,82 @@
 # smart_signal/perception/tracker.py
-from typing import List, Optional, Tuple
+from typing import Collection, Dict, List, Optional, Tuple, Union
 import numpy as np
-from smart_signal.types import Detection, Track
-from smart_signal.utils.geometry import iou
+from smart_signal.types import (Detection, DetectionBatch, Track, CLASS_NAMES, CLASS_CODES,
+                                APPROACH_IDS, approach_code)
+from smart_signal.utils.geometry import pair_iou
+from smart_signal.utils.assignment import (connected_components, greedy_pairs, group_indices,
+                                          linear_assignment)
+from smart_signal.utils.spatial import overlapping_pairs
+
+Detections = Union[DetectionBatch, List[Detection]]
+
+def _as_batch(detections: Detections, frame_id: int) -> DetectionBatch:
+    if isinstance(detections, DetectionBatch):
+        return detections
+    return DetectionBatch.from_detections(detections, frame_id)
+
+def _rows(batch: DetectionBatch):
+    """Iterate (bbox, cls, approach_id) as plain Python values."""
+    for bbox, c, a in zip(batch.boxes.tolist(), batch.cls_codes.tolist(),
+                          batch.approach_codes.tolist()):
+        yield tuple(bbox), CLASS_NAMES[c], APPROACH_IDS[a]
 
 # ---------- IOUTracker (approach-aware) ----------
 class IOUTracker:
+    """
+    Matches each detection one-to-one against the last box of tracks with the
+    same (cls, approach_id). Unmatched tracks coast on their last box until
+    they are `max_age` frames old.
+    """
     def __init__(self, iou_thresh=0.3, max_age=10):
         self.iou_thresh = iou_thresh
         self.max_age = max_age
         self.tracks: List[Track] = []
         self.next_id = 1
+        self._keys = np.empty((0, 2), dtype=np.int64)  # (cls code, approach code) per track
 
-    def update(self, detections: List[Detection], frame_id: int) -> List[Track]:
-        updated_tracks = []
-        for det in detections:
-            best_iou = 0
-            best_track = None
-            for track in self.tracks:
-                # ✅ Match only if same class AND same approach
-                if track.cls != det.cls or track.approach_id != det.approach_id:
-                    continue
-                s = iou(track.bbox, det.bbox)
-                if s > best_iou:
-                    best_iou, best_track = s, track
-            if best_iou >= self.iou_thresh and best_track:
-                best_track.bbox = det.bbox
-                best_track.last_seen_frame = frame_id
-                updated_tracks.append(best_track)
-            else:
-                new_track = Track(
-                    track_id=self.next_id,
-                    bbox=det.bbox,
-                    cls=det.cls,
-                    approach_id=det.approach_id,
-                    last_seen_frame=frame_id
-                )
-                self.next_id += 1
-                updated_tracks.append(new_track)
+    def update(self, detections: Detections, frame_id: int) -> List[Track]:
+        batch = _as_batch(detections, frame_id)
+        matched = np.zeros(len(batch), dtype=bool)
+        if self.tracks and len(batch):
+            # Grid-pruned: only overlapping pairs are scored
+            track_boxes = np.array([t.bbox for t in self.tracks], dtype=np.float32)
+            ti, dj = overlapping_pairs(track_boxes, batch.boxes)
+            # ✅ Match only if same class AND same approach
+            d_keys = np.stack([batch.cls_codes, batch.approach_codes], axis=1).astype(np.int64)
+            same = (self._keys[ti] == d_keys[dj]).all(axis=1)
+            ti, dj = ti[same], dj[same]
+            ious = pair_iou(track_boxes[ti], batch.boxes[dj])
+            boxes = batch.boxes.tolist()
+            for i, j in zip(*greedy_pairs(ti, dj, ious, self.iou_thresh)):
+                track = self.tracks[i]
+                track.bbox = tuple(boxes[j])
+                track.last_seen_frame = frame_id
+                matched[j] = True
+
+        fresh = batch.select(~matched)
+        for bbox, cls, approach_id in _rows(fresh):
+            self.tracks.append(Track(
+                track_id=self.next_id,
+                bbox=bbox,
+                cls=cls,
+                approach_id=approach_id,
+                last_seen_frame=frame_id
+            ))
+            self.next_id += 1
+        keys = np.concatenate([self._keys, np.stack([fresh.cls_codes, fresh.approach_codes],
+                                                    axis=1).astype(np.int64)])
 
-        # age-out
-        self.tracks = [t for t in updated_tracks if frame_id - t.last_seen_frame <= self.max_age]
+        # age-out (unmatched tracks survive until max_age)
+        alive = np.array([frame_id - t.last_seen_frame <= self.max_age for t in self.tracks], dtype=bool)
+        self.tracks = [t for t, a in zip(self.tracks, alive) if a]
+        self._keys = keys[alive] if len(alive) else keys
         return self.tracks
 
 
 # ---------- SORT-style tracker (approach-aware) ----------
+_GATED_COST = 1e6
+
 class KalmanBox:
     def __init__(self, bbox: Tuple[float,float,float,float]):
         self._init_state(bbox)
@@ -88,90 +120,212 @@ class KalmanBox:
         return (float(x1), float(y1), float(x2), float(y2))
 
 
-class _STrack:
-    def __init__(self, track_id: int, det: Detection):
-        self.id = track_id
-        self.cls = det.cls
-        self.approach_id = det.approach_id
-        self.kf = KalmanBox(det.bbox)
-        self.last_seen_frame = det.frame_id
+class KalmanBank:
+    """
+    Constant-velocity Kalman filters for many boxes at once (same model as
+    KalmanBox). Row i of `x` (N,8) and `P` (N,8,8) is one track; H only
+    selects (cx, cy, w, h), so H-products reduce to slicing.
+    """
+    F = np.eye(8) + np.eye(8, k=4)   # dt = 1
+    Q = np.eye(8) * 0.01
+    R = np.eye(4) * 1.0
+    P0 = np.eye(8) * 10.0
+
+    def __init__(self, capacity: int = 64):
+        self.x = np.zeros((capacity, 8))
+        self.P = np.zeros((capacity, 8, 8))
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def add(self, bboxes) -> np.ndarray:
+        """Append new tracks initialised from (K,4) xyxy boxes; returns their rows."""
+        b = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        k = len(b)
+        if self.n + k > len(self.x):
+            cap = max(2 * len(self.x), self.n + k)
+            self.x = np.concatenate([self.x, np.zeros((cap - len(self.x), 8))])
+            self.P = np.concatenate([self.P, np.zeros((cap - len(self.P), 8, 8))])
+        rows = np.arange(self.n, self.n + k)
+        self.x[rows] = 0.0
+        self.x[rows, :4] = _xyxy_to_cxcywh(b)
+        self.P[rows] = self.P0
+        self.n += k
+        return rows
 
     def predict(self):
-        self.kf.predict()
+        x, P = self.x[:self.n], self.P[:self.n]
+        x[:] = x @ self.F.T
+        P[:] = self.F @ P @ self.F.T + self.Q   # one batched product for all tracks
 
-    def update(self, det: Detection):
-        self.kf.update(det.bbox)
-        self.last_seen_frame = det.frame_id
+    def update(self, rows, bboxes):
+        """Correct the given rows with (K,4) xyxy measurements."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return
+        z = _xyxy_to_cxcywh(np.asarray(bboxes, dtype=float).reshape(-1, 4))
+        x, P = self.x[rows], self.P[rows]
+        S = P[:, :4, :4] + self.R                      # H P H^T + R
+        PHt = P[:, :, :4]                              # P H^T
+        # K = P H^T S^-1, via S K^T = H P (S symmetric)
+        K = np.linalg.solve(S, PHt.transpose(0, 2, 1)).transpose(0, 2, 1)
+        y = z - x[:, :4]
+        self.x[rows] = x + np.einsum("nij,nj->ni", K, y)
+        self.P[rows] = P - K @ P[:, :4, :]             # (I - K H) P
+
+    def compact(self, keep: np.ndarray):
+        """Drop rows where `keep` is False, preserving order."""
+        keep = np.asarray(keep, dtype=bool)
+        k = int(keep.sum())
+        self.x[:k] = self.x[:self.n][keep]
+        self.P[:k] = self.P[:self.n][keep]
+        self.n = k
+
+    def bboxes(self) -> np.ndarray:
+        """(N,4) xyxy boxes of all rows."""
+        c = self.x[:self.n, :2]
+        half = self.x[:self.n, 2:4] / 2
+        return np.hstack([c - half, c + half])
 
-    def bbox(self) -> Tuple[float,float,float,float]:
-        return self.kf.bbox()
+
+def _xyxy_to_cxcywh(b: np.ndarray) -> np.ndarray:
+    return np.hstack([(b[:, :2] + b[:, 2:]) / 2, b[:, 2:] - b[:, :2]])
+
+
+class _STrack:
+    """Track identity; its filter state is row `i` of the tracker's KalmanBank."""
+
+    def __init__(self, track_id: int, cls: str, approach_id: str, frame_id: int):
+        self.id = track_id
+        self.cls = cls
+        self.approach_id = approach_id
+        self.key = (CLASS_CODES[cls], approach_code(approach_id))
+        self.last_seen_frame = frame_id
+        self.coasted = 0  # frames predicted while its approach was not detected
+        self.public: Optional[Track] = None  # same object every frame, so flags persist
 
 
 class SORTTracker:
     def __init__(self, iou_thresh=0.3, max_age=15):
         self.iou_thresh = iou_thresh
         self.max_age = max_age
-        self._tracks: List[_STrack] = []
+        self._tracks: List[_STrack] = []   # aligned with self.bank rows
+        self.bank = KalmanBank()
         self._next_id = 1
 
-    def update(self, detections: List[Detection], frame_id: int) -> List[Track]:
+    def update(self, detections: Detections, frame_id: int,
+               observed: Optional[Collection[str]] = None) -> List[Track]:
+        """
+        :param observed: Approaches the detector ran on this frame (None = all).
+            Tracks of other approaches coast on prediction and are not aged.
+        """
+        batch = _as_batch(detections, frame_id)
+
         # Predict all
-        for t in self._tracks:
-            t.predict()
-
-        # Build IoU cost matrix (class + approach aware)
-        if len(self._tracks) and len(detections):
-            cost = np.zeros((len(self._tracks), len(detections)), dtype=float)
-            for i, t in enumerate(self._tracks):
-                tb = t.bbox()
-                for j, d in enumerate(detections):
-                    if t.cls != d.cls or t.approach_id != d.approach_id:
-                        cost[i, j] = 1.0  # force non-match
-                    else:
-                        cost[i, j] = 1.0 - iou(tb, d.bbox)
-        else:
-            cost = np.empty((0, 0))
-
-        # Greedy assign
-        assigned_t, assigned_d = set(), set()
-        pairs = []
-        if cost.size:
-            flat = [(cost[i, j], i, j) for i in range(cost.shape[0]) for j in range(cost.shape[1])]
-            for c, i, j in sorted(flat):
-                if i in assigned_t or j in assigned_d:
-                    continue
-                iou_ = 1.0 - c
-                if iou_ >= self.iou_thresh:
-                    pairs.append((i, j))
-                    assigned_t.add(i)
-                    assigned_d.add(j)
+        self.bank.predict()
+        if observed is not None:
+            for t in self._tracks:
+                if t.approach_id not in observed:
+                    t.coasted += 1
+
+        # Optimal assignment, solved independently per (cls, approach) block
+        pairs = self._associate(batch) if self._tracks and len(batch) else []
 
         # Update matched
-        for i, j in pairs:
-            self._tracks[i].update(detections[j])
+        if pairs:
+            ti, dj = np.array(pairs, dtype=np.int64).T
+            self.bank.update(ti, batch.boxes[dj])
+            for i in ti.tolist():
+                t = self._tracks[i]
+                t.last_seen_frame = frame_id
+                t.coasted = 0
 
         # Unmatched detections => new tracks
-        for j, d in enumerate(detections):
-            if j not in assigned_d:
-                nt = _STrack(self._next_id, d)
+        new = np.ones(len(batch), dtype=bool)
+        if pairs:
+            new[dj] = False
+        if new.any():
+            fresh = batch.select(new)
+            self.bank.add(fresh.boxes)
+            for _, cls, approach_id in _rows(fresh):
+                self._tracks.append(_STrack(self._next_id, cls, approach_id, frame_id))
                 self._next_id += 1
-                self._tracks.append(nt)
 
         # Prune aged tracks
-        alive = []
-        for t in self._tracks:
-            if frame_id - t.last_seen_frame <= self.max_age:
-                alive.append(t)
-        self._tracks = alive
+        keep = [frame_id - t.last_seen_frame - t.coasted <= self.max_age for t in self._tracks]
+        if not all(keep):
+            self.bank.compact(keep)
+            self._tracks = [t for t, k in zip(self._tracks, keep) if k]
 
-        # Return public Track list
+        # Return public Track list; the objects persist across frames so
+        # consumers can keep per-track flags such as is_counted
         out: List[Track] = []
-        for t in self._tracks:
-            out.append(Track(
-                track_id=t.id,
-                bbox=t.bbox(),
-                cls=t.cls,
-                approach_id=t.approach_id,
-                last_seen_frame=t.last_seen_frame
-            ))
-        return out
\ No newline at end of file
+        for t, bbox in zip(self._tracks, self.bank.bboxes().tolist()):
+            if t.public is None:
+                t.public = Track(
+                    track_id=t.id,
+                    bbox=tuple(bbox),
+                    cls=t.cls,
+                    approach_id=t.approach_id,
+                    last_seen_frame=t.last_seen_frame
+                )
+            else:
+                t.public.bbox = tuple(bbox)
+                t.public.last_seen_frame = t.last_seen_frame
+            out.append(t.public)
+        return out
+
+    def _associate(self, batch: DetectionBatch) -> List[Tuple[int, int]]:
+        """
+        Optimal assignment over the graph of gated (same cls and approach,
+        IoU >= iou_thresh) pairs; each connected component is solved alone,
+        which gives the same result as solving per (cls, approach) block.
+        """
+        track_boxes = self.bank.bboxes().astype(np.float32)
+        ti, dj = overlapping_pairs(track_boxes, batch.boxes)
+        t_keys = np.array([t.key for t in self._tracks], dtype=np.int64).reshape(-1, 2)
+        d_keys = np.stack([batch.cls_codes, batch.approach_codes], axis=1).astype(np.int64)
+        same = (t_keys[ti] == d_keys[dj]).all(axis=1)
+        ti, dj = ti[same], dj[same]
+        ious = pair_iou(track_boxes[ti], batch.boxes[dj])
+        ok = ious >= self.iou_thresh
+        ti, dj, ious = ti[ok], dj[ok], ious[ok]
+        if not len(ti):
+            return []
+
+        n_t = len(self._tracks)
+        comp = connected_components(n_t + len(batch), ti, n_t + dj)[ti]
+        _, inv, sizes = np.unique(comp, return_inverse=True, return_counts=True)
+        # Components with a single gated pair need no solver
+        single = sizes[inv] == 1
+        pairs = list(zip(ti[single].tolist(), dj[single].tolist()))
+        multi = np.flatnonzero(~single)
+        for edges in group_indices(inv[multi].tolist()).values():
+            e = multi[edges]
+            rows, r_inv = np.unique(ti[e], return_inverse=True)
+            cols, c_inv = np.unique(dj[e], return_inverse=True)
+            # Ungated pairs cost more than any full set of gated pairs, so the
+            # solver maximises the number of matches first, then IoU
+            cost = np.full((len(rows), len(cols)), _GATED_COST)
+            cost[r_inv, c_inv] = 1.0 - ious[e]
+            for r, c in zip(*linear_assignment(cost)):
+                if cost[r, c] < _GATED_COST:
+                    pairs.append((int(rows[r]), int(cols[c])))
+        return pairs
+
+    def coast(self, frame_id: int) -> List[Track]:
+        """Advance every track on Kalman prediction alone (no detector run)."""
+        return self.update([], frame_id, observed=())
+
+    def motion_summary(self) -> Dict[str, Tuple[int, float, float]]:
+        """
+        Per approach: (track count, mean speed in px/frame, max position sigma in px).
+        """
+        n = self.bank.n
+        speed = np.hypot(self.bank.x[:n, 4], self.bank.x[:n, 5])
+        sigma = np.sqrt(np.maximum(self.bank.P[:n, 0, 0], self.bank.P[:n, 1, 1]))
+        summary: Dict[str, Tuple[int, float, float]] = {}
+        for approach_id, rows in group_indices([t.approach_id for t in self._tracks]).items():
+            summary[approach_id] = (len(rows), float(speed[rows].mean()), float(sigma[rows].max()))
+        return summary
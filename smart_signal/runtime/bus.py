@@ -0,0 +1,131 @@
+# smart_signal/runtime/bus.py
+"""
+In-process publish/subscribe with MQTT-style topics, plus `LocalBroker`, a
+stand-in for the external broker that delivers JSON payloads from its own
+thread the way a network client would.
+"""
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+Handler = Callable[[str, Any], None]
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """MQTT matching: `+` is one level, a trailing `#` any number of levels."""
+    pp, tp = pattern.split("/"), topic.split("/")
+    for i, p in enumerate(pp):
+        if p == "#":
+            return True
+        if i >= len(tp) or (p != "+" and p != tp[i]):
+            return False
+    return len(pp) == len(tp)
+
+
+class EventBus:
+    """
+    Synchronous pub/sub: `publish` runs matching handlers on the caller's
+    thread, so delivery latency is just the handlers' run time. Handlers must
+    be quick and must not block; exceptions are counted, not propagated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: List[Tuple[str, Handler]] = []
+        self._routes: Dict[str, Tuple[Handler, ...]] = {}  # topic -> handlers, rebuilt lazily
+        self.errors = 0
+
+    def subscribe(self, pattern: str, handler: Handler) -> Callable[[], None]:
+        """Register `handler(topic, payload)`; returns an unsubscribe function."""
+        entry = (pattern, handler)
+        with self._lock:
+            self._subs.append(entry)
+            self._routes = {}
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subs:
+                    self._subs.remove(entry)
+                    self._routes = {}
+        return unsubscribe
+
+    def _handlers(self, topic: str) -> Tuple[Handler, ...]:
+        routes = self._routes
+        handlers = routes.get(topic)
+        if handlers is None:
+            with self._lock:
+                handlers = tuple(h for p, h in self._subs if topic_matches(p, topic))
+                self._routes[topic] = handlers
+        return handlers
+
+    def publish(self, topic: str, payload: Any) -> int:
+        """Deliver to every matching handler; returns how many were called."""
+        handlers = self._handlers(topic)
+        for h in handlers:
+            try:
+                h(topic, payload)
+            except Exception:
+                self.errors += 1
+        return len(handlers)
+
+
+class LocalBroker:
+    """
+    Loopback broker for tests and benchmarks: `publish` queues raw (JSON)
+    payloads, a delivery thread decodes them and forwards to the bus, optionally
+    after `delay_s` of simulated network latency.
+    """
+
+    def __init__(self, bus: EventBus, decoders: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 delay_s: float = 0.0):
+        """
+        :param decoders: topic pattern -> decoder for the raw payload
+            (default: json.loads)
+        """
+        self.bus = bus
+        self.decoders = decoders or {}
+        self.delay_s = delay_s
+        self.delivered = 0
+        self.dropped = 0
+        self._q: "queue.Queue[Optional[Tuple[float, str, Any]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LocalBroker":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._deliver, name="local-broker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._q.put(None)
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def publish(self, topic: str, payload):
+        self._q.put((time.monotonic() + self.delay_s, topic, payload))
+
+    def _decode(self, topic: str, payload):
+        for pattern, decode in self.decoders.items():
+            if topic_matches(pattern, topic):
+                return decode(payload)
+        return json.loads(payload) if isinstance(payload, (str, bytes, bytearray)) else payload
+
+    def _deliver(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            due, topic, payload = item
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                msg = self._decode(topic, payload)
+            except ValueError:
+                self.dropped += 1
+                continue
+            self.bus.publish(topic, msg)
+            self.delivered += 1
@@ -0,0 +1,133 @@
+# smart_signal/runtime/control_loop.py
+"""
+Signal control on its own clock. Perception publishes the latest lane
+statistics (or the raw state they are built from) into a `Snapshot`;
+`ControlLoop` wakes every `interval_s`, reads
+whatever is newest and recomputes splits, independent of frame rate and
+inference jitter.
+"""
+import threading
+import time
+from typing import Any, Callable, Generic, List, Optional, Tuple, TypeVar
+from smart_signal.types import EmergencyEvent, LaneStat, Splits
+
+T = TypeVar("T")
+
+
+class Snapshot(Generic[T]):
+    """Latest-value mailbox: writers overwrite, readers never block on history."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value: Optional[T] = None
+        self._ts = 0.0
+        self._version = 0
+
+    def publish(self, value: T, ts: Optional[float] = None):
+        with self._lock:
+            self._value = value
+            self._ts = time.monotonic() if ts is None else ts
+            self._version += 1
+
+    def latest(self) -> Tuple[int, float, Optional[T]]:
+        """(version, publish time, value); version 0 means nothing published yet."""
+        with self._lock:
+            return self._version, self._ts, self._value
+
+
+class ControlLoop:
+    """
+    Runs `optimizer.compute_splits` + `apply_emergency_priority` at a fixed
+    interval on a background thread. Each run has a latency budget; runs over
+    budget are counted in `overruns`, and missed wake-ups are skipped rather
+    than replayed. `wake()` runs an extra decision right away (preemption)
+    without shifting the schedule.
+    """
+
+    def __init__(self, optimizer, stats: Snapshot, interval_s: float = 1.0,
+                 budget_s: Optional[float] = None,
+                 emergencies: Optional[Callable[[], List[EmergencyEvent]]] = None,
+                 build_stats: Optional[Callable[[Any], List[LaneStat]]] = None):
+        """
+        :param stats: Snapshot holding the latest List[LaneStat], or what `build_stats` takes
+        :param budget_s: Allowed compute time per run (default: 20% of the interval)
+        :param emergencies: Returns the active emergency events for a run
+        :param build_stats: Turns the published value into List[LaneStat] when a run needs it
+        """
+        self.optimizer = optimizer
+        self.stats = stats
+        self.interval_s = interval_s
+        self.budget_s = budget_s if budget_s is not None else 0.2 * interval_s
+        self.emergencies = emergencies or (lambda: [])
+        self.build_stats = build_stats
+        self.splits = Snapshot()   # latest Splits, for overlays and actuation
+
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_latency_s = 0.0
+        self._seen_version = -1
+        self._had_emergencies = False
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def step(self) -> Optional[Splits]:
+        """One control decision from the newest stats; None until stats exist."""
+        t0 = time.perf_counter()
+        version, _, published = self.stats.latest()
+        emergencies = self.emergencies()
+        if not version:
+            return None
+        if version == self._seen_version and not emergencies and not self._had_emergencies:
+            # Nothing new since the last decision
+            return self.splits.latest()[2]
+        lane_stats = published if self.build_stats is None else self.build_stats(published)
+        splits = self.optimizer.compute_splits(lane_stats)
+        splits = self.optimizer.apply_emergency_priority(splits, emergencies)
+        self._seen_version = version
+        self._had_emergencies = bool(emergencies)
+        self.splits.publish(splits)
+        self.runs += 1
+        self.last_latency_s = time.perf_counter() - t0
+        if self.last_latency_s > self.budget_s:
+            self.overruns += 1
+        return splits
+
+    def _loop(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            self.step()
+            now = time.monotonic()
+            if now >= deadline:  # scheduled run, not an early wake()
+                deadline += self.interval_s
+                if now > deadline:
+                    # Fell behind: skip the missed ticks instead of bursting
+                    missed = int((now - deadline) // self.interval_s) + 1
+                    self.skipped += missed
+                    deadline += missed * self.interval_s
+            self._wake.wait(max(deadline - time.monotonic(), 0.0))
+            self._wake.clear()
+
+    def start(self) -> "ControlLoop":
+        if self._thread is None:
+            self._stop.clear()
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._loop, name="control-loop", daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Recompute now instead of at the next interval."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def current_splits(self) -> Splits:
+        splits = self.splits.latest()[2]
+        return splits if splits is not None else Splits(cycle_s=0.0, greens_s={})
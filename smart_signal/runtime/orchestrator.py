@@ -1,83 +1,240 @@
 import time
 import cv2
 import numpy as np
-from smart_signal.perception.camera import CameraStream
-from smart_signal.perception.detector import YOLODetector, StubDetector
-from smart_signal.perception.tracker import IOUTracker
+from smart_signal.perception.camera import CameraStream, CameraGroup
+from smart_signal.perception.detector import build_detector
+from smart_signal.perception.tracker import IOUTracker, SORTTracker
+from smart_signal.perception.roi import ROIGate, GatedDetector
+from smart_signal.perception.scheduler import DetectionScheduler, MotionStat, merge_motion
 from smart_signal.perception.lane_mapper import LaneMapper
+from smart_signal.perception.lane_stats import LaneStatsEngine
+from smart_signal.runtime.control_loop import ControlLoop, Snapshot
+from smart_signal.runtime.shm import SharedMemoryPerception
 from smart_signal.control.optimizer import SignalOptimizer
-from smart_signal.types import EmergencyEvent
+from smart_signal.control.phases import PhasePlan
+from smart_signal.control.emergency import PreemptionManager
+from smart_signal.runtime.bus import EventBus
+from smart_signal.types import DetectionBatch, EmergencyEvent, approach_code
 
 class Orchestrator:
     def __init__(self, config):
         self.cfg = config
-        self.cam = CameraStream(config["camera_source"], fps=config.get("fps", None))
-        # Choose detector type
-        if config.get("use_stub", False):
-            self.detector = StubDetector()
+        self.perception = None
+        # One synchronized stream per approach, or a single camera covering all of them
+        if config.get("camera_sources") and config.get("inference_workers", 0) > 0:
+            # Capture and inference in worker processes, frames in shared memory
+            self.cam = None
+            self.perception = SharedMemoryPerception(
+                config["camera_sources"], self._detector_cfg(config), fps=config.get("fps", None),
+                inference_workers=config["inference_workers"], resize_to=config.get("frame_size"))
+        elif config.get("camera_sources"):
+            self.cam = CameraGroup(config["camera_sources"], fps=config.get("fps", None),
+                                   skew_tolerance=config.get("skew_tolerance_s", 0.05),
+                                   on_missing=config.get("on_missing_frame", "stale"))
+        else:
+            # reuse_buffers: decode into preallocated arrays (flat RSS for 24/7 runs)
+            self.cam = CameraStream(config["camera_source"], fps=config.get("fps", None),
+                                    reuse_buffers=config.get("reuse_buffers", False),
+                                    resize_to=config.get("frame_size"))
+        # Choose detector type (built inside the inference workers in multi-process mode)
+        self.detector = None if self.perception else build_detector(self._detector_cfg(config))
+        # Optional: crop to the lane polygons and skip inference on static frames
+        if config.get("roi_gate", False) and self.detector is not None:
+            self.detector = GatedDetector(self.detector, self._roi_gates(config))
+        # Detect every N frames and coast on Kalman prediction in between
+        max_interval = config.get("detect_max_interval", 1) if self.detector is not None else 1
+        self.scheduler = DetectionScheduler(max_interval=max_interval) if max_interval > 1 else None
+        # Both coast skipped approaches, which needs the Kalman tracker
+        if self.scheduler or isinstance(self.detector, GatedDetector) or config.get("tracker", "iou") == "sort":
+            self.tracker = SORTTracker(iou_thresh=0.3, max_age=10)
         else:
-            self.detector = YOLODetector(model_path=config.get("model_path", "yolov8n.pt"),
-                                         conf_thresh=config.get("conf_thresh", 0.3))
-        self.tracker = IOUTracker(iou_thresh=0.3, max_age=10)
+            self.tracker = IOUTracker(iou_thresh=0.3, max_age=10)
         self.lane_mapper = LaneMapper(config["lane_geojson"])
-        self.optimizer = SignalOptimizer(min_green_s=7, max_green_s=60)
+        # Rolling per-lane statistics on video time (frame id / nominal fps)
+        self.lane_stats = LaneStatsEngine(self.lane_mapper, window_s=config.get("stats_window_s", 60.0))
+        self.stats_fps = config.get("fps") or getattr(self.cam, "fps", None) or 15.0
+        # Phases compile once into incidence/conflict tables; lanes map to their phase
+        # The repo's phases are written for left-hand traffic (intersection.driving_side)
+        driving_side = config.get("driving_side") or config.get("intersection", {}).get("driving_side", "left")
+        self.plan = PhasePlan.from_config(config["phases"], driving_side) if config.get("phases") else None
+        self._lane_phase = {} if self.plan is None else {
+            lid: self.plan.phase_for(a, m) for lid, a, m in zip(
+                self.lane_mapper.lane_ids, self.lane_mapper.lane_approaches, self.lane_mapper.lane_movements)}
+        self.optimizer = SignalOptimizer(min_green_s=7, max_green_s=60, plan=self.plan)
+        # Control runs on its own clock and reads the newest published lane stats
+        # (array state per frame; LaneStats are built only when a decision runs)
+        self.stats_snapshot = Snapshot()
+        # Emergency events arrive on the bus (a broker client bridges priority topics
+        # into it); a preemption wakes the control loop instead of waiting a tick
+        self.bus = EventBus()
+        self.emergency = PreemptionManager(
+            self.bus, topic=config.get("emergency_topic", "emergency/#"),
+            eta_threshold_s=config.get("eta_threshold_s", 30.0), plan=self.plan,
+            on_action=lambda action: self.control.wake()) if config.get("priority_enabled", True) else None
+        self.control = ControlLoop(self.optimizer, self.stats_snapshot,
+                                   interval_s=config.get("control_interval_s", 1.0),
+                                   emergencies=self.emergency.active if self.emergency else None,
+                                   build_stats=self.lane_stats.stats_from_state)
+        self._canvases = {}  # stream -> reused overlay image
+        self._ready = None    # detections already computed by the inference workers
+
+    @staticmethod
+    def _detector_cfg(config) -> dict:
+        if "detector" in config:
+            return config["detector"]
+        if config.get("use_stub", False):
+            return {"name": "stub"}
+        return {"name": "yolov8", "model_path": config.get("model_path", "yolov8n.pt"),
+                "conf_thresh": config.get("conf_thresh", 0.3)}
+
+    @staticmethod
+    def _roi_gates(config):
+        """
+        One gate for the single camera, or one per approach camera (each has
+        its own view, lane polygons and motion history).
+        """
+        if not config.get("camera_sources"):
+            return ROIGate.from_geojson(config["lane_geojson"])
+        paths = config.get("roi_geojson") or {}
+        missing = [a for a in config["camera_sources"] if a not in paths]
+        if missing:
+            raise ValueError(f"roi_gate with camera_sources needs per-camera lane polygons: "
+                             f"set roi_geojson for {', '.join(missing)}")
+        return {a: ROIGate.from_geojson(paths[a]) for a in config["camera_sources"]}
+
+    def _ticks(self):
+        """Yield (tick_id, {stream: frame}); "unknown" is the single all-approach camera."""
+        if self.perception is not None:
+            # One tick per capture-time-aligned set across the cameras (so tracks
+            # predict and age once per frame); slots go back to the capture
+            # workers once the loop body is done with the frames
+            framesets = self.perception.framesets_iter(
+                skew_tolerance=self.cfg.get("skew_tolerance_s", 0.05))
+            for tick, group in enumerate(framesets, start=1):
+                self._ready = DetectionBatch.concat([res.detections for res in group])
+                yield tick, {res.approach_id: res.frame for res in group}
+                for res in group:
+                    self.perception.release(res)
+        elif isinstance(self.cam, CameraGroup):
+            for fset in self.cam.framesets():
+                yield fset.tick, {a: f.frame for a, f in fset.frames.items()}
+        else:
+            for fid, ts, frame in self.cam.frames():
+                yield fid, {"unknown": frame}
 
     def run(self):
         print("Starting orchestrator loop...")
-        for fid, ts, frame in self.cam.frames():
-            # 1) Detect vehicles with placeholder approach_id
-            raw_detections = self.detector.infer(frame, fid, "unknown")
+        self.control.start()
+        try:
+            for fid, frames in self._ticks():
+                # 1-2) Detect (or coast) and track vehicles
+                tracks = self._perceive(frames, fid)
+
+                # 3) Map to lanes and publish stats for the control loop
+                lane_assignments = self.lane_mapper.assign_tracks(tracks)
+                self.lane_stats.update(lane_assignments, fid / self.stats_fps)
+                self.stats_snapshot.publish(self.lane_stats.state())
 
-            # Map each detection to an approach
-            for det in raw_detections:
-                cx = (det.bbox[0] + det.bbox[2]) / 2
-                cy = (det.bbox[1] + det.bbox[3]) / 2
-                det.approach_id = self.lane_mapper.get_approach_for_point(cx, cy)
+                # 4-5) Signal timings come from the control loop (control_interval_s)
+                splits = self.control.current_splits()
 
-        # Filter out anything not in a lane polygon
-            detections = [d for d in raw_detections if d.approach_id != "unknown"]
+                # 6-7) Draw overlay and show frame(s)
+                for stream, frame in frames.items():
+                    approach = None if stream == "unknown" else stream
+                    canvas = self._canvas_for(stream, frame)
+                    self._draw_overlay(canvas, lane_assignments, splits, approach)
+                    cv2.imshow(f"Traffic AI Orchestrator {approach or ''}".strip(), canvas)
 
-        # 2) Track vehicles
-            tracks = self.tracker.update(detections, fid)
+                # 8) Quit key
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("Stopping orchestrator...")
+                    break
+        finally:
+            self.control.stop()
+            if self.emergency is not None:
+                self.emergency.close()
+            if self.perception is not None:
+                self.perception.shutdown()
+            else:
+                self.cam.release()
+            cv2.destroyAllWindows()
 
-        # 3) Map to lanes
-            lane_assignments = self.lane_mapper.assign_tracks(tracks)
-            lane_stats = self.lane_mapper.compute_lane_stats(lane_assignments)
+    def _canvas_for(self, stream, frame):
+        """Copy the frame into a per-stream overlay buffer that is allocated once."""
+        canvas = self._canvases.get(stream)
+        if canvas is None or canvas.shape != frame.shape:
+            canvas = self._canvases[stream] = np.empty_like(frame)
+        np.copyto(canvas, frame)
+        return canvas
 
-        # 4) Get emergency events (placeholder: none for now)
-            emergencies = []
+    def _motion(self, stream, summary) -> MotionStat:
+        if stream == "unknown":
+            return merge_motion(summary.values())
+        return MotionStat(*summary.get(stream, (0, 0.0, 0.0)))
 
-        # 5) Optimise signal timings
-            splits = self.optimizer.compute_splits(lane_stats)
-            splits = self.optimizer.apply_emergency_priority(splits, emergencies)
+    def _perceive(self, frames, fid):
+        if self._ready is not None:
+            batch, self._ready = self._ready, None
+            if isinstance(self.tracker, SORTTracker):
+                # Cameras missing from this frame coast without aging; tracks
+                # of cameras that have ended age out
+                closed = [a for a in self.perception.channels if a not in self.perception.open_streams]
+                return self.tracker.update(batch, fid, observed=list(frames) + closed)
+            return self.tracker.update(batch, fid)
 
-        # 6) Draw overlay
-            self._draw_overlay(frame, lane_assignments, splits)
+        streams = list(frames)
+        if self.scheduler:
+            summary = self.tracker.motion_summary()
+            streams = [a for a in streams if self.scheduler.should_detect(a, fid, self._motion(a, summary))]
+            if not streams:
+                return self.tracker.coast(fid)
+
+        # One predict call for all approach frames when the detector supports it
+        if hasattr(self.detector, "detect_batch"):
+            batches = self.detector.detect_batch([frames[a] for a in streams], [fid] * len(streams), streams)
+        else:
+            batches = [self.detector.detect(frames[a], fid, a) for a in streams]
 
-        # 7) Show frame
-            cv2.imshow("Traffic AI Orchestrator", frame)
+        # Gated frames (no motion in the lanes) come back as None and coast
+        ran = [(a, b) for a, b in zip(streams, batches) if b is not None]
+        if not ran:
+            return self.tracker.coast(fid)
 
-        # 8) Quit key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                print("Stopping orchestrator...")
-                break
+        detections = []
+        for stream, batch in ran:
+            if stream == "unknown":
+                # Fixed camera: label points through the cached lane raster
+                if self.lane_mapper.frame_shape != frames[stream].shape[:2]:
+                    self.lane_mapper.use_raster(frames[stream].shape)
+                # Map each detection to an approach
+                batch.approach_codes[:] = self.lane_mapper.approach_codes_for_points(batch.centroids())
+                # Filter out anything not in a lane polygon
+                batch = batch.select(batch.approach_codes != approach_code("unknown"))
+            detections.append(batch)
+            if self.scheduler:
+                self.scheduler.mark_run(stream, fid)
 
-        self.cam.release()
-        cv2.destroyAllWindows()
+        # Track vehicles; approaches skipped this tick coast without aging
+        observed = None if len(ran) == len(frames) else [a for a, _ in ran]
+        if isinstance(self.tracker, SORTTracker):
+            return self.tracker.update(DetectionBatch.concat(detections), fid, observed=observed)
+        return self.tracker.update(DetectionBatch.concat(detections), fid)
 
-    def _draw_overlay(self, frame, lane_assignments, splits):
-        # Draw lane polygons
-        for lane_id, poly in self.lane_mapper.lane_polygons.items():
+    def _draw_overlay(self, frame, lane_assignments, splits, approach_id=None):
+        # Draw lane polygons (single-camera view only)
+        for lane_id, poly in (self.lane_mapper.lane_polygons.items() if approach_id is None else ()):
             pts = [(int(x), int(y)) for x, y in poly.exterior.coords]
             cv2.polylines(frame, [np.array(pts, dtype=np.int32)], isClosed=True, color=(255, 0, 0), thickness=2)
             # Show green time decision
-            green_time = splits.greens_s.get(lane_id, 0)
+            green_time = splits.greens_s.get(self._lane_phase.get(lane_id, lane_id), 0)
             cv2.putText(frame, f"{lane_id}: {green_time:.1f}s",
                         pts[0], cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
         # Draw tracked vehicles
         for lane_id, tracks in lane_assignments.items():
             for tr in tracks:
+                if approach_id is not None and tr.approach_id != approach_id:
+                    continue
                 x1, y1, x2, y2 = map(int, tr.bbox)
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
                 cv2.putText(frame, f"{tr.cls} ID{tr.track_id}",
@@ -0,0 +1,356 @@
+# smart_signal/runtime/shm.py
+"""
+Multi-process perception: capture workers decode into shared-memory frame
+slots, inference workers read them zero-copy and send back compact detection
+arrays. Only slot indices and small arrays cross process boundaries.
+
+Slot life cycle (per camera):
+    capture --ready--> inference --results--> main --free--> capture
+`ready` and `free` are single-producer/single-consumer index rings living in
+shared memory; `results` is a regular multiprocessing queue.
+"""
+import multiprocessing as mp
+import queue
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Deque, Dict, Generator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from smart_signal.types import DetectionBatch
+
+EOF_SLOT = -1
+
+
+class IndexRing:
+    """
+    Lock-free SPSC ring of slot indices in shared memory. Exactly one process
+    may push and exactly one may pop; head/tail are each written by one side only.
+    """
+
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        self.capacity = capacity
+        size = (capacity + 2) * 8
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self._arr = np.ndarray((capacity + 2,), dtype=np.int64, buffer=self._shm.buf)
+        if name is None:
+            self._arr[:] = 0
+        self.name = self._shm.name
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["capacity"], state["name"])
+
+    # _arr[0] = head (next pop), _arr[1] = tail (next push), _arr[2:] = data
+    def push(self, value: int, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._arr[1] - self._arr[0] >= self.capacity:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.0002)
+        tail = int(self._arr[1])
+        self._arr[2 + tail % self.capacity] = value
+        self._arr[1] = tail + 1  # publish after the data write
+        return True
+
+    def pop(self, timeout: Optional[float] = None) -> Optional[int]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._arr[0] >= self._arr[1]:
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(0.0002)
+        head = int(self._arr[0])
+        value = int(self._arr[2 + head % self.capacity])
+        self._arr[0] = head + 1
+        return value
+
+    def close(self, unlink: bool = False):
+        del self._arr
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class FrameSlots:
+    """N preallocated frames of one shape in a single shared-memory block."""
+
+    def __init__(self, n_slots: int, shape: Tuple[int, int, int], name: Optional[str] = None):
+        self.n_slots = n_slots
+        self.shape = tuple(shape)
+        size = int(np.prod(self.shape)) * n_slots
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self._arr = np.ndarray((n_slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf)
+        self.name = self._shm.name
+
+    def __getstate__(self):
+        return {"n_slots": self.n_slots, "shape": self.shape, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["n_slots"], state["shape"], state["name"])
+
+    def __getitem__(self, slot: int) -> np.ndarray:
+        return self._arr[slot]
+
+    def close(self, unlink: bool = False):
+        del self._arr
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class CameraChannel:
+    """Shared state for one camera: frame slots, metadata and both index rings."""
+
+    def __init__(self, approach_id: str, source, shape, n_slots: int = 4):
+        self.approach_id = approach_id
+        self.source = source
+        self.slots = FrameSlots(n_slots, shape)
+        # Per-slot (frame_id, capture ts)
+        self._meta_shm = shared_memory.SharedMemory(create=True, size=n_slots * 16)
+        self.ready = IndexRing(n_slots + 1)
+        self.free = IndexRing(n_slots + 1)
+        for i in range(n_slots):
+            self.free.push(i)
+        self.meta_name = self._meta_shm.name
+
+    def __getstate__(self):
+        return {"approach_id": self.approach_id, "source": self.source, "slots": self.slots,
+                "ready": self.ready, "free": self.free, "meta_name": self.meta_name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._meta_shm = shared_memory.SharedMemory(name=self.meta_name)
+
+    @property
+    def meta(self) -> np.ndarray:
+        return np.ndarray((self.slots.n_slots, 2), dtype=np.float64, buffer=self._meta_shm.buf)
+
+    def close(self, unlink: bool = False):
+        for part in (self.slots, self.ready, self.free):
+            part.close(unlink)
+        self._meta_shm.close()
+        if unlink:
+            self._meta_shm.unlink()
+
+
+class FrameResult(NamedTuple):
+    approach_id: str
+    frame_id: int
+    ts: float
+    slot: int
+    frame: np.ndarray          # zero-copy view; valid until release()
+    detections: DetectionBatch
+
+
+# ---------- worker processes ----------
+def _into_slot(frame: np.ndarray, slot: np.ndarray):
+    """
+    Make sure `frame` ended up in `slot`. Decoders only write in place when the
+    shapes match; a feed that changes resolution mid-stream comes back in a new
+    array, which is scaled into the slot here.
+    """
+    if np.shares_memory(frame, slot):
+        return
+    if frame.shape[2:] != slot.shape[2:]:
+        raise ValueError(f"Frame with {frame.shape} does not fit a {slot.shape} slot")
+    if frame.shape == slot.shape:
+        np.copyto(slot, frame)
+    else:
+        import cv2
+        cv2.resize(frame, (slot.shape[1], slot.shape[0]), dst=slot, interpolation=cv2.INTER_AREA)
+
+
+def _capture_worker(ch: CameraChannel, fps, resize_to, live: bool, stop):
+    from smart_signal.perception.camera import CameraStream, pacer
+    stream = CameraStream(ch.source, fps=fps, warmup_time=0.0, threaded=False, resize_to=resize_to)
+    scratch = None
+    pace = pacer(stream.fps)
+    next(pace)
+    try:
+        while not stop.is_set():
+            slot = ch.free.pop(timeout=0 if live else 0.1)
+            if slot is None and not live:
+                continue
+            if slot is None:
+                # Live feed and inference is behind: decode and drop to stay current
+                f = stream.read(scratch)
+                if f is None:
+                    break
+                scratch = f.frame
+            else:
+                f = stream.read(ch.slots[slot])
+                if f is None:
+                    break  # slot stays unused; only main pushes to `free`
+                _into_slot(f.frame, ch.slots[slot])
+                ch.meta[slot] = (f.frame_id, f.ts)
+                ch.ready.push(slot)
+            next(pace)
+    finally:
+        ch.ready.push(EOF_SLOT)
+        stream.release()
+
+
+def _inference_worker(channels: List[CameraChannel], detector_cfg: dict, results, stop):
+    from smart_signal.perception.detector import build_detector
+    detector = build_detector(detector_cfg)
+    live = list(channels)
+    while live and not stop.is_set():
+        # One predict call over every camera that has a frame waiting
+        batch = []
+        for ch in list(live):
+            slot = ch.ready.pop(timeout=0)
+            if slot == EOF_SLOT:
+                live.remove(ch)
+                results.put((ch.approach_id, EOF_SLOT, 0, 0.0, None, None, None))
+            elif slot is not None:
+                batch.append((ch, slot))
+        if not batch:
+            time.sleep(0.0005)
+            continue
+        frames = [ch.slots[slot] for ch, slot in batch]
+        fids = [int(ch.meta[slot, 0]) for ch, slot in batch]
+        aids = [ch.approach_id for ch, _ in batch]
+        if hasattr(detector, "detect_batch"):
+            dets = detector.detect_batch(frames, fids, aids)
+        else:
+            dets = [detector.detect(f, fid, a) for f, fid, a in zip(frames, fids, aids)]
+        for (ch, slot), fid, d in zip(batch, fids, dets):
+            results.put((ch.approach_id, slot, fid, float(ch.meta[slot, 1]),
+                         d.boxes, d.scores, d.cls_codes))
+
+
+def probe_shape(source, resize_to=None) -> Tuple[int, int, int]:
+    if resize_to:
+        return int(resize_to[1]), int(resize_to[0]), 3
+    import cv2
+    cap = cv2.VideoCapture(source)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok:
+        raise RuntimeError(f"Cannot open video source: {source}")
+    return frame.shape
+
+
+class SharedMemoryPerception:
+    """
+    Runs capture and inference in separate processes. Cameras are spread over
+    `inference_workers` processes; each worker batches its cameras into one
+    predict call.
+    """
+
+    def __init__(self, sources: Dict[str, str], detector_cfg: dict, fps: Optional[float] = None,
+                 inference_workers: int = 1, n_slots: int = 4,
+                 resize_to: Optional[Tuple[int, int]] = None):
+        from smart_signal.perception.camera import is_live_source
+        self.ctx = mp.get_context("spawn")
+        self.stop = self.ctx.Event()
+        self.results = self.ctx.Queue()
+        self.channels = {
+            a: CameraChannel(a, src, probe_shape(src, resize_to), n_slots)
+            for a, src in sources.items()
+        }
+        self.procs = [
+            self.ctx.Process(target=_capture_worker, name=f"capture:{a}", daemon=True,
+                             args=(ch, fps, resize_to, is_live_source(ch.source), self.stop))
+            for a, ch in self.channels.items()
+        ]
+        n_inf = max(1, min(inference_workers, len(self.channels)))
+        chans = list(self.channels.values())
+        self.procs += [
+            self.ctx.Process(target=_inference_worker, name=f"inference:{i}", daemon=True,
+                             args=(chans[i::n_inf], detector_cfg, self.results, self.stop))
+            for i in range(n_inf)
+        ]
+        self._started = False
+        self.open_streams = set(self.channels)   # cameras that have not sent EOF yet
+        self.skipped = 0                         # cameras left out of a set for skew
+
+    def start(self):
+        for p in self.procs:
+            p.start()
+        self._started = True
+
+    def results_iter(self, poll_s: Optional[float] = None) -> Generator[Optional[FrameResult], None, None]:
+        """
+        Yield results as they arrive; call release() on each when done with its frame.
+        With `poll_s`, also yield None after that long without a result.
+        """
+        if not self._started:
+            self.start()
+        open_streams = self.open_streams = set(self.channels)
+        while open_streams:
+            try:
+                aid, slot, fid, ts, boxes, scores, codes = self.results.get(timeout=poll_s or 0.5)
+            except queue.Empty:
+                if not any(p.is_alive() for p in self.procs):
+                    break
+                if poll_s is not None:
+                    yield None
+                continue
+            if slot == EOF_SLOT:
+                open_streams.discard(aid)
+                continue
+            ch = self.channels[aid]
+            dets = DetectionBatch.from_arrays(boxes, scores, codes, aid, fid)
+            yield FrameResult(aid, fid, ts, slot, ch.slots[slot], dets)
+
+    def framesets_iter(self, skew_tolerance: float = 0.05,
+                       timeout_s: float = 0.5) -> Generator[List[FrameResult], None, None]:
+        """
+        Results grouped by capture time, like CameraGroup: the reference is the
+        newest frame of the slowest camera and each camera contributes its frame
+        closest to it, if within `skew_tolerance`. A set is emitted once every
+        open camera has a pending frame, or `timeout_s` after the first one
+        arrived (cameras still missing are left out). Frames skipped by the
+        alignment are released here.
+        """
+        pending: Dict[str, Deque[FrameResult]] = {a: deque() for a in self.channels}
+        deadline = None
+        for res in self.results_iter(poll_s=min(timeout_s, 0.1)):
+            if res is not None:
+                pending[res.approach_id].append(res)
+            while True:
+                ready = [a for a in self.channels if pending[a]]
+                if not ready:
+                    deadline = None
+                    break
+                if not all(a in ready for a in self.open_streams):
+                    deadline = deadline or time.monotonic() + timeout_s
+                    if time.monotonic() < deadline:
+                        break
+                deadline = None
+                yield self._align(pending, ready, skew_tolerance)
+        # Cameras that ended early leave their last frames unmatched
+        while any(pending.values()):
+            yield self._align(pending, [a for a in self.channels if pending[a]], skew_tolerance)
+
+    def _align(self, pending: Dict[str, Deque[FrameResult]], ready: List[str],
+               skew_tolerance: float) -> List[FrameResult]:
+        # Reference = newest frame of the slowest camera
+        t_ref = min(pending[a][-1].ts for a in ready)
+        group = []
+        for a in ready:
+            fresh = pending[a]
+            best = min(fresh, key=lambda r: abs(r.ts - t_ref))
+            if abs(best.ts - t_ref) <= skew_tolerance:
+                while fresh[0] is not best:
+                    self.release(fresh.popleft())
+                group.append(fresh.popleft())
+            else:
+                while fresh:
+                    self.release(fresh.popleft())  # consume out-of-tolerance frames
+                self.skipped += 1
+        return group
+
+    def release(self, result: FrameResult):
+        self.channels[result.approach_id].free.push(result.slot)
+
+    def shutdown(self):
+        self.stop.set()
+        for p in self.procs:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        for ch in self.channels.values():
+            ch.close(unlink=True)
@@ -1,11 +1,95 @@
 # smart_signal/simulation/sim_core.py
 import pygame
 import random
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import numpy as np
 
 WIDTH, HEIGHT = 800, 800
 LANE_WIDTH = 40
 CENTER = (WIDTH // 2, HEIGHT // 2)
 
+DIRECTIONS = ("N", "E", "S", "W")
+VEHICLE_TYPES = ("car", "ambulance", "fire", "police")
+_OPPOSITE = np.array([2, 3, 0, 1])  # N<->S, E<->W as DIRECTIONS indices
+# Unit travel vector per direction (screen y grows downwards)
+_DX = np.array([0.0, 1.0, 0.0, -1.0])
+_DY = np.array([-1.0, 0.0, 1.0, 0.0])
+# Travel-axis front position from which a red light holds a vehicle
+# (N: y <= box bottom + 10, E: x + w >= box left - 10, ...)
+_NEAR_STOP = np.array([-(CENTER[1] + 70.0), CENTER[0] - 70.0, CENTER[1] - 70.0, -(CENTER[0] + 70.0)])
+
+
+class VehicleArrays:
+    """
+    Struct-of-arrays vehicle state, one row per vehicle. `direction` and
+    `approach` index DIRECTIONS, `vehicle_type` indexes VEHICLE_TYPES and
+    `lane` is the spawn lane within the approach.
+    """
+    FIELDS = ("x", "y", "speed", "w", "h", "direction", "approach", "lane", "vehicle_type", "color")
+
+    def __init__(self, n: int = 0):
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.speed = np.zeros(n)
+        self.w = np.zeros(n)
+        self.h = np.zeros(n)
+        self.direction = np.zeros(n, dtype=np.uint8)
+        self.approach = np.zeros(n, dtype=np.uint8)
+        self.lane = np.zeros(n, dtype=np.uint8)
+        self.vehicle_type = np.zeros(n, dtype=np.uint8)
+        self.color = np.zeros((n, 3), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def from_rows(cls, rows) -> "VehicleArrays":
+        """rows: (x, y, speed, direction, approach, lane, vehicle_type, color) tuples."""
+        out = cls(len(rows))
+        if rows:
+            x, y, sp, d, a, lane, t, c = zip(*rows)
+            out.x[:], out.y[:], out.speed[:] = x, y, sp
+            out.direction[:] = [DIRECTIONS.index(k) for k in d]
+            out.approach[:] = [DIRECTIONS.index(k) for k in a]
+            out.lane[:] = lane
+            out.vehicle_type[:] = [VEHICLE_TYPES.index(k) for k in t]
+            out.color[:] = c
+            vertical = (out.direction == 0) | (out.direction == 2)
+            out.w[:] = np.where(vertical, 20, 36)
+            out.h[:] = np.where(vertical, 36, 20)
+        return out
+
+    def extend(self, other: "VehicleArrays"):
+        if len(other):
+            for f in self.FIELDS:
+                setattr(self, f, np.concatenate([getattr(self, f), getattr(other, f)]))
+
+    def keep(self, mask: np.ndarray):
+        for f in self.FIELDS:
+            setattr(self, f, getattr(self, f)[mask])
+
+    def copy(self) -> "VehicleArrays":
+        out = VehicleArrays(0)
+        for f in self.FIELDS:
+            setattr(out, f, getattr(self, f).copy())
+        return out
+
+
+@dataclass
+class WorldState:
+    """
+    Array snapshot of a SimWorld plus signal state; cheap to pickle to rollout
+    workers and to restore.
+    """
+    vehicles: VehicleArrays
+    cycle_pair: Tuple[str, str]
+    light_timers: Dict[str, float]
+    green_s: Dict[Tuple[str, str], float]
+
+    def __len__(self):
+        return len(self.vehicles)
+
 class Vehicle:
     def __init__(self, x, y, direction, approach_id, speed=2.0, color=(0, 220, 0), vehicle_type="car"):
         self.x, self.y = x, y
@@ -39,12 +123,23 @@ class Vehicle:
 
 
 class SimWorld:
-    def __init__(self, width=WIDTH, height=HEIGHT):
-        pygame.init()
+    def __init__(self, width=WIDTH, height=HEIGHT, headless=False, seed=None, fps=30):
+        """
+        :param headless: No window, fonts or event polling; step() as fast as
+            the CPU allows (each step is still exactly 1 / fps simulated seconds)
+        :param seed: Seed for the world's own RNG (spawns), for reproducible runs
+        """
+        self.headless = headless
         self.width, self.height = width, height
-        self.screen = pygame.display.set_mode((width, height))
-        pygame.display.set_caption("2D Traffic Sim")
-        self.clock = pygame.time.Clock()
+        if headless:
+            self.screen = None
+            self.clock = None
+        else:
+            pygame.init()
+            self.screen = pygame.display.set_mode((width, height))
+            pygame.display.set_caption("2D Traffic Sim")
+            self.clock = pygame.time.Clock()
+        self.rng = random.Random(seed)
         self.conflict_box = pygame.Rect(CENTER[0] - 40, CENTER[1] - 40, 80, 80)
 
         # Lane spawn anchors
@@ -62,12 +157,16 @@ class SimWorld:
             "W": self.width // 2 + 60
         }
 
-        self.vehicles = []
+        self.fleet = VehicleArrays()
         self.lights = {"N": "GREEN", "S": "GREEN", "E": "RED", "W": "RED"}
         self.light_timers = {"N": 12, "S": 12, "E": 0, "W": 0}
         self.cycle_pair = ("N", "S")
-        self.fps = 30
+        self.green_s = {("N", "S"): 12, ("E", "W"): 12}  # green per pair when it comes up
+        self.fps = fps
+        self.dt = 1.0 / fps
+        self.time_s = 0.0  # simulated seconds
         self.running = True
+        self.stopped = 0  # vehicles that could not move in the last step
 
     def spawn_random(self, p=0.02, p_emergency=0.005):
         # Normal vehicles
@@ -78,97 +177,138 @@ class SimWorld:
             "W": 1   # Westbound uses lane 1
             }
 
+        rows = []
         for approach in ("N", "S", "E", "W"):
             lane_idx = lane_choice[approach]
             lx, ly = self.lanes[approach][lane_idx]
-            if random.random() < p:
-                self.vehicles.append(Vehicle(
-                    lx, ly,
-                    direction=approach,
-                    approach_id=approach,
-                    speed=2.0,
-                    color=(0, 220, 0),
-                    vehicle_type="car"
-                ))
-
-            if random.random() < p:
-                self.vehicles.append(Vehicle(
-                    lx, ly,
-                    direction=approach,
-                    approach_id=approach,
-                    speed=2.0,
-                    color=(0, 220, 0),
-                    vehicle_type="car"
-                ))
+            if self.rng.random() < p:
+                rows.append((lx, ly, 2.0, approach, approach, lane_idx, "car", (0, 220, 0)))
 
+            if self.rng.random() < p:
+                rows.append((lx, ly, 2.0, approach, approach, lane_idx, "car", (0, 220, 0)))
 
         # Emergency vehicle example: from N lane 0
-        if random.random() < p_emergency:
+        if self.rng.random() < p_emergency:
             lx, ly = self.lanes["N"][0]  # still lane 0
-            self.vehicles.append(Vehicle(
-                lx, ly,
-                direction="N",
-                approach_id="N",
-                speed=3.5,
-                color=(255, 0, 0),
-                vehicle_type="ambulance"
-            ))
+            rows.append((lx, ly, 3.5, "N", "N", 0, "ambulance", (255, 0, 0)))
+        if rows:
+            self.fleet.extend(VehicleArrays.from_rows(rows))
 
     def _update_lights(self):
         # decrement timers for active greens
         for k in self.cycle_pair:
-            self.light_timers[k] = max(0, self.light_timers[k] - 1.0 / self.fps)
+            self.light_timers[k] = max(0, self.light_timers[k] - self.dt)
 
         # switch when both greens expire
         if all(self.light_timers[k] <= 0 for k in self.cycle_pair):
             self.cycle_pair = ("E", "W") if self.cycle_pair == ("N", "S") else ("N", "S")
             for k in ("N", "S", "E", "W"):
                 self.lights[k] = "GREEN" if k in self.cycle_pair else "RED"
-                self.light_timers[k] = 12 if self.lights[k] == "GREEN" else 0
+                self.light_timers[k] = self.green_s[self.cycle_pair] if self.lights[k] == "GREEN" else 0
 
     def _move_with_gaps(self):
+        """
+        One car-following step for all vehicles at once. Each vehicle follows
+        the vehicle directly ahead in its (approach, lane), found by one sort;
+        it holds on red near the stop line, when within `headway` of its
+        leader, or while the opposite approach occupies the conflict box.
+        """
         headway = 28
-        groups = {"N": [], "S": [], "E": [], "W": []}
-        for v in self.vehicles:
-            groups[v.approach_id].append(v)
-
-        def sort_key(app):
-            if app == "N": return lambda v: v.y
-            if app == "S": return lambda v: -v.y
-            if app == "E": return lambda v: -v.x
-            if app == "W": return lambda v: v.x
-
-        for app, vs in groups.items():
-            vs.sort(key=sort_key(app))
-            for i, v in enumerate(vs):
-                leader = None
-                for j in range(i):
-                    u = vs[j]
-                    if app in ("N", "S") and abs(u.x - v.x) < 12:
-                        leader = u
-                        break
-                    if app in ("E", "W") and abs(u.y - v.y) < 12:
-                        leader = u
-                        break
-
-                red_ahead = (self.lights.get(v.approach_id, "RED") == "RED") and v._near_stop_line()
-                too_close = False
-                if leader:
-                    if app == "N":
-                        too_close = (v.y + v.h) > (leader.y - headway)
-                    elif app == "S":
-                        too_close = (v.y) < (leader.y + leader.h + headway)
-                    elif app == "E":
-                        too_close = (v.x) < (leader.x + leader.w + headway)
-                    elif app == "W":
-                        too_close = (v.x + v.w) > (leader.x - headway)
-
-                if not red_ahead and not too_close:
-                    if self._box_occupied_by_opposite(v.approach_id):
-                        continue  # wait until box is clear
-                    if not red_ahead and not too_close and not self._box_occupied_by_opposite(v.approach_id):
-                        v.move_step()
-
+        f = self.fleet
+        n = len(f)
+        if not n:
+            self.stopped = 0
+            return
+        a = f.approach.astype(np.int64)
+        d = f.direction.astype(np.int64)
+
+        # Position along the approach's travel axis (larger = further ahead)
+        ahead = f.x * _DX[a] + f.y * _DY[a]
+        length = np.where((a == 0) | (a == 2), f.h, f.w)
+        front = np.where(_DX[a] + _DY[a] > 0, ahead + length, ahead)
+        rear = front - length
+
+        # Sort front-first within each (approach, lane); the leader is one slot earlier
+        order = np.lexsort((-ahead, f.lane, a))
+        sa, sl = a[order], f.lane[order]
+        follows = np.zeros(n, dtype=bool)
+        follows[1:] = (sa[1:] == sa[:-1]) & (sl[1:] == sl[:-1])
+        too_close = np.zeros(n, dtype=bool)
+        fol, lead = order[1:][follows[1:]], order[:-1][follows[1:]]
+        too_close[fol] = front[fol] + headway > rear[lead]
+
+        # Red light near the stop line: the front, measured along the travel
+        # direction, within 10 px of the box edge or past it
+        if (d == a).all():
+            front_d = front
+        else:
+            length_d = np.where((d == 0) | (d == 2), f.h, f.w)
+            ahead_d = f.x * _DX[d] + f.y * _DY[d]
+            front_d = np.where(_DX[d] + _DY[d] > 0, ahead_d + length_d, ahead_d)
+        red = np.array([self.lights.get(k, "RED") == "RED" for k in DIRECTIONS])
+        red_ahead = red[a] & (front_d >= _NEAR_STOP[d])
+
+        # Conflict box occupancy per approach, once per step
+        blocked = self._box_occupancy()[_OPPOSITE[a]]
+
+        move = ~red_ahead & ~too_close & ~blocked
+        step = np.where(move, f.speed, 0.0)
+        f.x += step * _DX[d]
+        f.y += step * _DY[d]
+        self.stopped = n - int(move.sum())
+
+    def _box_occupancy(self) -> np.ndarray:
+        """(4,) bool: some vehicle of approach DIRECTIONS[i] overlaps the conflict box."""
+        f = self.fleet
+        box = self.conflict_box
+        # Integer rects, as pygame.Rect truncates float positions
+        rx, ry = np.trunc(f.x), np.trunc(f.y)
+        inside = (rx < box.right) & (rx + f.w > box.left) & (ry < box.bottom) & (ry + f.h > box.top)
+        return np.bincount(f.approach[inside], minlength=4) > 0
+
+    @property
+    def vehicles(self) -> List[Vehicle]:
+        """Vehicle objects built from the arrays (drawing, external callers)."""
+        f = self.fleet
+        return [Vehicle(x, y, direction=DIRECTIONS[d], approach_id=DIRECTIONS[a], speed=sp,
+                        color=tuple(c), vehicle_type=VEHICLE_TYPES[t])
+                for x, y, sp, d, a, t, c in zip(f.x.tolist(), f.y.tolist(), f.speed.tolist(),
+                                               f.direction.tolist(), f.approach.tolist(),
+                                               f.vehicle_type.tolist(), f.color.tolist())]
+
+    @vehicles.setter
+    def vehicles(self, vehicles: List[Vehicle]):
+        rows = []
+        for v in vehicles:
+            # Lane: nearest spawn anchor across the direction of travel
+            axis = 0 if v.approach_id in ("N", "S") else 1
+            anchors = [p[axis] for p in self.lanes[v.approach_id]]
+            lane = min(range(len(anchors)), key=lambda i: abs(anchors[i] - (v.x, v.y)[axis]))
+            rows.append((v.x, v.y, v.speed, v.direction, v.approach_id, lane, v.vehicle_type, v.color))
+        self.fleet = VehicleArrays.from_rows(rows)
+
+    # ---------- Snapshot / restore (MPC rollouts) ----------
+    def snapshot(self) -> WorldState:
+        return WorldState(
+            vehicles=self.fleet.copy(),
+            cycle_pair=self.cycle_pair,
+            light_timers=dict(self.light_timers),
+            green_s=dict(self.green_s),
+        )
+
+    def restore(self, state: WorldState):
+        self.fleet = state.vehicles.copy()
+        self.cycle_pair = tuple(state.cycle_pair)
+        self.light_timers = dict(state.light_timers)
+        self.green_s = dict(state.green_s)
+        for k in DIRECTIONS:
+            self.lights[k] = "GREEN" if k in self.cycle_pair else "RED"
+
+    def apply_plan(self, plan):
+        """Hold the current green for plan.hold_s, then alternate with the plan's greens."""
+        for k in self.cycle_pair:
+            self.light_timers[k] = plan.hold_s
+        self.green_s = {("N", "S"): plan.ns_green_s, ("E", "W"): plan.ew_green_s}
 
     def draw_intersection(self):
         self.screen.fill((28, 28, 28))
@@ -189,22 +329,12 @@ class SimWorld:
             timer_text = font.render(str(t), True, (255, 255, 255))
             self.screen.blit(timer_text, (pos[0] - 8, pos[1] + 16))
 
-    def _box_occupied_by_opposite(self, approach):
-    # Map each approach to its opposite
-        opposite = {"N": "S", "S": "N", "E": "W", "W": "E"}
-        opp = opposite[approach]
-        for v in self.vehicles:
-            if v.approach_id == opp:
-                veh_rect = pygame.Rect(v.x, v.y, v.w, v.h)
-                if veh_rect.colliderect(self.conflict_box):
-                    return True
-        return False
-
     def step(self, spawns=True, spawn_p=0.02):
         # Handle quit events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                self.running = False
+        if not self.headless:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.running = False
 
         # Spawn vehicles
         if spawns:
@@ -215,12 +345,20 @@ class SimWorld:
         self._move_with_gaps()
 
         # Remove vehicles that have left the visible area
-        self.vehicles = [
-            v for v in self.vehicles
-            if -100 <= v.x <= self.width + 100 and -100 <= v.y <= self.height + 100
-        ]
+        f = self.fleet
+        on_map = (-100 <= f.x) & (f.x <= self.width + 100) & (-100 <= f.y) & (f.y <= self.height + 100)
+        if not on_map.all():
+            f.keep(on_map)
+        self.time_s += self.dt
+
+    def run(self, seconds, spawns=True, spawn_p=0.02):
+        """Advance `seconds` of simulated time."""
+        for _ in range(int(round(seconds * self.fps))):
+            self.step(spawns, spawn_p)
 
     def render(self, fps=30):
+        if self.headless:
+            return
         self.draw_intersection()
         for v in self.vehicles:
             v.draw(self.screen)
@@ -228,12 +366,27 @@ class SimWorld:
         self.clock.tick(fps)
 
     def shutdown(self):
-        pygame.quit()
+        if not self.headless:
+            pygame.quit()
 
 
 if __name__ == "__main__":
-    world = SimWorld()
-    while world.running:
+    import argparse
+    import time
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--headless", action="store_true")
+    ap.add_argument("--seconds", type=float, default=600.0, help="simulated seconds (headless)")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    world = SimWorld(headless=args.headless, seed=args.seed)
+    if args.headless:
+        t0 = time.perf_counter()
+        world.run(args.seconds, spawn_p=0.03)
+        wall = time.perf_counter() - t0
+        print(f"{world.time_s:.0f} simulated s in {wall:.2f} s ({world.time_s / wall:.0f}x real time), "
+              f"{len(world.fleet)} vehicles")
+    while world.running and not args.headless:
         world.step(spawns=True, spawn_p=0.03)
         world.render(fps=60)
     world.shutdown()
\ No newline at end of file
@@ -1,8 +1,8 @@
 # smart_signal/simulation/sim_detector.py
 import numpy as np
 from typing import List
-from smart_signal.types import Detection
-from smart_signal.simulation.sim_core import SimWorld
+from smart_signal.types import Detection, DetectionBatch, CLASS_CODES, approach_code
+from smart_signal.simulation.sim_core import DIRECTIONS, SimWorld
 
 class SimulationDetector:
     """
@@ -12,19 +12,24 @@ class SimulationDetector:
         self.world = world
 
     def infer(self, frame, frame_id: int, approach_id: str) -> List[Detection]:
-        dets: List[Detection] = []
-        for v in self.world.vehicles:
-            # Simple bbox from vehicle rect
-            x1, y1 = v.x, v.y
-            x2, y2 = v.x + (36 if v.direction in ("E","W") else 20), v.y + (36 if v.direction in ("N","S") else 20)
-            dets.append(Detection(
-                bbox=(float(x1), float(y1), float(x2), float(y2)),
-                score=0.99,
-                cls="car",
-                frame_id=frame_id,
-                approach_id=v.approach_id  # approach by origin
-            ))
-        return dets
+        return self.detect(frame, frame_id, approach_id).to_detections()
+
+    def detect(self, frame, frame_id: int, approach_id: str) -> DetectionBatch:
+        f = self.world.fleet
+        n = len(f)
+        if not n:
+            return DetectionBatch.empty(frame_id)
+        # Simple bbox from vehicle rect
+        boxes = np.stack([f.x, f.y, f.x + f.w, f.y + f.h], axis=1).astype(np.float32)
+        codes = np.array([approach_code(a) for a in DIRECTIONS], dtype=np.uint16)
+        return DetectionBatch(
+            boxes=boxes,
+            scores=np.full(n, 0.99, dtype=np.float32),
+            cls_codes=np.full(n, CLASS_CODES["car"], dtype=np.uint8),
+            # approach by origin
+            approach_codes=codes[f.approach],
+            frame_id=frame_id
+        )
 
 def surface_to_frame(surface) -> np.ndarray:
     """
@@ -1,9 +1,32 @@
-from typing import List, Tuple, Optional, Literal, Dict
+import threading
+from typing import List, Tuple, Optional, Literal, Dict, Sequence, get_args
+import numpy as np
 from pydantic import BaseModel
 from dataclasses import dataclass
 
 ClassName = Literal["car","bus","truck","motorcycle","bicycle","pedestrian","unknown"]
 
+# Integer codes used by the columnar (NumPy) detection path
+CLASS_NAMES: Tuple[str, ...] = get_args(ClassName)
+CLASS_CODES: Dict[str, int] = {name: i for i, name in enumerate(CLASS_NAMES)}
+
+# Approach ids are interned process-wide so codes stay comparable across
+# frames, detectors and trackers. The four compass approaches are fixed.
+APPROACH_IDS: List[str] = ["unknown", "N", "E", "S", "W"]
+_APPROACH_CODES: Dict[str, int] = {a: i for i, a in enumerate(APPROACH_IDS)}
+_APPROACH_LOCK = threading.Lock()
+
+def approach_code(approach_id: str) -> int:
+    code = _APPROACH_CODES.get(approach_id)
+    if code is None:
+        with _APPROACH_LOCK:
+            code = _APPROACH_CODES.get(approach_id)
+            if code is None:
+                code = len(APPROACH_IDS)
+                APPROACH_IDS.append(approach_id)
+                _APPROACH_CODES[approach_id] = code
+    return code
+
 @dataclass
 class BBox:
     x1: float
@@ -18,6 +41,98 @@ class Detection(BaseModel):
     frame_id: int
     approach_id: str
 
+@dataclass
+class DetectionBatch:
+    """
+    Struct-of-arrays detections for one frame (the perception hot path).
+    Convert to pydantic `Detection` objects only at API boundaries.
+    """
+    boxes: np.ndarray           # (N, 4) float32 x1, y1, x2, y2
+    scores: np.ndarray          # (N,) float32
+    cls_codes: np.ndarray       # (N,) uint8, index into CLASS_NAMES
+    approach_codes: np.ndarray  # (N,) uint16, index into APPROACH_IDS
+    frame_id: int = 0
+
+    @classmethod
+    def empty(cls, frame_id: int = 0) -> "DetectionBatch":
+        return cls(
+            boxes=np.empty((0, 4), dtype=np.float32),
+            scores=np.empty(0, dtype=np.float32),
+            cls_codes=np.empty(0, dtype=np.uint8),
+            approach_codes=np.empty(0, dtype=np.uint16),
+            frame_id=frame_id
+        )
+
+    @classmethod
+    def from_arrays(cls, boxes, scores, cls_codes, approach_id: str,
+                    frame_id: int = 0) -> "DetectionBatch":
+        """Build a batch whose rows all belong to one approach."""
+        n = len(scores)
+        return cls(
+            boxes=np.asarray(boxes, dtype=np.float32).reshape(n, 4),
+            scores=np.asarray(scores, dtype=np.float32),
+            cls_codes=np.asarray(cls_codes, dtype=np.uint8),
+            approach_codes=np.full(n, approach_code(approach_id), dtype=np.uint16),
+            frame_id=frame_id
+        )
+
+    @classmethod
+    def from_detections(cls, detections: Sequence[Detection],
+                        frame_id: Optional[int] = None) -> "DetectionBatch":
+        if frame_id is None:
+            frame_id = detections[0].frame_id if detections else 0
+        if not detections:
+            return cls.empty(frame_id)
+        return cls(
+            boxes=np.array([d.bbox for d in detections], dtype=np.float32),
+            scores=np.array([d.score for d in detections], dtype=np.float32),
+            cls_codes=np.array([CLASS_CODES[d.cls] for d in detections], dtype=np.uint8),
+            approach_codes=np.array([approach_code(d.approach_id) for d in detections],
+                                    dtype=np.uint16),
+            frame_id=frame_id
+        )
+
+    @classmethod
+    def concat(cls, batches: Sequence["DetectionBatch"]) -> "DetectionBatch":
+        if not batches:
+            return cls.empty()
+        return cls(
+            boxes=np.concatenate([b.boxes for b in batches]),
+            scores=np.concatenate([b.scores for b in batches]),
+            cls_codes=np.concatenate([b.cls_codes for b in batches]),
+            approach_codes=np.concatenate([b.approach_codes for b in batches]),
+            frame_id=batches[0].frame_id
+        )
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def select(self, idx) -> "DetectionBatch":
+        """Subset by boolean mask or index array."""
+        return DetectionBatch(
+            boxes=self.boxes[idx],
+            scores=self.scores[idx],
+            cls_codes=self.cls_codes[idx],
+            approach_codes=self.approach_codes[idx],
+            frame_id=self.frame_id
+        )
+
+    def centroids(self) -> np.ndarray:
+        return (self.boxes[:, :2] + self.boxes[:, 2:]) * 0.5
+
+    def to_detections(self) -> List[Detection]:
+        return [
+            Detection(
+                bbox=tuple(bbox),
+                score=score,
+                cls=CLASS_NAMES[c],
+                frame_id=self.frame_id,
+                approach_id=APPROACH_IDS[a]
+            )
+            for bbox, score, c, a in zip(self.boxes.tolist(), self.scores.tolist(),
+                                         self.cls_codes.tolist(), self.approach_codes.tolist())
+        ]
+
 class Track(BaseModel):
     track_id: int
     bbox: Tuple[float, float, float, float]
@@ -54,4 +169,34 @@ class EmergencyEvent(BaseModel):
 
 class Splits(BaseModel):
     cycle_s: float
-    greens_s: Dict[str, float]  # phase_id -> green seconds
\ No newline at end of file
+    greens_s: Dict[str, float]  # phase_id -> green seconds
+
+@dataclass(frozen=True)
+class TimingPlan:
+    """Candidate signal timing: keep the current green hold_s more, then alternate."""
+    hold_s: float
+    ns_green_s: float
+    ew_green_s: float
+
+@dataclass
+class SplitsBatch:
+    """
+    Splits for many intersections at once: greens_s[i, p] is the green time of
+    phase p at intersection i (0 for phases that do not exist there).
+    """
+    cycle_s: np.ndarray   # (I,) float64
+    greens_s: np.ndarray  # (I, P) float64
+
+    def __len__(self) -> int:
+        return len(self.cycle_s)
+
+    def splits(self, i: int, phase_ids: Sequence[str], mask: Optional[np.ndarray] = None) -> Splits:
+        """Pydantic Splits for intersection i (phases outside `mask` omitted)."""
+        greens = self.greens_s[i].tolist()
+        keep = mask[i].tolist() if mask is not None else [True] * len(greens)
+        return Splits(cycle_s=float(self.cycle_s[i]),
+                      greens_s={pid: g for pid, g, k in zip(phase_ids, greens, keep) if k})
+
+    def as_dict(self, intersection_ids: Sequence[str], phase_ids: Sequence[str],
+                mask: Optional[np.ndarray] = None) -> Dict[str, Splits]:
+        return {iid: self.splits(i, phase_ids, mask) for i, iid in enumerate(intersection_ids)}
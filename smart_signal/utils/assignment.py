@@ -0,0 +1,127 @@
+# smart_signal/utils/assignment.py
+"""
+Optimal linear assignment (minimum total cost). Uses SciPy's
+`linear_sum_assignment` when installed, otherwise a NumPy Hungarian solver.
+"""
+from typing import Dict, Hashable, List, Sequence, Tuple
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_lsa
+except ImportError:  # SciPy is optional
+    _scipy_lsa = None
+
+
+def hungarian(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Shortest augmenting path Hungarian method with row/column potentials,
+    O(n^2 m) for an (n, m) matrix; the inner scan over columns is vectorized.
+    Returns (rows, cols) like scipy.optimize.linear_sum_assignment.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.ndim != 2:
+        raise ValueError("cost must be a 2-D matrix")
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if not np.isfinite(cost).all():
+        raise ValueError("cost matrix contains non-finite entries")
+
+    # 1-based internally; column 0 is the virtual start column
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=np.int64)   # column -> row (0 = free)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            cand = np.where(free, minv[1:], np.inf)
+            j1 = int(cand.argmin()) + 1
+            delta = cand[j1 - 1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # Augment along the alternating path
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(match[1:])
+    rows = match[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order].astype(np.int64), cols[order].astype(np.int64)
+
+
+def linear_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Minimum-cost (rows, cols); SciPy when available, else `hungarian`."""
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    if _scipy_lsa is not None:
+        rows, cols = _scipy_lsa(cost)
+        return rows.astype(np.int64), cols.astype(np.int64)
+    return hungarian(cost)
+
+
+def greedy_pairs(rows: np.ndarray, cols: np.ndarray, score: np.ndarray,
+                 min_score: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One-to-one matching over a sparse list of scored (row, col) pairs, taking
+    the highest remaining score first; only pairs with score >= min_score are
+    considered (ties keep list order).
+    """
+    keep = np.flatnonzero(np.asarray(score) >= min_score)
+    keep = keep[np.argsort(-np.asarray(score)[keep], kind="stable")]
+    used_r, used_c = set(), set()
+    out_r, out_c = [], []
+    for r, c in zip(np.asarray(rows)[keep].tolist(), np.asarray(cols)[keep].tolist()):
+        if r in used_r or c in used_c:
+            continue
+        used_r.add(r)
+        used_c.add(c)
+        out_r.append(r)
+        out_c.append(c)
+    return np.asarray(out_r, dtype=np.int64), np.asarray(out_c, dtype=np.int64)
+
+
+def connected_components(n_nodes: int, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+    """Component label (smallest node id) per node of an undirected edge list."""
+    labels = np.arange(n_nodes)
+    u = np.asarray(u, dtype=np.int64)
+    v = np.asarray(v, dtype=np.int64)
+    while len(u):
+        m = np.minimum(labels[u], labels[v])
+        new = labels.copy()
+        np.minimum.at(new, u, m)
+        np.minimum.at(new, v, m)
+        new = new[new]  # pointer jumping
+        if np.array_equal(new, labels):
+            break
+        labels = new
+    return labels
+
+
+def group_indices(keys: Sequence[Hashable]) -> Dict[Hashable, List[int]]:
+    groups: Dict[Hashable, List[int]] = {}
+    for idx, k in enumerate(keys):
+        groups.setdefault(k, []).append(idx)
+    return groups
@@ -1,3 +1,4 @@
+import numpy as np
 from shapely.geometry import Polygon, LineString, Point
 from shapely.ops import unary_union
 from typing import Dict, Any, Tuple, Optional, List
@@ -21,4 +22,34 @@ def point_to_line_distance(point: Tuple[float,float], line: LineString) -> float
 
 def box_centroid(b):
     x1,y1,x2,y2 = b
-    return ((x1+x2)/2.0, (y1+y2)/2.0)
\ No newline at end of file
+    return ((x1+x2)/2.0, (y1+y2)/2.0)
+
+# ---------- Vectorized kernels (N boxes as an (N,4) x1,y1,x2,y2 array) ----------
+def as_boxes(boxes) -> np.ndarray:
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+def iou_matrix(boxes_a, boxes_b) -> np.ndarray:
+    """Pairwise IoU of (N,4) and (M,4) boxes -> (N,M)."""
+    a, b = as_boxes(boxes_a), as_boxes(boxes_b)
+    ax1, ay1, ax2, ay2 = (a[:, i:i + 1] for i in range(4))
+    bx1, by1, bx2, by2 = b.T
+    w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0.0, None)
+    h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0.0, None)
+    inter = w * h
+    area_a = (ax2 - ax1) * (ay2 - ay1)
+    area_b = (bx2 - bx1) * (by2 - by1)
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+def pair_iou(boxes_a, boxes_b) -> np.ndarray:
+    """Row-wise IoU of two (K,4) arrays (the diagonal of iou_matrix)."""
+    a, b = as_boxes(boxes_a), as_boxes(boxes_b)
+    w = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0.0, None)
+    h = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0.0, None)
+    inter = w * h
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+def box_centroids(boxes) -> np.ndarray:
+    b = as_boxes(boxes)
+    return (b[:, :2] + b[:, 2:]) * 0.5
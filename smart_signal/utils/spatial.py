@@ -0,0 +1,128 @@
+# smart_signal/utils/spatial.py
+"""
+Uniform-grid spatial hashing for pruning pair tests. Indexes are cheap to
+build (one sort) and meant to be rebuilt every frame.
+"""
+from typing import Sequence, Tuple
+import numpy as np
+
+Pairs = Tuple[np.ndarray, np.ndarray]
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _cell_keys(ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+    return ix.astype(np.int64) * (1 << 32) + iy.astype(np.int64)
+
+
+def _covered_cells(bounds: np.ndarray, cell: float) -> Pairs:
+    """(cell key, rect idx) for every cell each (N,4) rectangle overlaps."""
+    lo = np.floor(bounds[:, :2] / cell).astype(np.int64)
+    hi = np.floor(bounds[:, 2:] / cell).astype(np.int64)
+    nx, ny = hi[:, 0] - lo[:, 0] + 1, hi[:, 1] - lo[:, 1] + 1
+    counts = nx * ny
+    owner = np.repeat(np.arange(len(bounds)), counts)
+    # Index of each cell within its rectangle, split into (dx, dy)
+    k = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    ny_o = ny[owner]
+    keys = _cell_keys(lo[owner, 0] + k // ny_o, lo[owner, 1] + k % ny_o)
+    return keys, owner
+
+
+class _Buckets:
+    """Sorted (cell key -> item ids) table with vectorized lookup."""
+
+    def __init__(self, keys: np.ndarray, items: np.ndarray):
+        order = np.argsort(keys, kind="stable")
+        self.items = items[order]
+        self.keys, self.starts, self.counts = np.unique(keys[order], return_index=True,
+                                                        return_counts=True)
+
+    def lookup(self, keys: np.ndarray) -> Pairs:
+        """For each query key, every stored item in that cell: (query idx, item id)."""
+        if not len(self.keys) or not len(keys):
+            return _EMPTY, _EMPTY
+        pos = np.clip(np.searchsorted(self.keys, keys), 0, len(self.keys) - 1)
+        hit = self.keys[pos] == keys
+        q = np.flatnonzero(hit)
+        counts = self.counts[pos[q]]
+        total = int(counts.sum())
+        if not total:
+            return _EMPTY, _EMPTY
+        qi = np.repeat(q, counts)
+        # Position within each run: global arange minus the run's start offset
+        run_start = np.repeat(np.cumsum(counts) - counts, counts)
+        slot = np.repeat(self.starts[pos[q]], counts) + (np.arange(total) - run_start)
+        return qi, self.items[slot]
+
+
+class RectGrid:
+    """
+    Axis-aligned rectangles (e.g. lane ROI or polygon bounds) registered in
+    every cell they overlap; `query` returns candidate rectangles per point.
+    """
+
+    def __init__(self, bounds: Sequence[Tuple[float, float, float, float]], cell: float):
+        if cell <= 0:
+            raise ValueError("cell size must be positive")
+        self.cell = float(cell)
+        self.bounds = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        self._buckets = _Buckets(*_covered_cells(self.bounds, self.cell))
+
+    @classmethod
+    def auto(cls, bounds) -> "RectGrid":
+        """Cell size from the median rectangle extent."""
+        b = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        return cls(b, _median_extent(b))
+
+    def query_rects(self, bounds) -> Pairs:
+        """(query idx, rect idx) pairs sharing a cell; each pair reported once."""
+        q = np.asarray(bounds, dtype=np.float64).reshape(-1, 4)
+        if not len(q):
+            return _EMPTY, _EMPTY
+        keys, owner = _covered_cells(q, self.cell)
+        ci, ri = self._buckets.lookup(keys)
+        pair = np.unique(owner[ci] * len(self.bounds) + ri)
+        return pair // len(self.bounds), pair % len(self.bounds)
+
+    def query(self, points, inside: bool = True) -> Pairs:
+        """
+        (point idx, rect idx) candidate pairs. With `inside`, only pairs whose
+        point lies in the rectangle (edges inclusive) are kept.
+        """
+        p = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if not len(p):
+            return _EMPTY, _EMPTY
+        ij = np.floor(p / self.cell)
+        pi, ri = self._buckets.lookup(_cell_keys(ij[:, 0], ij[:, 1]))
+        if inside and len(pi):
+            b, q = self.bounds[ri], p[pi]
+            keep = (b[:, 0] <= q[:, 0]) & (q[:, 0] <= b[:, 2]) & (b[:, 1] <= q[:, 1]) & (q[:, 1] <= b[:, 3])
+            pi, ri = pi[keep], ri[keep]
+        return pi, ri
+
+
+def _median_extent(b: np.ndarray) -> float:
+    ext = np.maximum(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]) if len(b) else np.ones(1)
+    return max(float(np.median(ext)), 1.0)
+
+
+def overlapping_pairs(boxes_a, boxes_b) -> Pairs:
+    """
+    All (i, j) with a positive-area intersection between boxes_a[i] and
+    boxes_b[j] -- exactly the pairs with IoU > 0. Boxes are registered in
+    every grid cell they cover and each query visits only its own cells, so
+    one large box (a bus, a coasting track) costs in proportion to its own
+    size instead of widening every query.
+    """
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    if not len(a) or not len(b):
+        return _EMPTY, _EMPTY
+    grid = RectGrid(a, _median_extent(np.concatenate([a, b])))
+    bj, ai = grid.query_rects(b)
+    ba, bb = a[ai], b[bj]
+    keep = ((np.minimum(ba[:, 2], bb[:, 2]) > np.maximum(ba[:, 0], bb[:, 0])) &
+            (np.minimum(ba[:, 3], bb[:, 3]) > np.maximum(ba[:, 1], bb[:, 1])))
+    return ai[keep], bj[keep]
+
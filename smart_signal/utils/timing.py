@@ -1,7 +1,15 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from smart_signal.types import LaneStat, Splits
+from smart_signal.control.phases import PhasePlan
+from smart_signal.control.optimizer import webster_splits_batch
 
-def webster_splits(lane_stats: List[LaneStat], lost_time_s: float, min_green: float, max_green: float) -> Splits:
+def webster_splits(lane_stats: List[LaneStat], lost_time_s: float, min_green: float, max_green: float,
+                   plan: Optional[PhasePlan] = None, saturation_vph: float = 1800.0) -> Splits:
+    if plan is not None:
+        # Per-phase critical ratios from the compiled incidence matrix
+        y = plan.phase_flow_ratios(lane_stats, saturation_vph)
+        batch = webster_splits_batch(y[None, :], lost_time_s, min_green, max_green, saturation_vph=1.0)
+        return batch.splits(0, plan.phase_ids)
     # Estimate flow ratios y_i from arrivals; simple normalization
     by_phase = {}  # phase key we’ll map later, placeholder
     Y = 0.0
@@ -1,4 +1,5 @@
 import cv2
+import numpy as np
 import customtkinter as ctk
 from PIL import Image, ImageTk
 import threading
@@ -81,6 +82,7 @@ class TrackerUI(ctk.CTk):
         self.tracker = None
         self.running = False
         self._last_imgtk = None
+        self._rgb = None  # reused RGB conversion buffer
 
         # Persistent storage
         self.total_counts = {cat: 0 for cat in CATEGORIES}
@@ -92,7 +94,7 @@ class TrackerUI(ctk.CTk):
             self.status_label.configure(text="Running...")
             self.detector = YOLODetector(model_path="yolov8n.pt", conf_thresh=0.3)
             self.tracker = IOUTracker(iou_thresh=0.3, max_age=10)
-            self.cam = CameraStream(1, fps=30)  # webcam or video path
+            self.cam = CameraStream(1, fps=30, reuse_buffers=True)  # webcam or video path
             threading.Thread(target=self.loop, daemon=True).start()
 
     def stop_cam(self):
@@ -112,7 +114,7 @@ class TrackerUI(ctk.CTk):
         for fid, ts, frame in self.cam.frames():
             if not self.running:
                 break
-            detections = self.detector.infer(frame, fid, "N")
+            detections = self.detector.detect(frame, fid, "N")
             tracks = self.tracker.update(detections, fid)
 
             # Update persistent counts
@@ -135,8 +137,10 @@ class TrackerUI(ctk.CTk):
             self.track_count_label.configure(text=f"Active Tracks: {len(tracks)}")
 
             # Convert to Tkinter image
-            img_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(img_rgb)
+            if self._rgb is None or self._rgb.shape != frame.shape:
+                self._rgb = np.empty_like(frame)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb)
+            pil_img = Image.fromarray(self._rgb)
             imgtk = ImageTk.PhotoImage(image=pil_img)
             self.video_label.configure(image=imgtk)
             self.video_label.image = imgtk
@@ -6,13 +6,14 @@
 # Distribution using python class
 
 # *** IMAGE XY COOD IS TOP LEFT
+import argparse
+import heapq
+import itertools
 import random
 import math
 import time
-import threading
 # from vehicle_detection import detection
 import pygame
-import sys
 import os
 
 # options={
@@ -85,9 +86,19 @@ rotationAngle = 3
 gap = 15    # stopping gap
 gap2 = 15   # moving gap
 
-pygame.init()
 simulation = pygame.sprite.Group()
 
+# Screensize
+screenWidth = 1400
+screenHeight = 800
+
+# Vehicles move once per frame; frames are fixed steps of simulated time
+framesPerSecond = 60
+rng = random.Random()
+announce = False    # speak "detecting vehicles" (macOS `say`) at each detection
+verbose = True      # print the signal timers every second
+images = {}         # image path -> Surface, loaded once and shared
+
 class TrafficSignal:
     def __init__(self, red, yellow, green, minimum, maximum):
         self.red = red
@@ -97,7 +108,12 @@ class TrafficSignal:
         self.maximum = maximum
         self.signalText = "30"
         self.totalGreenTime = 0
-        
+
+def loadImage(path):
+    if path not in images:
+        images[path] = pygame.image.load(path)
+    return images[path]
+
 class Vehicle(pygame.sprite.Sprite):
     def __init__(self, lane, vehicleClass, direction_number, direction, will_turn):
         pygame.sprite.Sprite.__init__(self)
@@ -115,42 +131,44 @@ class Vehicle(pygame.sprite.Sprite):
         vehicles[direction][lane].append(self)
         # self.stop = stops[direction][lane]
         self.index = len(vehicles[direction][lane]) - 1
+        self.ahead = vehicles[direction][lane][self.index-1] if self.index>0 else None   # vehicle in front in this lane
         path = "images/" + direction + "/" + vehicleClass + ".png"
-        self.originalImage = pygame.image.load(path)
-        self.currentImage = pygame.image.load(path)
+        self.originalImage = loadImage(path)
+        self.currentImage = self.originalImage
+        self.width, self.height = self.currentImage.get_size()   # kept in step with currentImage
 
     
         if(direction=='right'):
             if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):    # if more than 1 vehicle in the lane of vehicle before it has crossed stop line
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().width - gap         # setting stop coordinate as: stop coordinate of next vehicle - width of next vehicle - gap
+                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].width - gap         # setting stop coordinate as: stop coordinate of next vehicle - width of next vehicle - gap
             else:
                 self.stop = defaultStop[direction]
             # Set new starting and stopping coordinate
-            temp = self.currentImage.get_rect().width + gap    
+            temp = self.width + gap    
             x[direction][lane] -= temp
             stops[direction][lane] -= temp
         elif(direction=='left'):
             if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().width + gap
+                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].width + gap
             else:
                 self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().width + gap
+            temp = self.width + gap
             x[direction][lane] += temp
             stops[direction][lane] += temp
         elif(direction=='down'):
             if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].currentImage.get_rect().height - gap
+                self.stop = vehicles[direction][lane][self.index-1].stop - vehicles[direction][lane][self.index-1].height - gap
             else:
                 self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().height + gap
+            temp = self.height + gap
             y[direction][lane] -= temp
             stops[direction][lane] -= temp
         elif(direction=='up'):
             if(len(vehicles[direction][lane])>1 and vehicles[direction][lane][self.index-1].crossed==0):
-                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].currentImage.get_rect().height + gap
+                self.stop = vehicles[direction][lane][self.index-1].stop + vehicles[direction][lane][self.index-1].height + gap
             else:
                 self.stop = defaultStop[direction]
-            temp = self.currentImage.get_rect().height + gap
+            temp = self.height + gap
             y[direction][lane] += temp
             stops[direction][lane] += temp
         simulation.add(self)
@@ -160,17 +178,18 @@ class Vehicle(pygame.sprite.Sprite):
 
     def move(self):
         if(self.direction=='right'):
-            if(self.crossed==0 and self.x+self.currentImage.get_rect().width>stopLines[self.direction]):   # if the image has crossed stop line now
+            if(self.crossed==0 and self.x+self.width>stopLines[self.direction]):   # if the image has crossed stop line now
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
             if(self.willTurn==1):
-                if(self.crossed==0 or self.x+self.currentImage.get_rect().width<mid[self.direction]['x']):
-                    if((self.x+self.currentImage.get_rect().width<=self.stop or (currentGreen==0 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
+                if(self.crossed==0 or self.x+self.width<mid[self.direction]['x']):
+                    if((self.x+self.width<=self.stop or (currentGreen==0 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x+self.width<(self.ahead.x - gap2) or self.ahead.turned==1)):                
                         self.x += self.speed
                 else:   
                     if(self.turned==0):
                         self.rotateAngle += rotationAngle
                         self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.width, self.height = self.currentImage.get_size()
                         self.x += 2
                         self.y += 1.8
                         if(self.rotateAngle==90):
@@ -180,36 +199,37 @@ class Vehicle(pygame.sprite.Sprite):
                             # self.y = mid[self.direction]['y']
                             # self.image = pygame.image.load(path)
                     else:
-                        if(self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2)):
+                        if(self.index==0 or self.y+self.height<(self.ahead.y - gap2) or self.x+self.width<(self.ahead.x - gap2)):
                             self.y += self.speed
             else: 
-                if((self.x+self.currentImage.get_rect().width<=self.stop or self.crossed == 1 or (currentGreen==0 and currentYellow==0)) and (self.index==0 or self.x+self.currentImage.get_rect().width<(vehicles[self.direction][self.lane][self.index-1].x - gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
+                if((self.x+self.width<=self.stop or self.crossed == 1 or (currentGreen==0 and currentYellow==0)) and (self.index==0 or self.x+self.width<(self.ahead.x - gap2) or (self.ahead.turned==1))):                
                 # (if the image has not reached its stop coordinate or has crossed stop line or has green signal) and (it is either the first vehicle in that lane or it is has enough gap to the next vehicle in that lane)
                     self.x += self.speed  # move the vehicle
 
 
 
         elif(self.direction=='down'):
-            if(self.crossed==0 and self.y+self.currentImage.get_rect().height>stopLines[self.direction]):
+            if(self.crossed==0 and self.y+self.height>stopLines[self.direction]):
                 self.crossed = 1
                 vehicles[self.direction]['crossed'] += 1
             if(self.willTurn==1):
-                if(self.crossed==0 or self.y+self.currentImage.get_rect().height<mid[self.direction]['y']):
-                    if((self.y+self.currentImage.get_rect().height<=self.stop or (currentGreen==1 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
+                if(self.crossed==0 or self.y+self.height<mid[self.direction]['y']):
+                    if((self.y+self.height<=self.stop or (currentGreen==1 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.y+self.height<(self.ahead.y - gap2) or self.ahead.turned==1)):                
                         self.y += self.speed
                 else:   
                     if(self.turned==0):
                         self.rotateAngle += rotationAngle
                         self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.width, self.height = self.currentImage.get_size()
                         self.x -= 2.5
                         self.y += 2
                         if(self.rotateAngle==90):
                             self.turned = 1
                     else:
-                        if(self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or self.y<(vehicles[self.direction][self.lane][self.index-1].y - gap2)):
+                        if(self.index==0 or self.x>(self.ahead.x + self.ahead.width + gap2) or self.y<(self.ahead.y - gap2)):
                             self.x -= self.speed
             else: 
-                if((self.y+self.currentImage.get_rect().height<=self.stop or self.crossed == 1 or (currentGreen==1 and currentYellow==0)) and (self.index==0 or self.y+self.currentImage.get_rect().height<(vehicles[self.direction][self.lane][self.index-1].y - gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
+                if((self.y+self.height<=self.stop or self.crossed == 1 or (currentGreen==1 and currentYellow==0)) and (self.index==0 or self.y+self.height<(self.ahead.y - gap2) or (self.ahead.turned==1))):                
                     self.y += self.speed
             
         elif(self.direction=='left'):
@@ -218,12 +238,13 @@ class Vehicle(pygame.sprite.Sprite):
                 vehicles[self.direction]['crossed'] += 1
             if(self.willTurn==1):
                 if(self.crossed==0 or self.x>mid[self.direction]['x']):
-                    if((self.x>=self.stop or (currentGreen==2 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):                
+                    if((self.x>=self.stop or (currentGreen==2 and currentYellow==0) or self.crossed==1) and (self.index==0 or self.x>(self.ahead.x + self.ahead.width + gap2) or self.ahead.turned==1)):                
                         self.x -= self.speed
                 else: 
                     if(self.turned==0):
                         self.rotateAngle += rotationAngle
                         self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.width, self.height = self.currentImage.get_size()
                         self.x -= 1.8
                         self.y -= 2.5
                         if(self.rotateAngle==90):
@@ -233,13 +254,13 @@ class Vehicle(pygame.sprite.Sprite):
                             # self.y = mid[self.direction]['y']
                             # self.currentImage = pygame.image.load(path)
                     else:
-                        if(self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height +  gap2) or self.x>(vehicles[self.direction][self.lane][self.index-1].x + gap2)):
+                        if(self.index==0 or self.y>(self.ahead.y + self.ahead.height +  gap2) or self.x>(self.ahead.x + gap2)):
                             self.y -= self.speed
             else: 
-                if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
+                if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(self.ahead.x + self.ahead.width + gap2) or (self.ahead.turned==1))):                
                 # (if the image has not reached its stop coordinate or has crossed stop line or has green signal) and (it is either the first vehicle in that lane or it is has enough gap to the next vehicle in that lane)
                     self.x -= self.speed  # move the vehicle    
-            # if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(vehicles[self.direction][self.lane][self.index-1].x + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width + gap2))):                
+            # if((self.x>=self.stop or self.crossed == 1 or (currentGreen==2 and currentYellow==0)) and (self.index==0 or self.x>(self.ahead.x + self.ahead.width + gap2))):                
             #     self.x -= self.speed
         elif(self.direction=='up'):
             if(self.crossed==0 and self.y<stopLines[self.direction]):
@@ -247,21 +268,22 @@ class Vehicle(pygame.sprite.Sprite):
                 vehicles[self.direction]['crossed'] += 1
             if(self.willTurn==1):
                 if(self.crossed==0 or self.y>mid[self.direction]['y']):
-                    if((self.y>=self.stop or (currentGreen==3 and currentYellow==0) or self.crossed == 1) and (self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height +  gap2) or vehicles[self.direction][self.lane][self.index-1].turned==1)):
+                    if((self.y>=self.stop or (currentGreen==3 and currentYellow==0) or self.crossed == 1) and (self.index==0 or self.y>(self.ahead.y + self.ahead.height +  gap2) or self.ahead.turned==1)):
                         self.y -= self.speed
                 else:   
                     if(self.turned==0):
                         self.rotateAngle += rotationAngle
                         self.currentImage = pygame.transform.rotate(self.originalImage, -self.rotateAngle)
+                        self.width, self.height = self.currentImage.get_size()
                         self.x += 1
                         self.y -= 1
                         if(self.rotateAngle==90):
                             self.turned = 1
                     else:
-                        if(self.index==0 or self.x<(vehicles[self.direction][self.lane][self.index-1].x - vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().width - gap2) or self.y>(vehicles[self.direction][self.lane][self.index-1].y + gap2)):
+                        if(self.index==0 or self.x<(self.ahead.x - self.ahead.width - gap2) or self.y>(self.ahead.y + gap2)):
                             self.x += self.speed
             else: 
-                if((self.y>=self.stop or self.crossed == 1 or (currentGreen==3 and currentYellow==0)) and (self.index==0 or self.y>(vehicles[self.direction][self.lane][self.index-1].y + vehicles[self.direction][self.lane][self.index-1].currentImage.get_rect().height + gap2) or (vehicles[self.direction][self.lane][self.index-1].turned==1))):                
+                if((self.y>=self.stop or self.crossed == 1 or (currentGreen==3 and currentYellow==0)) and (self.index==0 or self.y>(self.ahead.y + self.ahead.height + gap2) or (self.ahead.turned==1))):                
                     self.y -= self.speed
 
 # Initialization of signals with default values
@@ -274,13 +296,13 @@ def initialize():
     signals.append(ts3)
     ts4 = TrafficSignal(defaultRed, defaultYellow, defaultGreen, defaultMinimum, defaultMaximum)
     signals.append(ts4)
-    repeat()
 
 # Set time according to formula
 def setTime():
     global noOfCars, noOfBikes, noOfBuses, noOfTrucks, noOfRickshaws, noOfLanes
     global carTime, busTime, truckTime, rickshawTime, bikeTime
-    os.system("say detecting vehicles, "+directionNumbers[(currentGreen+1)%noOfSignals])
+    if(announce):
+        os.system("say detecting vehicles, "+directionNumbers[(currentGreen+1)%noOfSignals])
     noOfCars, noOfBuses, noOfTrucks, noOfRickshaws, noOfBikes = 0,0,0,0,0
     for j in range(len(vehicles[directionNumbers[nextGreen]][0])):
         vehicle = vehicles[directionNumbers[nextGreen]][0][j]
@@ -305,7 +327,8 @@ def setTime():
     # print(noOfCars)
     greenTime = math.ceil(((noOfCars*carTime) + (noOfRickshaws*rickshawTime) + (noOfBuses*busTime) + (noOfTrucks*truckTime)+ (noOfBikes*bikeTime))/(noOfLanes+1))
     # greenTime = math.ceil((noOfVehicles)/noOfLanes) 
-    print('Green Time: ',greenTime)
+    if(verbose):
+        print('Green Time: ',greenTime)
     if(greenTime<defaultMinimum):
         greenTime = defaultMinimum
     elif(greenTime>defaultMaximum):
@@ -313,42 +336,44 @@ def setTime():
     # greenTime = random.randint(15,50)
     signals[(currentGreen+1)%(noOfSignals)].green = greenTime
    
-def repeat():
+# One second of the signal cycle: count down green, then yellow, then hand
+# over to the next signal (the next green starts in the same second)
+def signalTick():
     global currentGreen, currentYellow, nextGreen
-    while(signals[currentGreen].green>0):   # while the timer of current green signal is not zero
-        printStatus()
-        updateValues()
-        if(signals[(currentGreen+1)%(noOfSignals)].red==detectionTime):    # set time of next green signal 
-            thread = threading.Thread(name="detection",target=setTime, args=())
-            thread.daemon = True
-            thread.start()
-            # setTime()
-        time.sleep(1)
-    currentYellow = 1   # set yellow signal on
-    vehicleCountTexts[currentGreen] = "0"
-    # reset stop coordinates of lanes and vehicles 
-    for i in range(0,3):
-        stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
-        for vehicle in vehicles[directionNumbers[currentGreen]][i]:
-            vehicle.stop = defaultStop[directionNumbers[currentGreen]]
-    while(signals[currentGreen].yellow>0):  # while the timer of current yellow signal is not zero
-        printStatus()
-        updateValues()
-        time.sleep(1)
-    currentYellow = 0   # set yellow signal off
-    
-    # reset all signal times of current signal to default times
-    signals[currentGreen].green = defaultGreen
-    signals[currentGreen].yellow = defaultYellow
-    signals[currentGreen].red = defaultRed
-       
-    currentGreen = nextGreen # set next signal as green signal
-    nextGreen = (currentGreen+1)%noOfSignals    # set next green signal
-    signals[nextGreen].red = signals[currentGreen].yellow+signals[currentGreen].green    # set the red time of next to next signal as (yellow time + green time) of next signal
-    repeat()     
+    while(True):
+        if(currentYellow==0):
+            if(signals[currentGreen].green>0):   # timer of current green signal is not zero
+                printStatus()
+                updateValues()
+                if(signals[(currentGreen+1)%(noOfSignals)].red==detectionTime):    # set time of next green signal
+                    setTime()
+                return
+            currentYellow = 1   # set yellow signal on
+            vehicleCountTexts[currentGreen] = "0"
+            # reset stop coordinates of lanes and vehicles
+            for i in range(0,3):
+                stops[directionNumbers[currentGreen]][i] = defaultStop[directionNumbers[currentGreen]]
+                for vehicle in vehicles[directionNumbers[currentGreen]][i]:
+                    vehicle.stop = defaultStop[directionNumbers[currentGreen]]
+        if(signals[currentGreen].yellow>0):  # timer of current yellow signal is not zero
+            printStatus()
+            updateValues()
+            return
+        currentYellow = 0   # set yellow signal off
+
+        # reset all signal times of current signal to default times
+        signals[currentGreen].green = defaultGreen
+        signals[currentGreen].yellow = defaultYellow
+        signals[currentGreen].red = defaultRed
+
+        currentGreen = nextGreen # set next signal as green signal
+        nextGreen = (currentGreen+1)%noOfSignals    # set next green signal
+        signals[nextGreen].red = signals[currentGreen].yellow+signals[currentGreen].green    # set the red time of next to next signal as (yellow time + green time) of next signal
 
 # Print the signal timers on cmd
-def printStatus():                                                                                           
+def printStatus():
+	if(not verbose):
+		return
 	for i in range(0, noOfSignals):
 		if(i==currentGreen):
 			if(currentYellow==0):
@@ -371,135 +396,235 @@ def updateValues():
         else:
             signals[i].red-=1
 
-# Generating vehicles in the simulation
-def generateVehicles():
-    while(True):
-        vehicle_type = random.randint(0,4)
-        if(vehicle_type==4):
-            lane_number = 0
-        else:
-            lane_number = random.randint(0,1) + 1
-        will_turn = 0
-        if(lane_number==2):
-            temp = random.randint(0,4)
-            if(temp<=2):
-                will_turn = 1
-            elif(temp>2):
-                will_turn = 0
-        temp = random.randint(0,999)
+# Generating a vehicle in the simulation
+def generateVehicle():
+    vehicle_type = rng.randint(0,4)
+    if(vehicle_type==4):
+        lane_number = 0
+    else:
+        lane_number = rng.randint(0,1) + 1
+    will_turn = 0
+    if(lane_number==2):
+        temp = rng.randint(0,4)
+        if(temp<=2):
+            will_turn = 1
+        elif(temp>2):
+            will_turn = 0
+    temp = rng.randint(0,999)
+    direction_number = 0
+    a = [400,800,900,1000]
+    if(temp<a[0]):
         direction_number = 0
-        a = [400,800,900,1000]
-        if(temp<a[0]):
-            direction_number = 0
-        elif(temp<a[1]):
-            direction_number = 1
-        elif(temp<a[2]):
-            direction_number = 2
-        elif(temp<a[3]):
-            direction_number = 3
-        Vehicle(lane_number, vehicleTypes[vehicle_type], direction_number, directionNumbers[direction_number], will_turn)
-        time.sleep(0.75)
-
-def simulationTime():
-    global timeElapsed, simTime
-    while(True):
-        timeElapsed += 1
-        time.sleep(1)
-        if(timeElapsed==simTime):
-            totalVehicles = 0
-            print('Lane-wise Vehicle Counts')
-            for i in range(noOfSignals):
-                print('Lane',i+1,':',vehicles[directionNumbers[i]]['crossed'])
-                totalVehicles += vehicles[directionNumbers[i]]['crossed']
-            print('Total vehicles passed: ',totalVehicles)
-            print('Total time passed: ',timeElapsed)
-            print('No. of vehicles passed per unit time: ',(float(totalVehicles)/float(timeElapsed)))
-            os._exit(1)
-    
-
-class Main:
-    thread4 = threading.Thread(name="simulationTime",target=simulationTime, args=()) 
-    thread4.daemon = True
-    thread4.start()
-
-    thread2 = threading.Thread(name="initialization",target=initialize, args=())    # initialization
-    thread2.daemon = True
-    thread2.start()
-
-    # Colours 
+    elif(temp<a[1]):
+        direction_number = 1
+    elif(temp<a[2]):
+        direction_number = 2
+    elif(temp<a[3]):
+        direction_number = 3
+    Vehicle(lane_number, vehicleTypes[vehicle_type], direction_number, directionNumbers[direction_number], will_turn)
+
+def moveVehicles():
+    for vehicle in simulation.sprites():
+        vehicle.move()
+
+# Where a vehicle that has left the screen is parked: far ahead along its
+# path, so the gap checks of the vehicles behind it always pass
+farAhead = {('right',0):('x',1e9), ('right',1):('y',1e9), ('down',0):('y',1e9), ('down',1):('x',-1e9),
+            ('left',0):('x',-1e9), ('left',1):('y',-1e9), ('up',0):('y',-1e9), ('up',1):('x',1e9)}
+
+# Stop moving vehicles that have driven off the screen. Past the intersection
+# every vehicle runs at the same speed as the one ahead, so nothing behind
+# could ever have caught up with them.
+def retireVehicles():
+    for vehicle in simulation.sprites():
+        if(vehicle.crossed==1 and vehicle.turned==vehicle.willTurn and (vehicle.x>screenWidth or vehicle.x+vehicle.width<0 or vehicle.y>screenHeight or vehicle.y+vehicle.height<0)):
+            axis, value = farAhead[(vehicle.direction, vehicle.turned)]
+            setattr(vehicle, axis, value)
+            simulation.remove(vehicle)
+
+def printReport():
+    totalVehicles = 0
+    print('Lane-wise Vehicle Counts')
+    for i in range(noOfSignals):
+        print('Lane',i+1,':',vehicles[directionNumbers[i]]['crossed'])
+        totalVehicles += vehicles[directionNumbers[i]]['crossed']
+    print('Total vehicles passed: ',totalVehicles)
+    print('Total time passed: ',timeElapsed)
+    print('No. of vehicles passed per unit time: ',(float(totalVehicles)/float(timeElapsed)))
+
+
+class EventScheduler:
+    """
+    Single-threaded discrete-event loop on a virtual clock (seconds). Events
+    due at the same time run in `priority` order, then in scheduling order.
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.queue = []
+        self.seq = itertools.count()
+        self.stopped = False
+
+    def schedule(self, t, priority, callback):
+        heapq.heappush(self.queue, (t, priority, next(self.seq), callback))
+
+    def every(self, period, priority, callback, start=0.0):
+        """Run `callback` at start, start+period, ... (computed, so no drift)."""
+        def fire(k):
+            callback()
+            self.schedule(start + (k+1)*period, priority, lambda: fire(k+1))
+        self.schedule(start, priority, lambda: fire(0))
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self, until=None):
+        while(self.queue and not self.stopped):
+            t, _, _, callback = self.queue[0]
+            if(until is not None and t>until):
+                break
+            heapq.heappop(self.queue)
+            self.now = t
+            callback()
+        return self.now
+
+
+# Event priorities within one instant: signals, arrivals, movement, clock, drawing
+SIGNAL, ARRIVAL, MOVE, CLOCK, DRAW = range(5)
+
+class Renderer:
+    """Draws the intersection; only reads simulation state."""
+    # Colours
     black = (0, 0, 0)
     white = (255, 255, 255)
 
-    # Screensize 
-    screenWidth = 1400
-    screenHeight = 800
     screenSize = (screenWidth, screenHeight)
 
-    # Setting background image i.e. image of intersection
-    background = pygame.image.load('images/mod_int.png')
-
-    screen = pygame.display.set_mode(screenSize)
-    pygame.display.set_caption("SIMULATION")
-
-    # Loading signal images and font
-    redSignal = pygame.image.load('images/signals/red.png')
-    yellowSignal = pygame.image.load('images/signals/yellow.png')
-    greenSignal = pygame.image.load('images/signals/green.png')
-    font = pygame.font.Font(None, 30)
-
-    thread3 = threading.Thread(name="generateVehicles",target=generateVehicles, args=())    # Generating vehicles
-    thread3.daemon = True
-    thread3.start()
-
-    while True:
+    def __init__(self, realtime=True):
+        """
+        :param realtime: pace the virtual clock to the wall clock
+        """
+        pygame.init()
+        self.realtime = realtime
+        self.started = None
+        # Setting background image i.e. image of intersection
+        self.background = pygame.image.load('images/mod_int.png')
+
+        self.screen = pygame.display.set_mode(self.screenSize)
+        pygame.display.set_caption("SIMULATION")
+
+        # Loading signal images and font
+        self.redSignal = pygame.image.load('images/signals/red.png')
+        self.yellowSignal = pygame.image.load('images/signals/yellow.png')
+        self.greenSignal = pygame.image.load('images/signals/green.png')
+        self.font = pygame.font.Font(None, 30)
+
+    def signalText(self, i):
+        if(i==currentGreen):
+            if(currentYellow==1):
+                return "STOP" if signals[i].yellow==0 else signals[i].yellow
+            return "SLOW" if signals[i].green==0 else signals[i].green
+        if(signals[i].red<=10):
+            return "GO" if signals[i].red==0 else signals[i].red
+        return "---"
+
+    def draw(self, scheduler):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                sys.exit()
-
-        screen.blit(background,(0,0))   # display background in simulation
-        for i in range(0,noOfSignals):  # display signal and set timer according to current status: green, yello, or red
+                scheduler.stop()
+                return
+        if(self.realtime):
+            if(self.started is None):
+                self.started = time.perf_counter() - scheduler.now
+            lag = self.started + scheduler.now - time.perf_counter()
+            if(lag>0):
+                time.sleep(lag)
+
+        screen = self.screen
+        black, white, font = self.black, self.white, self.font
+        screen.blit(self.background,(0,0))   # display background in simulation
+        for i in range(0,noOfSignals):  # display signal according to current status: green, yellow, or red
             if(i==currentGreen):
-                if(currentYellow==1):
-                    if(signals[i].yellow==0):
-                        signals[i].signalText = "STOP"
-                    else:
-                        signals[i].signalText = signals[i].yellow
-                    screen.blit(yellowSignal, signalCoods[i])
-                else:
-                    if(signals[i].green==0):
-                        signals[i].signalText = "SLOW"
-                    else:
-                        signals[i].signalText = signals[i].green
-                    screen.blit(greenSignal, signalCoods[i])
+                screen.blit(self.yellowSignal if currentYellow==1 else self.greenSignal, signalCoods[i])
             else:
-                if(signals[i].red<=10):
-                    if(signals[i].red==0):
-                        signals[i].signalText = "GO"
-                    else:
-                        signals[i].signalText = signals[i].red
-                else:
-                    signals[i].signalText = "---"
-                screen.blit(redSignal, signalCoods[i])
-        signalTexts = ["","","",""]
+                screen.blit(self.redSignal, signalCoods[i])
 
         # display signal timer and vehicle count
-        for i in range(0,noOfSignals):  
-            signalTexts[i] = font.render(str(signals[i].signalText), True, white, black)
-            screen.blit(signalTexts[i],signalTimerCoods[i]) 
+        for i in range(0,noOfSignals):
+            screen.blit(font.render(str(self.signalText(i)), True, white, black),signalTimerCoods[i])
             displayText = vehicles[directionNumbers[i]]['crossed']
-            vehicleCountTexts[i] = font.render(str(displayText), True, black, white)
-            screen.blit(vehicleCountTexts[i],vehicleCountCoods[i])
+            screen.blit(font.render(str(displayText), True, black, white),vehicleCountCoods[i])
 
         timeElapsedText = font.render(("Time Elapsed: "+str(timeElapsed)), True, black, white)
         screen.blit(timeElapsedText,(1100,50))
 
         # display the vehicles
-        for vehicle in simulation:  
+        for vehicle in simulation:
             screen.blit(vehicle.currentImage, [vehicle.x, vehicle.y])
-            # vehicle.render(screen)
-            vehicle.move()
         pygame.display.update()
 
-Main()
 
-  
\ No newline at end of file
+# Restore the start-of-run state so runs can be repeated in one process
+def reset(seed=None):
+    global currentGreen, nextGreen, currentYellow, timeElapsed
+    signals.clear()
+    simulation.empty()
+    currentGreen = 0
+    nextGreen = (currentGreen+1)%noOfSignals
+    currentYellow = 0
+    timeElapsed = 0
+    for direction in vehicles:
+        vehicles[direction] = {0:[], 1:[], 2:[], 'crossed':0}
+    x.update({'right':[0,0,0], 'down':[755,727,697], 'left':[1400,1400,1400], 'up':[602,627,657]})
+    y.update({'right':[348,370,398], 'down':[0,0,0], 'left':[498,466,436], 'up':[800,800,800]})
+    for direction in stops:
+        stops[direction] = [defaultStop[direction]]*3
+    rng.seed(seed)
+
+def simulate(seed=None, duration=None, renderer=None, drawRate=30, retire=True):
+    """
+    Run the simulation for `duration` seconds (default `simTime`) of virtual
+    time, print the lane-wise report and return the crossed count per lane.
+    """
+    duration = simTime if duration is None else duration
+    reset(seed)
+    initialize()
+    scheduler = EventScheduler()
+
+    def tick():
+        global timeElapsed
+        timeElapsed += 1
+        if(timeElapsed==duration):
+            scheduler.stop()
+
+    scheduler.every(1, SIGNAL, signalTick)
+    scheduler.every(0.75, ARRIVAL, generateVehicle)
+    scheduler.every(1.0/framesPerSecond, MOVE, moveVehicles)
+    if(retire):
+        scheduler.every(1, MOVE, retireVehicles)
+    scheduler.every(1, CLOCK, tick, start=1)
+    if(renderer is not None):
+        scheduler.every(1.0/drawRate, DRAW, lambda: renderer.draw(scheduler))
+    scheduler.run()
+    if(timeElapsed>0):
+        printReport()
+    return [vehicles[directionNumbers[i]]['crossed'] for i in range(noOfSignals)]
+
+
+def main():
+    global announce, verbose
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true", help="no window, run as fast as possible")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sim-time", type=int, default=simTime, help="simulated seconds")
+    parser.add_argument("--fast", action="store_true", help="draw without pacing to the wall clock")
+    parser.add_argument("--quiet", action="store_true", help="do not print signal timers")
+    parser.add_argument("--say", action="store_true", help="announce detections with `say`")
+    args = parser.parse_args()
+    announce = args.say
+    verbose = not args.quiet
+    renderer = None if args.headless else Renderer(realtime=not args.fast)
+    simulate(args.seed, args.sim_time, renderer)
+
+
+if __name__ == "__main__":
+    main()